@@ -0,0 +1,54 @@
+"""Balance runner for the medieval boss-rush game.
+
+Plays large batches of headless fights against every boss in
+``levels.json`` with scripted input policies, spread over worker processes,
+and prints win rates, time-to-kill and damage distributions.
+
+Usage:
+    python balance.py --fights 5000 --workers 8
+    python balance.py --bosses ogre --policies greedy kiting --json out.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from typing import List, Optional
+
+from game.balance import POLICIES, format_table, run_balance
+from game.engine import STEP_DT
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, run the balance batch and report the results."""
+
+    parser = argparse.ArgumentParser(description="Monte Carlo balance runs over headless fights.")
+    parser.add_argument("--fights", type=int, default=1000, help="fights per boss and policy")
+    parser.add_argument("--bosses", nargs="+", help="boss ids (default: levels.json order)")
+    parser.add_argument("--policies", nargs="+", choices=sorted(POLICIES), help="input policies (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk", type=int, default=250, help="fights per work unit")
+    parser.add_argument("--seed", type=int, default=0, help="base seed; same seed gives same results")
+    parser.add_argument("--max-frames", type=int, default=600, help="frames before a fight times out")
+    parser.add_argument("--dt", type=float, default=STEP_DT, help="seconds per frame (default: the server's step)")
+    parser.add_argument("--json", metavar="PATH", help="also write the summaries as JSON")
+    args = parser.parse_args(argv)
+
+    rows = run_balance(
+        fights=args.fights,
+        bosses=args.bosses,
+        policies=args.policies,
+        workers=args.workers,
+        chunk=args.chunk,
+        seed=args.seed,
+        max_frames=args.max_frames,
+        dt=args.dt,
+    )
+    print(format_table(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Benchmark suite for the medieval boss-rush game.
+
+Measures the engine tick (with and without phase metrics), the catch-up
+of parked engines, snapshots, engine actor messages, collision tests
+(including worlds of 10/100/1000 entities), per-tick memory allocation,
+profile storage and leaderboard indexes at several profile counts and every
+Flask route, and can compare a run with a saved baseline.
+
+Usage:
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 15
+    python bench.py --filter "engine|aabb" --sizes 10 1000
+
+Each metric is the best per-operation time over several timed rounds
+(``timeit`` autorange). ``--compare`` exits with status 1 when any metric is
+slower than the baseline by more than ``--threshold`` percent. ``alloc.*``
+metrics are bytes per tick (``tracemalloc``) rather than seconds: ``peak`` is
+the largest transient allocation inside one tick and ``retained`` the memory
+still held afterwards, averaged over the run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import re
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from game import storage
+from game.engine import GameEngine, aabb_overlap
+from game.entities import Goblin, Knight, Projectile
+from game.leaderboard import SortedKeys
+from game.level import get_assets
+from game.metrics import Histogram, MetricsRegistry, StepMetrics
+
+Bench = Tuple[str, Callable[[], object]]
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best per-call time of ``fn`` in seconds."""
+
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def engine_benches() -> Iterator[Bench]:
+    """Tick cost per boss type, snapshot cost and the AABB test."""
+
+    assets = get_assets()
+    for boss_id in assets.boss_ids():
+        eng = GameEngine(player=Knight(name="Bench"), enemy=assets.create_enemy(boss_id))
+
+        def step(eng: GameEngine = eng) -> None:
+            eng.enqueue_action("attack")
+            eng.step()
+
+        yield f"engine.step.{boss_id}", step
+
+        def fast_forward(boss_id: str = boss_id) -> None:
+            # Catch-up of a session parked for a minute at 10 Hz
+            GameEngine(player=Knight(name="Bench"), enemy=assets.create_enemy(boss_id)).fast_forward(600, 0.1)
+
+        yield f"engine.fast_forward.{boss_id}.600", fast_forward
+
+    metered = GameEngine(
+        player=Knight(name="Bench"), enemy=assets.create_enemy("ogre"), metrics=StepMetrics(MetricsRegistry())
+    )
+
+    def step_metered() -> None:
+        metered.enqueue_action("attack")
+        metered.step()
+
+    yield "engine.step.ogre.metered", step_metered
+    hist = Histogram()
+    yield "metrics.observe", lambda: hist.observe(0.000123)
+
+    eng = GameEngine(player=Knight(name="Bench"), enemy=assets.create_enemy("ogre"))
+    yield "engine.snapshot", eng.snapshot
+
+    from game.checkpoint import dumps, loads
+
+    blob = dumps(eng)
+    from game.actor import EngineActor
+
+    actor = EngineActor(eng)
+    yield "actor.publish", actor.publish
+    yield "actor.post.inline", lambda: actor.post(lambda e: e.enqueue_action("attack"))
+    yield "actor.call.inline", lambda: actor.call(lambda e: e.frame)
+    yield "checkpoint.dumps", lambda: dumps(eng)
+    yield "checkpoint.loads", lambda: loads(blob)
+    yield "aabb_overlap.hit", lambda: aabb_overlap(0, 0, 20, 10, 10, 5, 20, 20)
+    yield "aabb_overlap.miss", lambda: aabb_overlap(0, 0, 20, 10, 100, 5, 20, 20)
+
+
+def replay_benches(frames: int = 2000) -> Iterator[Bench]:
+    """Full-speed replay of a recorded fight and seeking within it."""
+
+    from game.replay import FightRecorder, replay
+
+    eng = GameEngine(player=Knight(name="Bench"), enemy=get_assets().create_enemy("ogre"))
+    eng.player.health = eng.enemy.health = 10**9
+    eng.recorder = FightRecorder(eng)
+    for i in range(frames):
+        eng.enqueue_action(("attack", "move_left", "attack", "move_right")[i % 4])
+        eng.step()
+    recording = eng.recorder.recording(eng)
+    yield f"replay.full.{frames}", lambda: replay(recording, seek=False)
+    yield f"replay.seek.{frames}", lambda: replay(recording, frames - 1)
+
+
+def collision_benches(counts: List[int] = [10, 100, 1000]) -> Iterator[Bench]:
+    """Full ticks of a world with many hostile entities."""
+
+    for count in counts:
+        eng = GameEngine(player=Knight(name="Bench"), enemy=get_assets().create_enemy("ogre"))
+
+        def populate(eng: GameEngine = eng, count: int = count) -> None:
+            # Spread entities over a wide strip so only a few are near the player
+            eng.entities.clear()
+            for i in range(count):
+                x = 50 + (i - count // 2) * 37
+                if i % 2:
+                    eng.spawn(Goblin(name="Minion", health=10**9, position=(x, 50), attack_damage=0))
+                else:
+                    eng.spawn(Projectile(name="Fire", health=10**9, position=(x, 50), attack_damage=0))
+            eng.player.health = 10**9
+
+        populate()
+
+        def step(eng: GameEngine = eng, populate: Callable[[], None] = populate) -> None:
+            if eng.frame % 50 == 0:
+                populate()
+            eng.enqueue_action("attack")
+            eng.step()
+
+        yield f"collision.step.{count}", step
+
+
+def measure_alloc(fn: Callable[[], object], ticks: int = 2000, warmup: int = 200) -> Tuple[float, float]:
+    """Return ``(peak, retained)`` bytes per call of ``fn`` under ``tracemalloc``."""
+
+    for _ in range(warmup):
+        fn()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peak = 0
+        for _ in range(ticks):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(peak), (end - start) / ticks
+
+
+def alloc_benches() -> Iterator[Bench]:
+    """One attacking tick per boss type."""
+
+    assets = get_assets()
+    for boss_id in assets.boss_ids():
+        enemy = assets.create_enemy(boss_id)
+        eng = GameEngine(player=Knight(name="Bench"), enemy=enemy)
+
+        def step(eng: GameEngine = eng, enemy=enemy) -> None:
+            # Keep the fight going: nobody dies, the boss stays in reach
+            eng.player.health = enemy.health = 10**9
+            enemy.position = (90, 50)
+            eng.enqueue_action("attack")
+            eng.step()
+
+        yield f"alloc.engine.step.{boss_id}", step
+
+
+def _profile(i: int) -> Dict:
+    return {
+        "name": f"Knight{i}",
+        "health": 100,
+        "stamina": 100.0,
+        "position": [50, 50],
+        "gold": i % 500,
+        "skin": "default",
+        "progress": {"defeated": []},
+    }
+
+
+def storage_benches(tmp: Path, sizes: List[int]) -> Iterator[Bench]:
+    """Profile store operations for each backend at each profile count."""
+
+    for size in sizes:
+        profiles = {f"Knight{i}": _profile(i) for i in range(size)}
+        stores = {
+            "sqlite": storage.SqliteStore(tmp / f"bench-{size}.db"),
+            "json": storage.JsonStore(tmp / f"bench-{size}.json"),
+        }
+        for kind, store in stores.items():
+            store.write_batch(profiles)
+            target = _profile(size // 2)
+
+            def churn(store: storage.ProfileStore = store) -> None:
+                store.delete("Churn")
+                store.save({**target, "name": "Churn"})
+
+            yield f"storage.{kind}.{size}.save", lambda store=store: store.save(target)
+            yield f"storage.{kind}.{size}.load", lambda store=store: store.load(target["name"])
+            yield f"storage.{kind}.{size}.delete_save", churn
+            yield f"storage.{kind}.{size}.list", store.list_all
+
+        index = SortedKeys((-p["gold"], name) for name, p in profiles.items())
+        moving = [(-1, "Mover")]
+        index.add(moving[0])
+
+        def rerank() -> None:
+            index.remove(moving[0])
+            moving[0] = (-((-moving[0][0] + 1) % 500), "Mover")
+            index.add(moving[0])
+
+        yield f"leaderboard.{size}.update", rerank
+        yield f"leaderboard.{size}.page", lambda: index.slice(size // 2, 20)
+
+
+def api_benches(tmp: Path) -> Iterator[Bench]:
+    """Every Flask route through the test client."""
+
+    from game.api import create_app
+
+    storage.set_store(storage.SqliteStore(tmp / "api.db"))
+    app = create_app(start_scheduler=False, profile_flush_interval=None, checkpoint_interval=None)
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Bencher"})
+    client.post("/api/start_boss/ogre", json={"name": "Bencher"})
+    counter = iter(range(10**9))
+
+    def create_delete() -> None:
+        name = "Bench" + "".join(chr(97 + int(d)) for d in str(next(counter)))
+        client.post("/api/knight", json={"name": name})
+        client.delete(f"/api/knight/{name}")
+
+    yield "api.index", lambda: client.get("/")
+    yield "api.knight.create_delete", create_delete
+    yield "api.knight.read", lambda: client.get("/api/knight/Bencher")
+    yield "api.knight.update", lambda: client.put("/api/knight/Bencher", json={"gold": 5})
+    yield "api.start_boss", lambda: client.post("/api/start_boss/ogre", json={"name": "Bencher"})
+    yield "api.action", lambda: client.post("/api/action", json={"action": "attack"})
+    batch = [{"action": a, "client_frame": 0} for a in ("move_left", "attack", "move_right", "attack")]
+    yield "api.actions.batch4", lambda: client.post("/api/actions", json=batch)
+    yield "api.state", lambda: client.get("/api/state")
+    yield "api.state.delta", lambda: client.get("/api/state?base=0&epoch=0")
+    yield "api.events", lambda: client.get("/api/events?since=0")
+    yield "api.save", lambda: client.get("/api/save/Bencher")
+    yield "api.load", lambda: client.get("/api/load/Bencher")
+    yield "api.metrics", lambda: client.get("/api/metrics")
+    yield "api.leaderboard", lambda: client.get("/api/leaderboard?by=gold&offset=0&limit=20")
+
+    from game.crud import create_knights, delete_knights
+
+    bulk = ["Bulk" + "".join(chr(97 + int(d)) for d in f"{i:03d}") for i in range(100)]
+
+    def bulk_create_delete() -> None:
+        create_knights(bulk)
+        delete_knights(bulk)
+
+    yield "crud.bulk.create_delete.100", bulk_create_delete
+
+
+def run(pattern: Optional[str], sizes: List[int]) -> Dict[str, float]:
+    """Run every benchmark whose name matches ``pattern``."""
+
+    rx = re.compile(pattern) if pattern else None
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        groups = (engine_benches(), replay_benches(), collision_benches(), storage_benches(Path(tmp), sizes), api_benches(Path(tmp)))
+        for group in groups:
+            for name, fn in group:
+                if rx and not rx.search(name):
+                    continue
+                results[name] = measure(fn)
+                print(f"{name:<40}{results[name] * 1e6:>14.2f} us", flush=True)
+        for name, fn in alloc_benches():
+            if rx and not rx.search(name):
+                continue
+            peak, retained = measure_alloc(fn)
+            results[f"{name}.peak"], results[f"{name}.retained"] = peak, retained
+            print(f"{name + '.peak':<40}{peak:>14.0f} B", flush=True)
+            print(f"{name + '.retained':<40}{retained:>14.2f} B", flush=True)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed metrics."""
+
+    regressed = []
+    print(f"\n{'metric':<40}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if name.startswith("alloc."):
+            # Bytes: a jump from ~0 is a regression even without a ratio
+            change = 100.0 * (now - before) / before if before else (100.0 if now > 64 else 0.0)
+            flag = ""
+            if change > threshold:
+                regressed.append(name)
+                flag = "  REGRESSION"
+            print(f"{name:<40}{before:>12.1f} B{now:>12.1f} B{change:>8.1f}%{flag}")
+            continue
+        change = 100.0 * (now - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{before * 1e6:>11.2f} us{now * 1e6:>11.2f} us{change:>8.1f}%{flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parse arguments, run the suite, save and/or compare results."""
+
+    parser = argparse.ArgumentParser(description="Benchmark engine, storage and API.")
+    parser.add_argument("--filter", help="regex selecting benchmark names")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 1000, 100_000], help="profile counts")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.sizes)
+    if args.save:
+        meta = {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform()}
+        Path(args.save).write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} metric(s) regressed by more than {args.threshold}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,50 @@
 """Abstract base classes for the game.
 
 Contains the abstract ``Character`` class which defines the contract for
-all characters (player and enemies) in the game.
+all characters (player and enemies) in the game, and the ``Hitbox`` record
+their attacks return.
 """
 
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import ClassVar, Tuple
+
+
+class Hitbox:
+    """Axis-aligned attack box, reused across ticks to avoid allocations.
+
+    Each character owns one ``Hitbox`` and refills it with :meth:`set` on
+    every attack, so callers must read it before the same character attacks
+    again. Item access (``hb["x"]``) is kept for code written against the old
+    dict hitboxes.
+    """
+
+    __slots__ = ("x", "y", "w", "h", "damage")
+    type: ClassVar[str] = "aabb"
+
+    def __init__(self, x: int = 0, y: int = 0, w: int = 0, h: int = 0, damage: int = 0) -> None:
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.damage = damage
+
+    def set(self, x: int, y: int, w: int, h: int, damage: int) -> "Hitbox":
+        """Overwrite every field in place and return ``self``."""
+
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.damage = damage
+        return self
+
+    def __getitem__(self, key: str) -> object:
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return f"Hitbox(x={self.x}, y={self.y}, w={self.w}, h={self.h}, damage={self.damage})"
 
 
 class Character(ABC):
@@ -18,6 +55,8 @@ class Character(ABC):
     whether they are alive.
     """
 
+    __slots__ = ()
+
     name: str
     health: int
     position: Tuple[int, int]
@@ -33,15 +72,14 @@ class Character(ABC):
         """
 
     @abstractmethod
-    def attack(self) -> dict:
+    def attack(self) -> Hitbox:
         """Perform an attack and return a description of the hitbox.
 
         Returns
         -------
-        dict
-            A dictionary that describes an axis-aligned box attack, e.g.::
-
-                {"type": "aabb", "x": 10, "y": 10, "w": 20, "h": 10, "damage": 5}
+        Hitbox
+            The character's own reusable hitbox, refilled for this attack,
+            e.g. ``Hitbox(x=10, y=10, w=20, h=10, damage=5)``.
         """
 
     @abstractmethod
@@ -0,0 +1,247 @@
+"""Single-owner actors around per-session engines.
+
+Request threads and the tick scheduler used to touch the same
+:class:`game.engine.GameEngine` concurrently: ``/api/action`` appended
+inputs and ``/api/start_boss`` swapped the enemy while the scheduler was in
+the middle of a step, and ``/api/state`` built a snapshot of an engine that
+was changing under it. A global lock would fix that by serialising every
+player behind one another.
+
+Instead every session's engine is wrapped in an :class:`EngineActor` and
+only its owner, the scheduler thread, ever runs engine code:
+
+- requests :meth:`~EngineActor.post` messages (callables taking the engine)
+  to the actor's mailbox, or :meth:`~EngineActor.call` them and wait for
+  the result;
+- the owner drains mailboxes at the start of every tick and whenever a
+  message arrives between ticks, then steps the engines;
+- after draining or stepping, the owner publishes a new :class:`Published`
+  view (snapshot, frame, fight identity) by swapping one reference, so
+  readers such as ``/api/state`` and ``/api/stream`` never lock and never
+  see a half-updated engine.
+
+The few things that cannot wait for the owner thread (checkpointing a
+session while it is evicted, the final checkpoints at exit) take the owner
+role for a moment with :meth:`EngineActor.run`: the owner holds the same
+per-actor lock while draining or stepping an engine, so they never see it
+half-stepped.
+
+Sessions share nothing, so they never contend with each other. Like the
+event ring (:mod:`game.events`), published views are written by one
+thread and must not be mutated by readers.
+
+Idle sessions can be *parked* (see :class:`game.scheduler.TickScheduler`):
+the owner stops stepping the engine and sets :attr:`EngineActor.resume`,
+which catches it up in one go (:meth:`GameEngine.fast_forward`) before
+the next message runs. Readers that need the present state rather than
+the last published one use :meth:`EngineActor.current`.
+
+Without a running owner (``start_scheduler=False``, benchmarks, scripts)
+messages run inline on the posting thread, which then acts as the owner.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Tuple, TypeVar
+
+from .engine import GameEngine
+from .metrics import timed
+
+T = TypeVar("T")
+
+CALL_TIMEOUT = 5.0  # seconds a request waits for the owner to run its message
+
+log = logging.getLogger(__name__)
+
+
+class Published(NamedTuple):
+    """Read-only view of an engine, published by its owner.
+
+    Attributes
+    ----------
+    frame:
+        Engine frame when published.
+    snapshot:
+        :meth:`GameEngine.snapshot` at that frame.
+    identity:
+        ``(id(player), id(enemy))``: changes when a new fight starts.
+    active:
+        Whether the fight was in progress.
+    """
+
+    frame: int
+    snapshot: Dict[str, object]
+    identity: Tuple[int, int]
+    active: bool
+
+    @classmethod
+    def of(cls, engine: GameEngine) -> "Published":
+        return cls(engine.frame, engine.snapshot(), (id(engine.player), id(engine.enemy)), engine.active)
+
+
+def _noop(engine: GameEngine) -> None:
+    return None
+
+
+class _Reply:
+    """Result slot of a :meth:`EngineActor.call`; ``done`` is released when set."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.value: object = None
+        self.error: Optional[BaseException] = None
+
+
+class EngineActor:
+    """Mailbox and published view of one engine.
+
+    Parameters
+    ----------
+    engine:
+        Engine owned by the actor. Only the owner thread may touch it
+        once the actor is shared.
+    notify:
+        Called with the actor when its mailbox goes from empty to
+        non-empty; returns ``False`` when no owner is running, in which
+        case the message runs inline.
+    """
+
+    def __init__(self, engine: GameEngine, notify: Optional[Callable[["EngineActor"], bool]] = None) -> None:
+        self.engine = engine
+        self.notify = notify
+        self.published = Published.of(engine)
+        self.processed = 0
+        self.parked_at: Optional[int] = None  # scheduler tick the engine was parked at
+        self.resume: Optional[Callable[["EngineActor"], None]] = None
+        self._mailbox: Deque[Tuple[Callable[[GameEngine], object], Optional[_Reply]]] = deque()
+        self._scheduled = False
+        self._lock = threading.Lock()  # guards _scheduled only
+        self._owner = threading.RLock()  # held while running engine code
+
+    def __len__(self) -> int:
+        return len(self._mailbox)
+
+    @property
+    def snapshot(self) -> Dict[str, object]:
+        """Latest published snapshot (do not mutate)."""
+
+        return self.published.snapshot
+
+    def current(self) -> Published:
+        """Return the published view, catching a parked engine up first."""
+
+        if self.resume is not None:
+            self.call(_noop)
+        return self.published
+
+    def post(self, message: Callable[[GameEngine], object]) -> None:
+        """Queue ``message(engine)`` for the owner without waiting.
+
+        Messages run in posting order; an exception raised by a posted
+        message is logged and does not affect the others.
+        """
+
+        self._send(message, None)
+
+    def call(self, message: Callable[[GameEngine], T], timeout: Optional[float] = CALL_TIMEOUT) -> T:
+        """Run ``message(engine)`` on the owner and return its result.
+
+        Re-raises the message's exception, or ``TimeoutError`` after
+        ``timeout`` seconds (the message still runs later).
+        """
+
+        reply = _Reply()
+        self._send(message, reply)
+        if not reply.done.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("engine owner did not answer in time")
+        if reply.error is not None:
+            raise reply.error
+        return reply.value  # type: ignore[return-value]
+
+    def _send(self, message: Callable[[GameEngine], object], reply: Optional[_Reply]) -> None:
+        self._mailbox.append((message, reply))
+        with self._lock:
+            wake = not self._scheduled
+            self._scheduled = True
+        if wake and (self.notify is None or not self.notify(self)):
+            self.drain()
+
+    def drain(self) -> int:
+        """Run every queued message, then publish. Owner only.
+
+        Returns how many messages ran.
+        """
+
+        with self._owner:
+            with self._lock:
+                self._scheduled = False
+            self.unpark()
+            count = 0
+            mailbox = self._mailbox
+            while mailbox:
+                message, reply = mailbox.popleft()
+                count += 1
+                try:
+                    value = message(self.engine)
+                except Exception as exc:
+                    if reply is None:
+                        log.exception("posted engine message failed")
+                        continue
+                    reply.error = exc
+                else:
+                    if reply is None:
+                        continue
+                    reply.value = value
+                reply.done.release()
+            if count:
+                self.processed += count
+                self.publish()
+            return count
+
+    def run(self, message: Callable[[GameEngine], T]) -> T:
+        """Run ``message(engine)`` on the calling thread, as the owner.
+
+        Waits for the owner to finish its current message or step. Only for
+        short work that cannot go through :meth:`call` because the caller
+        holds a lock the owner may need (e.g. the session registry's).
+        """
+
+        with self._owner:
+            return message(self.engine)
+
+    def step(self, dt: float) -> None:
+        """Step the engine once and publish. Owner only."""
+
+        with self._owner:
+            self.engine.step(dt)
+            self.publish()
+
+    def unpark(self) -> None:
+        """Run the pending catch-up of a parked engine, if any. Owner only."""
+
+        resume, self.resume = self.resume, None
+        if resume is not None:
+            resume(self)
+
+    def settle(self) -> None:
+        """Catch a parked engine up from any thread, e.g. once it is evicted."""
+
+        with self._owner:
+            self.unpark()
+
+    def publish(self) -> None:
+        """Publish the engine's current state. Owner only."""
+
+        engine = self.engine
+        metrics = engine.metrics
+        if metrics is not None and engine.frame % metrics.sample_every == 0:
+            with timed(metrics.snapshot):
+                self.published = Published.of(engine)
+        else:
+            self.published = Published.of(engine)
@@ -3,35 +3,153 @@
 Endpoints
 ---------
 - ``GET /`` -> render main page
+- ``GET /assets/<file>`` -> fingerprinted, precompressed static files (see
+  :mod:`game.static_assets`)
 - CRUD Knight: ``POST /api/knight``, ``GET/PUT/DELETE /api/knight/<name>``
-- Game: ``POST /api/start_boss/<boss_id>``, ``POST /api/action``, ``GET /api/state``
+- Bulk CRUD (admin): ``POST/PUT/DELETE /api/knights``,
+  ``POST /api/knights/import`` and ``GET /api/knights/export`` (NDJSON)
+- Game: ``POST /api/start_boss/<boss_id>``, ``POST /api/start_rush`` (every
+  boss of ``levels.json`` in order), ``POST /api/action``, ``GET /api/state``
+- Batched input: ``POST /api/actions`` (many frame-stamped actions per request)
+- Streaming: ``GET /api/stream`` (Server-Sent Events, one message per new frame)
+- Events: ``GET /api/events?since=<seq>`` (hit / damage events after a cursor)
+- Monitoring: ``GET /api/scheduler``, ``GET /api/metrics`` (Prometheus text format)
+- Admin: ``POST /api/admin/profile?seconds=<s>|ticks=<n>`` (collapsed stacks,
+  needs the ``X-Admin-Token`` header; see :mod:`game.profiler`)
+- Replay: ``GET /api/replay`` (recording of the current fight, see :mod:`game.replay`)
 - Persistence: ``GET /api/save/<name>``, ``GET /api/load/<name>``
+- Rankings: ``GET /api/leaderboard?by=gold|defeated|best_time&offset=&limit=``
+
+Every client gets its own engine, keyed by a session token read from the
+``X-Session-Id`` header or the ``session_id`` cookie (issued on first visit);
+see :mod:`game.sessions`. Running fights are checkpointed to disk
+(:mod:`game.checkpoint`) every few seconds, on eviction, on save and at
+exit, and a returning token resumes its fight from the latest checkpoint.
+Engines are advanced by a fixed-rate background
+:class:`game.scheduler.TickScheduler`, so game speed no longer depends on how
+often clients call the API. The scheduler thread is the only one that
+touches engines: routes post messages to the session's
+:class:`game.actor.EngineActor` and read the state it last published, so
+requests never lock an engine and sessions never contend with each other.
+
+Request latency per route, sampled engine phase times, scheduler tick time,
+storage calls and session / queue gauges are collected in
+:data:`game.metrics.REGISTRY` and scraped from ``/api/metrics``.
 
 Modules from the cátedra used with purpose
 -----------------------------------------
 - ``collections.deque``: Input buffer in engine
-- ``queue.Queue``: Event bus between API and engine
+- Ring buffer (:class:`game.events.EventRing`): Event bus between engine and API
 - ``json``: Persist profiles and assets
 - ``re``: Validate knight names
 """
 
 from __future__ import annotations
 
-from typing import Dict, Optional
+import atexit
+import hmac
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request, stream_with_context
 from pathlib import Path
 
-from .crud import create_knight, delete_knight_profile, read_knight, update_knight
+from .actor import EngineActor
+from .cache import ProfileCache
+from .checkpoint import CHECKPOINT_DIR, Checkpointer, CheckpointStore
+from .codec import BINARY_MIMETYPE, pack_binary
+from .crud import (
+    NOT_FOUND,
+    create_knight,
+    create_knights,
+    delete_knight_profile,
+    delete_knights,
+    export_knights,
+    import_knights,
+    read_knight,
+    record_kills,
+    record_rush,
+    update_knight,
+    update_knights,
+)
 from .engine import GameEngine
 from .entities import Knight
-from .level import create_enemy
-from .storage import load_knight, save_knight
-from .utils import clamp_position
+from .leaderboard import PAGE_MAX, get_leaderboard
+from .level import create_enemy, get_assets
+from .metrics import REGISTRY, StepMetrics
+from .profiler import SamplingProfiler, collapsed
+from .replay import FightRecorder
+from . import static_assets
+from .scheduler import TickScheduler
+from .sessions import SESSION_COOKIE, SESSION_HEADER, SessionRegistry, new_token
+from .storage import get_store, load_knight, save_knight, set_store
+
+STREAM_KEEPALIVE = 15.0  # seconds between keepalive comments on idle streams
+STREAM_MAX_IDLE = 300.0  # close streams whose frame has not moved for this long
+EVENTS_MAX_LIMIT = 256  # most events returned by one /api/events call
+ACTIONS_MAX_BATCH = 64  # most entries accepted by one /api/actions call
+INPUT_LEAD_SECONDS = 2.0  # how far ahead (wall clock) /api/actions may schedule inputs
+ADMIN_HEADER = "X-Admin-Token"
+BULK_MAX_BATCH = 10_000  # most items in one bulk CRUD request
 
 
-def create_app() -> Flask:
-    """Application factory that wires the engine and routes."""
+def create_app(
+    max_sessions: int = 10_000,
+    idle_timeout: Optional[float] = 900.0,
+    snapshot_on_evict: bool = True,
+    tick_hz: float = 10.0,
+    start_scheduler: bool = True,
+    profile_flush_interval: Optional[float] = 1.0,
+    checkpoint_interval: Optional[float] = 5.0,
+    checkpoint_dir: Path = CHECKPOINT_DIR,
+    metrics_sample_every: Optional[int] = 16,
+    admin_token: Optional[str] = None,
+    park_after: Optional[float] = 30.0,
+) -> Flask:
+    """Application factory that wires the session registry and routes.
+
+    Parameters
+    ----------
+    max_sessions:
+        Cap on concurrently live sessions (LRU eviction beyond it).
+    idle_timeout:
+        Seconds after which an untouched session is evicted.
+    snapshot_on_evict:
+        Keep the final snapshot of evicted sessions for ``/api/state``.
+    tick_hz:
+        Engine steps per second run by the background scheduler. Every
+        step advances :data:`game.engine.STEP_DT` of game time, as each
+        poll did when the frontend drove the engine, so entity speeds,
+        timers and the one-input-per-frame rule keep their per-frame
+        meaning; the rate only sets how many frames run per second (the
+        frontend used to step about 5 times per second plus once per
+        action). Input lead windows are given in seconds and converted
+        with it.
+    start_scheduler:
+        Start the scheduler thread immediately (disable to step manually).
+    profile_flush_interval:
+        Put a write-behind :class:`game.cache.ProfileCache` in front of the
+        profile store, flushing every this many seconds (and at exit).
+        ``None`` keeps synchronous writes.
+    checkpoint_interval:
+        Seconds between engine checkpoints of running fights. ``None``
+        disables checkpointing and resuming.
+    checkpoint_dir:
+        Directory of the per-session checkpoint files.
+    metrics_sample_every:
+        Time the phases of one engine step in this many for
+        ``/api/metrics``. ``None`` disables phase timing.
+    admin_token:
+        Secret expected in the ``X-Admin-Token`` header of admin endpoints;
+        defaults to the ``GAME_ADMIN_TOKEN`` environment variable. Without
+        one the admin endpoints are disabled.
+    park_after:
+        Seconds without a request after which a session's engine is parked
+        and no longer stepped; it catches up in one go on its next request.
+        ``None`` keeps stepping idle sessions.
+    """
 
     root = Path(__file__).resolve().parents[1]
     app = Flask(
@@ -41,15 +159,150 @@ def create_app() -> Flask:
         static_url_path="/static",
     )
 
-    # Global engine (simple single-session model for academic demo)
-    engine: Optional[GameEngine] = None
+    static_assets.init_app(app)
+
+    # Load and validate assets up front so bad data fails at startup
+    app.extensions["assets"] = get_assets()
+
+    store = get_store()
+    if profile_flush_interval is not None and not isinstance(store, ProfileCache):
+        store = ProfileCache(store, flush_interval=profile_flush_interval)
+        set_store(store)
+        store.start()
+        atexit.register(store.close)
+    app.extensions["profiles"] = store
+
+    step_metrics = StepMetrics(REGISTRY, metrics_sample_every) if metrics_sample_every is not None else None
+    sessions = SessionRegistry(
+        max_sessions=max_sessions,
+        idle_timeout=idle_timeout,
+        snapshot_on_evict=snapshot_on_evict,
+        step_metrics=step_metrics,
+    )
+    app.extensions["sessions"] = sessions
+    scheduler = TickScheduler(sessions, hz=tick_hz, park_after=park_after)
+    input_lead = max(1, round(INPUT_LEAD_SECONDS * tick_hz))  # frames
+    app.extensions["scheduler"] = scheduler
+    app.extensions["metrics"] = REGISTRY
+    _register_metrics(sessions, scheduler)
+
+    def on_rush_end(eng: GameEngine) -> None:
+        """Write the stage times of a finished boss rush to the profile.
+
+        Runs on the scheduler thread; with the profile cache the write only
+        touches memory.
+        """
+        wave = eng.wave
+        assert wave is not None
+        stages = [(boss_id, round(frames * scheduler.period, 3)) for boss_id, frames in zip(wave.order, wave.stage_frames)]
+        try:
+            record_rush(eng.player.name, stages, wave.cleared)
+        except Exception:  # a failed write must not stop the scheduler
+            app.logger.exception("could not record boss rush of %s", eng.player.name)
+
+    def resume_rush(eng: Optional[GameEngine]) -> Optional[GameEngine]:
+        """Re-attach the end-of-run hook to a boss rush restored from a checkpoint."""
+        if eng is not None and eng.wave is not None:
+            eng.wave.on_end = on_rush_end
+        return eng
+
+    checkpoints: Optional[Checkpointer] = None
+    if checkpoint_interval is not None:
+        checkpoints = Checkpointer(CheckpointStore(checkpoint_dir), sessions, interval=checkpoint_interval)
+        restore = checkpoints.restore
+        sessions.restore = lambda token: resume_rush(restore(token))
+        sessions.on_evict = checkpoints.checkpoint
+        checkpoints.attach(scheduler)
+        checkpoints.start()
+
+        def shutdown() -> None:
+            """Stop stepping engines, then write their final checkpoints."""
+            scheduler.stop()
+            checkpoints.close()  # type: ignore[union-attr]
+
+        atexit.register(shutdown)
+    app.extensions["checkpoints"] = checkpoints
+
+    if admin_token is None:
+        admin_token = os.environ.get("GAME_ADMIN_TOKEN") or None
+    profiler = SamplingProfiler(ticks=lambda: scheduler.ticks)
+    app.extensions["profiler"] = profiler
+
+    if start_scheduler:
+        scheduler.start()
+
+    @app.before_request
+    def start_timer() -> None:
+        """Note when the request started, for the latency histogram."""
+
+        g.request_started = time.perf_counter()
+
+    @app.before_request
+    def resolve_session() -> None:
+        """Attach the caller's session token to ``g`` (issuing one if absent)."""
+
+        token = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+        g.new_session = not token
+        g.session_token = token or new_token()
+
+    @app.after_request
+    def issue_session_cookie(response):  # type: ignore[no-untyped-def]
+        """Send the session cookie to clients that did not present one."""
+
+        if getattr(g, "new_session", False):
+            response.set_cookie(SESSION_COOKIE, g.session_token, httponly=True, samesite="Lax")
+        return response
+
+    @app.after_request
+    def record_latency(response):  # type: ignore[no-untyped-def]
+        """Observe the request time per route (streams: time to first byte)."""
 
-    def get_engine() -> GameEngine:
-        nonlocal engine
-        if engine is None:
-            # Default player stub; actual player is loaded on start
-            engine = GameEngine(player=Knight(name="Player"))
-        return engine
+        started = getattr(g, "request_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REGISTRY.histogram(
+                "http_request_duration_seconds", "Request handling time per route", route=route, method=request.method
+            ).observe(time.perf_counter() - started)
+            REGISTRY.counter(
+                "http_requests_total",
+                "Requests per route and status",
+                route=route,
+                method=request.method,
+                status=str(response.status_code),
+            ).inc()
+        return response
+
+    @app.errorhandler(TimeoutError)
+    def engine_busy(_exc: TimeoutError):  # type: ignore[no-untyped-def]
+        """The scheduler did not get to the session's message in time."""
+
+        return jsonify({"error": "engine busy, retry"}), 503
+
+    def admin_error():  # type: ignore[no-untyped-def]
+        """Return an error response unless the request carries the admin token."""
+
+        if admin_token is None:
+            return jsonify({"error": "admin endpoints disabled"}), 404
+        given = request.headers.get(ADMIN_HEADER, "")
+        if not hmac.compare_digest(given.encode("utf-8"), admin_token.encode("utf-8")):
+            return jsonify({"error": "forbidden"}), 403
+        return None
+
+    def bulk_items(key: str):  # type: ignore[no-untyped-def]
+        """Return the list in the body (bare or under ``key``), or an error response."""
+
+        payload = request.get_json(silent=True)
+        items = payload.get(key) if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            return None, (jsonify({"error": f"expected a list of {key}"}), 400)
+        if len(items) > BULK_MAX_BATCH:
+            return None, (jsonify({"error": f"at most {BULK_MAX_BATCH} items per request"}), 400)
+        return items, None
+
+    def get_actor() -> EngineActor:
+        """Return the actor owning the current request's session engine."""
+
+        return sessions.get_or_create(g.session_token).actor
 
     @app.get("/")
     def index() -> str:
@@ -62,8 +315,13 @@ def create_app() -> Flask:
     def api_create_knight():  # type: ignore[override]
         """Create a new knight profile from JSON payload {name}."""
         payload: Dict = request.get_json(force=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({"error": "expected an object with a name"}), 400
         name: str = str(payload.get("name", "")).strip()
-        profile = create_knight(name)
+        try:
+            profile = create_knight(name)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
         return jsonify(profile), 201
 
     @app.get("/api/knight/<name>")
@@ -78,7 +336,12 @@ def create_app() -> Flask:
     def api_update_knight(name: str):  # type: ignore[override]
         """Update a knight profile with provided fields."""
         updates: Dict = request.get_json(force=True) or {}
-        profile = update_knight(name, updates)
+        if not isinstance(updates, dict):
+            return jsonify({"error": "expected an object of fields"}), 400
+        try:
+            profile = update_knight(name, updates)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 404 if str(exc) == NOT_FOUND else 400
         return jsonify(profile)
 
     @app.delete("/api/knight/<name>")
@@ -87,6 +350,56 @@ def create_app() -> Flask:
         ok = delete_knight_profile(name)
         return ("", 204) if ok else (jsonify({"error": "not found"}), 404)
 
+    # Bulk CRUD endpoints (admin)
+    @app.post("/api/knights")
+    def api_create_knights():  # type: ignore[override]
+        """Create many knights from ``["name", ...]`` or ``{"names": [...]}``."""
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        names, error = bulk_items("names")
+        if error is not None:
+            return error
+        return jsonify(create_knights(names))
+
+    @app.put("/api/knights")
+    def api_update_knights():  # type: ignore[override]
+        """Update many knights from ``[{"name": ..., <fields>}, ...]`` or ``{"updates": [...]}``."""
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        updates, error = bulk_items("updates")
+        if error is not None:
+            return error
+        return jsonify(update_knights(updates))
+
+    @app.delete("/api/knights")
+    def api_delete_knights():  # type: ignore[override]
+        """Delete many knights from ``["name", ...]`` or ``{"names": [...]}``."""
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        names, error = bulk_items("names")
+        if error is not None:
+            return error
+        return jsonify(delete_knights(names))
+
+    @app.post("/api/knights/import")
+    def api_import_knights():  # type: ignore[override]
+        """Create or replace knights from an NDJSON body, read as it streams in."""
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        return jsonify(import_knights(request.stream))
+
+    @app.get("/api/knights/export")
+    def api_export_knights():  # type: ignore[override]
+        """Stream every profile as NDJSON."""
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        return Response(stream_with_context(export_knights()), mimetype="application/x-ndjson")
+
     # Game endpoints
     @app.post("/api/start_boss/<boss_id>")
     def api_start_boss(boss_id: str):  # type: ignore[override]
@@ -99,59 +412,329 @@ def create_app() -> Flask:
         if not profile:
             return jsonify({"error": "profile not found"}), 404
 
-        k = Knight(
-            name=profile["name"],
-            health=int(profile.get("health", 100)),
-            stamina=float(profile.get("stamina", 100.0)),
-            position=tuple(profile.get("position", [50, 50])),
-        )
-        k.gold = int(profile.get("gold", 0))
+        k = _knight_from_profile(profile)
+        try:
+            enemy = create_enemy(boss_id)
+        except ValueError:
+            return jsonify({"error": "unknown boss"}), 404
+
+        def start(eng: GameEngine) -> None:
+            eng.player = k
+            eng.start_boss(enemy)
+            eng.recorder = FightRecorder(eng)
 
-        eng = get_engine()
-        eng.player = k
-        eng.start_boss(create_enemy(boss_id))
+        session = sessions.get_or_create(g.session_token)
+        session.boss_id = boss_id
+        session.actor.call(start)
         return jsonify({"ok": True, "boss": boss_id})
 
+    @app.post("/api/start_rush")
+    def api_start_rush():  # type: ignore[override]
+        """Start a boss rush through the ``levels.json`` order for player ``name``.
+
+        The knight carries its health and stamina from stage to stage and
+        the stage times are written to ``progress.rush`` when the run ends.
+        """
+        payload: Dict = request.get_json(silent=True) or {}
+        name = payload.get("name")
+        if not name:
+            return jsonify({"error": "name required"}), 400
+        profile = load_knight(name)
+        if not profile:
+            return jsonify({"error": "profile not found"}), 404
+        assets = app.extensions["assets"]
+        order = assets.order()
+        if not order:
+            return jsonify({"error": "no boss-rush order configured"}), 404
+        k = _knight_from_profile(profile)
+
+        def start(eng: GameEngine) -> None:
+            eng.player = k
+            eng.start_wave(order, assets.create_enemy, on_end=on_rush_end)
+            eng.recorder = FightRecorder(eng)
+
+        session = sessions.get_or_create(g.session_token)
+        session.boss_id = None
+        session.actor.call(start)
+        return jsonify({"ok": True, "order": order})
+
     @app.post("/api/action")
     def api_action():  # type: ignore[override]
-        """Enqueue a player action and advance one engine step."""
+        """Enqueue a player action; the scheduler applies it on a later tick.
+
+        Does not wait for the scheduler: ``frame`` is the last published one.
+        """
         payload: Dict = request.get_json(force=True) or {}
         action: str = str(payload.get("action", "")).strip()
-        eng = get_engine()
-        eng.enqueue_action(action)
-        eng.step()
-        # Clamp position to arena each step
-        eng.player.position = clamp_position(eng.player.position)
-        return jsonify({"ok": True})
+        actor = get_actor()
+        actor.post(lambda eng: eng.enqueue_action(action))
+        return jsonify({"ok": True, "frame": actor.published.frame})
+
+    @app.post("/api/actions")
+    def api_actions():  # type: ignore[override]
+        """Enqueue a batch of ``[{action, client_frame}, ...]`` inputs.
+
+        The body is the list itself or ``{"inputs": [...]}``. Redundant
+        entries are coalesced and the rest scheduled at their target frames
+        (see :meth:`game.engine.GameEngine.enqueue_batch`), at most
+        ``INPUT_LEAD_SECONDS`` of ticks ahead. The response
+        carries the current frame and the frame of the last accepted input.
+        """
+        payload = request.get_json(silent=True)
+        entries = payload.get("inputs") if isinstance(payload, dict) else payload
+        if not isinstance(entries, list):
+            return jsonify({"error": "expected a list of inputs"}), 400
+        if len(entries) > ACTIONS_MAX_BATCH:
+            return jsonify({"error": f"at most {ACTIONS_MAX_BATCH} inputs per request"}), 400
+        batch = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get("action"), str):
+                return jsonify({"error": "each input needs an action"}), 400
+            client_frame = entry.get("client_frame", 0)
+            if not isinstance(client_frame, int) or isinstance(client_frame, bool):
+                return jsonify({"error": "client_frame must be an integer"}), 400
+            batch.append((client_frame, entry["action"].strip()))
+
+        try:
+            frame, targets = get_actor().call(lambda eng: (eng.frame, eng.enqueue_batch(batch, input_lead)))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify(
+            {
+                "ok": True,
+                "frame": frame,
+                "accepted": len(targets),
+                "last_frame": targets[-1] if targets else None,
+            }
+        )
 
     @app.get("/api/state")
     def api_state():  # type: ignore[override]
-        """Return a JSON snapshot of the current game state."""
-        eng = get_engine()
-        # Run a passive step to keep enemy patterns moving even without input
-        eng.step()
-        eng.player.position = clamp_position(eng.player.position)
-        return jsonify(eng.snapshot())
+        """Return the current game state (read-only).
+
+        Without query parameters this is the full JSON snapshot. With
+        ``base=<frame>&epoch=<epoch>`` from a previous encoded response, only
+        the fields changed since that frame are sent (or a keyframe when the
+        base is unknown). ``Accept: application/octet-stream`` selects the
+        compact binary encoding of :mod:`game.codec`. The state is the one
+        the scheduler last published; reading it takes no lock unless the
+        engine was parked and has to catch up first.
+        """
+        resumable = checkpoints is not None and checkpoints.has(g.session_token)
+        if g.session_token not in sessions and not resumable:
+            final = sessions.evicted_snapshot(g.session_token)
+            if final is not None:
+                return jsonify({**final, "evicted": True})
+        session = sessions.get_or_create(g.session_token)
+        published = session.actor.current()
+        snap = published.snapshot
+        binary = request.accept_mimetypes.best_match(["application/json", BINARY_MIMETYPE]) == BINARY_MIMETYPE
+        base = request.args.get("base", type=int)
+        if base is None and not binary:
+            return jsonify(snap)
+
+        message = session.encoder.encode(
+            snap,
+            identity=published.identity,
+            base=base,
+            epoch=request.args.get("epoch", type=int),
+        )
+        if binary:
+            return Response(pack_binary(message, snap["enemy"] is not None), mimetype=BINARY_MIMETYPE)
+        return jsonify(message)
+
+    @app.get("/api/events")
+    def api_events():  # type: ignore[override]
+        """Return the engine events (hits, damage) after a cursor.
+
+        ``since`` is the next sequence number the client wants (``next`` of
+        the previous response, 0 at first); without it the session's own
+        cursor is used. A client that fell too far behind gets a leading
+        ``{"type": "gap", ...}`` entry with the number of missed events.
+        ``limit`` caps the page size (at most ``EVENTS_MAX_LIMIT``).
+        """
+        session = sessions.get_or_create(g.session_token)
+        session.actor.current()
+        ring = session.engine.events  # single-writer ring, safe to read here
+        since = request.args.get("since", type=int)
+        if since is None:
+            since = session.event_cursor
+        limit = request.args.get("limit", default=EVENTS_MAX_LIMIT, type=int)
+        limit = max(1, min(limit, EVENTS_MAX_LIMIT))
+
+        events, session.event_cursor = ring.since(since, limit=limit)
+        return jsonify({"events": events, "next": session.event_cursor})
+
+    @app.get("/api/stream")
+    def api_stream():  # type: ignore[override]
+        """Push a snapshot over Server-Sent Events whenever the frame advances.
+
+        Only the latest state is ever sent: when the client reads slowly the
+        generator is simply resumed later and intermediate frames are
+        dropped. The stream ends with an ``end`` event once the fight is over.
+        Optional ``fps`` caps the push rate for constrained clients. A
+        watched session counts as used, so it is never parked.
+
+        New engine events precede their snapshot as an ``events`` message
+        shaped like the ``/api/events`` response (advancing the session's
+        event cursor), so streaming clients never poll for them.
+        """
+        token = g.session_token
+        session = sessions.get_or_create(token)
+        actor = session.actor
+        fps = request.args.get("fps", type=float)
+        min_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        def events() -> Iterator[str]:
+            last_sent = None
+            tick = scheduler.ticks
+            last_push = last_beat = time.monotonic()
+            while True:
+                sessions.get(token)  # keeps the session fresh (and unparked)
+                published = actor.current()
+                now = time.monotonic()
+                if published is not last_sent:
+                    last_sent = published
+                    last_push = last_beat = now
+                    ring = actor.engine.events  # single-writer ring, safe to read here
+                    if ring.next_seq != session.event_cursor:
+                        events, session.event_cursor = ring.since(session.event_cursor, limit=EVENTS_MAX_LIMIT)
+                        body = json.dumps({"events": events, "next": session.event_cursor})
+                        yield f"event: events\ndata: {body}\n\n"
+                    yield f"id: {published.frame}\ndata: {json.dumps(published.snapshot)}\n\n"
+                    if published.snapshot["enemy"] is not None and not published.active:
+                        yield "event: end\ndata: {}\n\n"
+                        return
+                    if min_interval:
+                        time.sleep(min_interval)
+                elif now - last_push >= STREAM_MAX_IDLE:
+                    return
+                elif now - last_beat >= STREAM_KEEPALIVE:
+                    last_beat = now
+                    # Comment line keeps proxies from closing the connection
+                    yield ": keepalive\n\n"
+                tick = scheduler.wait_tick(tick, timeout=STREAM_KEEPALIVE)
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+    @app.get("/api/replay")
+    def api_replay():  # type: ignore[override]
+        """Download the recording of the session's current or last fight.
+
+        Attach it to bug reports; ``python -m game.replay verify`` replays it.
+        """
+
+        def record(eng: GameEngine) -> Optional[bytes]:
+            return eng.recorder.recording(eng).to_bytes() if eng.recorder is not None else None
+
+        actor = get_actor()
+        data = actor.call(record)
+        if data is None:
+            return jsonify({"error": "no fight recorded"}), 404
+        name = actor.published.snapshot["player"]["name"]  # type: ignore[index]
+        headers = {"Content-Disposition": f'attachment; filename="fight-{name}.krpl"'}
+        return Response(data, mimetype="application/octet-stream", headers=headers)
+
+    @app.get("/api/scheduler")
+    def api_scheduler():  # type: ignore[override]
+        """Return tick scheduler, session registry and checkpoint counters."""
+        extra = checkpoints.stats() if checkpoints is not None else {}
+        return jsonify({**scheduler.stats(), **sessions.stats(), **extra})
+
+    @app.get("/api/metrics")
+    def api_metrics():  # type: ignore[override]
+        """Return all metrics in the Prometheus text exposition format."""
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.post("/api/admin/profile")
+    def api_admin_profile():  # type: ignore[override]
+        """Profile the server for ``seconds`` or the next ``ticks`` engine ticks.
+
+        Blocks for the duration and returns collapsed stacks (one
+        ``frame;frame;... count`` line per stack) for flamegraph tools.
+        ``interval_ms`` sets the sampling period and ``idle=1`` keeps
+        threads that were waiting for work.
+        """
+        denied = admin_error()
+        if denied is not None:
+            return denied
+        interval_ms = request.args.get("interval_ms", type=float)
+        if interval_ms is not None and not 0.1 <= interval_ms <= 1000:
+            return jsonify({"error": "interval_ms must be in [0.1, 1000]"}), 400
+        try:
+            stacks = profiler.profile(
+                seconds=request.args.get("seconds", type=float),
+                ticks=request.args.get("ticks", type=int),
+                include_idle=request.args.get("idle", default=0, type=int) == 1,
+                interval=interval_ms / 1000.0 if interval_ms is not None else None,
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        except RuntimeError as exc:
+            return jsonify({"error": str(exc)}), 409
+        return Response(collapsed(stacks), mimetype="text/plain")
 
     # Persistence helpers
     @app.get("/api/save/<name>")
     def api_save(name: str):  # type: ignore[override]
-        """Save the active player's profile to storage."""
-        eng = get_engine()
-        if eng.player.name != name:
+        """Save the active player's profile, and checkpoint the running fight.
+
+        A won fight adds its boss to ``progress.defeated`` and keeps the
+        fastest kill per boss (seconds) in ``progress.best_times``.
+        """
+        session = sessions.get_or_create(g.session_token)
+
+        def collect(eng: GameEngine) -> Optional[Dict]:
+            """Read the player and fight result, and checkpoint the fight."""
+            if eng.player.name != name:
+                return None
+            if checkpoints is not None and eng.enemy is not None:
+                checkpoints.checkpoint(session)
+            won = eng.enemy is not None and not eng.enemy.is_alive() and eng.player.is_alive()
+            return {
+                "name": eng.player.name,
+                "health": eng.player.health,
+                "stamina": eng.player.stamina,
+                "position": list(eng.player.position),
+                "gold": eng.player.gold,
+                "skin": getattr(eng.player, "skin", "default"),
+                "won_at": eng.frame if won else None,
+            }
+
+        profile = session.actor.call(collect)
+        if profile is None:
             return jsonify({"error": "active player mismatch"}), 400
-        profile = {
-            "name": eng.player.name,
-            "health": eng.player.health,
-            "stamina": eng.player.stamina,
-            "position": list(eng.player.position),
-            "gold": eng.player.gold,
-            "skin": getattr(eng.player, "skin", "default"),
-            "progress": {"defeated": []},
-        }
+        # Storage I/O stays on the request thread
+        won_at = profile.pop("won_at")
+        kills = [(session.boss_id, round(won_at * scheduler.period, 3))] if won_at is not None and session.boss_id else []
+        stored = load_knight(name) or {}
+        profile["progress"] = record_kills(stored.get("progress"), kills)
         save_knight(profile)
         return jsonify({"ok": True})
 
+    @app.get("/api/leaderboard")
+    def api_leaderboard():  # type: ignore[override]
+        """Return one page of a leaderboard (see :mod:`game.leaderboard`).
+
+        ``by`` picks the board (``gold`` by default), ``offset`` the first
+        rank (0-based) and ``limit`` the page size (at most ``PAGE_MAX``).
+        With ``name`` the response also carries that player's rank.
+        """
+        by = request.args.get("by", "gold")
+        offset = max(0, request.args.get("offset", default=0, type=int))
+        limit = max(1, min(request.args.get("limit", default=20, type=int), PAGE_MAX))
+        board = get_leaderboard()
+        try:
+            total, entries = board.page(by, offset, limit)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        body: Dict[str, object] = {"by": by, "offset": offset, "total": total, "entries": entries}
+        name = request.args.get("name")
+        if name:
+            body["rank"] = board.rank(by, name)
+        return jsonify(body)
+
     @app.get("/api/load/<name>")
     def api_load(name: str):  # type: ignore[override]
         """Load a player's profile by name from storage."""
@@ -161,3 +744,41 @@ def create_app() -> Flask:
         return jsonify(profile)
 
     return app
+
+
+def _knight_from_profile(profile: Dict) -> Knight:
+    """Build the fighting :class:`Knight` of a stored profile."""
+
+    k = Knight(
+        name=profile["name"],
+        health=int(profile.get("health", 100)),
+        stamina=float(profile.get("stamina", 100.0)),
+        position=tuple(profile.get("position", [50, 50])),
+    )
+    k.gold = int(profile.get("gold", 0))
+    return k
+
+
+def _register_metrics(sessions: SessionRegistry, scheduler: TickScheduler) -> None:
+    """Register the gauges and tick histogram of one app in :data:`REGISTRY`.
+
+    Gauges are read at scrape time, so they cost nothing between scrapes; a
+    later app replaces the gauges of an earlier one.
+    """
+
+    REGISTRY.gauge("sessions", lambda: len(sessions), "Live sessions")
+    REGISTRY.gauge("engines_active", lambda: scheduler.last_active, "Engines stepped by the last tick")
+    REGISTRY.gauge("engines_parked", lambda: scheduler.last_parked, "Idle engines not stepped by the last tick")
+    REGISTRY.gauge("scheduler_overruns", lambda: scheduler.overruns, "Ticks that took longer than one period")
+    REGISTRY.gauge(
+        "event_queue_depth", lambda: sum(len(s.engine.events) for s in sessions.sessions()), "Events held in all rings"
+    )
+    REGISTRY.gauge(
+        "mailbox_depth", lambda: sum(len(s.actor) for s in sessions.sessions()), "Messages waiting in all actors"
+    )
+    REGISTRY.gauge(
+        "input_queue_depth", lambda: sum(len(s.engine.inputs) for s in sessions.sessions()), "Inputs waiting in all engines"
+    )
+
+    tick_seconds = REGISTRY.histogram("scheduler_tick_seconds", "Time to step every active engine once")
+    scheduler.add_hook(lambda _tick: tick_seconds.observe(scheduler.last_tick_seconds))
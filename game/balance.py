@@ -0,0 +1,246 @@
+"""Monte Carlo balance runs over headless :class:`game.engine.GameEngine` fights.
+
+Tuning ``enemies.json`` by playing in the browser does not scale. This
+module plays many fights against every boss with scripted input policies
+and summarises the outcomes (win rate, time-to-kill, damage taken).
+
+Work is split into chunks of fights, one ``(boss, policy, chunk)`` unit per
+task, and fanned out over a :class:`concurrent.futures.ProcessPoolExecutor`.
+Each unit seeds its own RNG from ``(seed, boss, policy, chunk index)``, so a
+run gives identical results whatever the number of workers.
+
+Fights step by ``dt`` seconds per frame, :data:`game.engine.STEP_DT` by
+default: the same step the server's tick loop uses, so frame counts and
+timer-driven boss behaviour match live fights.
+
+The command-line entry point lives in ``balance.py`` at the project root.
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .engine import STEP_DT, GameEngine
+from .entities import Knight
+from .level import get_assets
+
+# A policy picks the next action (or None to idle) from the current state
+Policy = Callable[[GameEngine, random.Random], Optional[str]]
+
+
+def _sword_reaches(eng: GameEngine) -> bool:
+    """Whether a sword slash right now would overlap the enemy body."""
+
+    assert eng.enemy is not None
+    px, py = eng.player.position
+    ex, ey = eng.enemy.position
+    return px + 10 < ex < px + 50 and abs(py - ey) < 20
+
+
+def random_policy(eng: GameEngine, rng: random.Random) -> Optional[str]:
+    """Press a random button (or nothing) every tick."""
+
+    return rng.choice((None, "move_left", "move_right", "attack"))
+
+
+def greedy_policy(eng: GameEngine, rng: random.Random) -> Optional[str]:
+    """Attack whenever the sword reaches, otherwise close the distance."""
+
+    if _sword_reaches(eng):
+        return "attack"
+    assert eng.enemy is not None
+    return "move_right" if eng.enemy.position[0] > eng.player.position[0] + 30 else "move_left"
+
+
+def kiting_policy(eng: GameEngine, rng: random.Random) -> Optional[str]:
+    """Hit when in reach, back off when the enemy is on top of the knight."""
+
+    assert eng.enemy is not None
+    dx = eng.enemy.position[0] - eng.player.position[0]
+    if _sword_reaches(eng) and dx > 25:
+        return "attack"
+    if -30 < dx <= 25:
+        return "move_left" if dx >= 0 else "move_right"
+    return None
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "kiting": kiting_policy,
+}
+
+
+@dataclass
+class FightResult:
+    """Outcome of a single fight."""
+
+    outcome: str  # "win", "loss" or "timeout"
+    frames: int
+    damage_taken: int
+    damage_dealt: int
+
+
+def play_fight(
+    boss_id: str, policy: Policy, rng: random.Random, max_frames: int = 600, dt: float = STEP_DT
+) -> FightResult:
+    """Play one fight to completion (or ``max_frames``) and return its result.
+
+    Each frame advances the engine by ``dt`` seconds.
+    """
+
+    enemy = get_assets().create_enemy(boss_id)
+    start_hp = enemy.health
+    eng = GameEngine(player=Knight(name="Sim"), enemy=enemy)
+    outcome = "timeout"
+    while eng.frame < max_frames:
+        action = policy(eng, rng)
+        if action:
+            eng.enqueue_action(action)
+        eng.step(dt)
+        if not enemy.is_alive():
+            outcome = "win"
+            break
+        if not eng.player.is_alive():
+            outcome = "loss"
+            break
+    return FightResult(outcome, eng.frame, 100 - eng.player.health, start_hp - enemy.health)
+
+
+def run_chunk(unit: Tuple[str, str, int, int, int, int, float]) -> Tuple[str, str, List[FightResult]]:
+    """Worker entry point: play ``count`` fights for one work unit."""
+
+    boss_id, policy_name, seed, chunk, count, max_frames, dt = unit
+    rng = random.Random(f"{seed}:{boss_id}:{policy_name}:{chunk}")
+    policy = POLICIES[policy_name]
+    return boss_id, policy_name, [play_fight(boss_id, policy, rng, max_frames, dt) for _ in range(count)]
+
+
+def _percentile(values: List[int], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+
+    ordered = sorted(values)
+    return float(ordered[min(len(ordered) - 1, int(q * len(ordered)))])
+
+
+@dataclass
+class Summary:
+    """Aggregated results for one ``(boss, policy)`` pair."""
+
+    boss: str
+    policy: str
+    results: List[FightResult] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, object]:
+        """Return win rate, time-to-kill and damage distribution figures."""
+
+        n = len(self.results)
+        wins = [r.frames for r in self.results if r.outcome == "win"]
+        taken = [r.damage_taken for r in self.results]
+        dealt = [r.damage_dealt for r in self.results]
+        out: Dict[str, object] = {
+            "boss": self.boss,
+            "policy": self.policy,
+            "fights": n,
+            "win_rate": len(wins) / n if n else 0.0,
+            "loss_rate": sum(r.outcome == "loss" for r in self.results) / n if n else 0.0,
+            "timeout_rate": sum(r.outcome == "timeout" for r in self.results) / n if n else 0.0,
+        }
+        if wins:
+            out["ttk_frames"] = {
+                "mean": statistics.fmean(wins),
+                "p50": _percentile(wins, 0.5),
+                "p90": _percentile(wins, 0.9),
+            }
+        if n:
+            out["damage_taken"] = {
+                "mean": statistics.fmean(taken),
+                "p50": _percentile(taken, 0.5),
+                "p90": _percentile(taken, 0.9),
+                "max": max(taken),
+            }
+            out["damage_dealt_mean"] = statistics.fmean(dealt)
+        return out
+
+
+def work_units(
+    bosses: Iterable[str],
+    policies: Iterable[str],
+    fights: int,
+    chunk: int,
+    seed: int,
+    max_frames: int,
+    dt: float = STEP_DT,
+) -> List[Tuple[str, str, int, int, int, int, float]]:
+    """Split ``fights`` per ``(boss, policy)`` into chunked work units."""
+
+    units = []
+    for boss_id in bosses:
+        for name in policies:
+            for index, start in enumerate(range(0, fights, chunk)):
+                units.append((boss_id, name, seed, index, min(chunk, fights - start), max_frames, dt))
+    return units
+
+
+def run_balance(
+    fights: int = 1000,
+    bosses: Optional[List[str]] = None,
+    policies: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    chunk: int = 250,
+    seed: int = 0,
+    max_frames: int = 600,
+    dt: float = STEP_DT,
+) -> List[Dict[str, object]]:
+    """Run ``fights`` fights per boss and policy and return summaries.
+
+    Parameters
+    ----------
+    bosses:
+        Boss ids; defaults to the ``order`` of ``levels.json``.
+    policies:
+        Policy names from :data:`POLICIES`; defaults to all of them.
+    workers:
+        Worker processes; ``1`` runs inline without a pool.
+    dt:
+        Seconds per frame; defaults to the server's step, :data:`STEP_DT`.
+    """
+
+    if dt <= 0:
+        raise ValueError("dt must be positive")
+    bosses = bosses or get_assets().order()
+    policies = policies or list(POLICIES)
+    unknown = [p for p in policies if p not in POLICIES]
+    if unknown:
+        raise ValueError(f"Unknown policies: {unknown}")
+    units = work_units(bosses, policies, fights, max(1, chunk), seed, max_frames, dt)
+
+    summaries = {(b, p): Summary(b, p) for b in bosses for p in policies}
+    if workers == 1:
+        for boss_id, name, results in map(run_chunk, units):
+            summaries[(boss_id, name)].results.extend(results)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for boss_id, name, results in pool.map(run_chunk, units):
+                summaries[(boss_id, name)].results.extend(results)
+    return [s.as_dict() for s in summaries.values()]
+
+
+def format_table(rows: List[Dict[str, object]]) -> str:
+    """Render summaries as a fixed-width text table."""
+
+    lines = [f"{'boss':<10}{'policy':<8}{'fights':>8}{'win%':>7}{'loss%':>7}{'ttk p50':>9}{'ttk p90':>9}{'dmg p50':>9}{'dmg p90':>9}"]
+    for row in rows:
+        ttk = row.get("ttk_frames") or {}
+        dmg = row.get("damage_taken") or {}
+        lines.append(
+            f"{row['boss']:<10}{row['policy']:<8}{row['fights']:>8}"
+            f"{100 * row['win_rate']:>7.1f}{100 * row['loss_rate']:>7.1f}"  # type: ignore[operator]
+            f"{ttk.get('p50', float('nan')):>9.0f}{ttk.get('p90', float('nan')):>9.0f}"  # type: ignore[union-attr]
+            f"{dmg.get('p50', float('nan')):>9.0f}{dmg.get('p90', float('nan')):>9.0f}"  # type: ignore[union-attr]
+        )
+    return "\n".join(lines)
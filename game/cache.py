@@ -0,0 +1,200 @@
+"""Write-behind profile cache in front of :mod:`game.storage`.
+
+Request handlers should not wait on disk. :class:`ProfileCache` is itself a
+:class:`game.storage.ProfileStore`, so it can be installed with
+:func:`game.storage.set_store` and the rest of the code keeps calling
+``save_knight``/``load_knight`` as before:
+
+- reads are served from an in-memory copy of all profiles;
+- writes update memory and mark the profile dirty;
+- profiles go in and out as shallow copies: callers may set top-level keys
+  on what they get back, but nested values (``position``, ``progress``) are
+  shared with the cache and must be replaced, not mutated in place;
+- a background thread flushes all dirty profiles every ``flush_interval``
+  seconds through :meth:`ProfileStore.write_batch`, i.e. one atomic write
+  (temp file + rename for JSON, one transaction for SQLite) no matter how
+  many updates were coalesced;
+- :meth:`ProfileCache.close` flushes whatever is left on shutdown.
+
+If the backing data changes outside this process (its
+:meth:`~game.storage.ProfileStore.stamp`, e.g. the file mtime, moves without
+a flush of ours), the cache reloads it on the next access; pending local
+writes are kept on top of the reloaded data. The stamp is read at most once
+every ``stamp_interval`` seconds, not on every access, so outside changes
+show up with that much delay. The cache's own :meth:`ProfileCache.stamp`
+counts those reloads: it moves only when outside changes were picked up,
+never for writes made through the cache (storage listeners hear about
+those), which lets the leaderboard (:mod:`game.leaderboard`) rebuild only
+when it missed something.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from .metrics import REGISTRY, timed
+from .storage import ProfileStore
+
+_FLUSH_SECONDS = REGISTRY.histogram("profile_flush_seconds", "Time spent writing a batch of dirty profiles")
+
+
+class ProfileCache(ProfileStore):
+    """In-memory, write-behind cache over another :class:`ProfileStore`.
+
+    Parameters
+    ----------
+    backend:
+        Store that receives the batched writes.
+    flush_interval:
+        Seconds between background flushes.
+    stamp_interval:
+        Seconds between checks of the backend's stamp for outside changes.
+    """
+
+    def __init__(self, backend: ProfileStore, flush_interval: float = 1.0, stamp_interval: float = 1.0) -> None:
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.stamp_interval = stamp_interval
+        self.flushes = 0
+        self.reloads = 0
+        self._profiles: Optional[Dict[str, Dict]] = None
+        self._stamp: Optional[object] = None
+        self._next_stamp_check = 0.0
+        self._dirty: Dict[str, Dict] = {}
+        self._deleted: Set[str] = set()
+        # Batch currently being written; overlaid on reloads until it lands
+        self._inflight: Dict[str, Dict] = {}
+        self._inflight_deleted: Set[str] = set()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- background flusher -------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flush thread (no-op if already running)."""
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profile-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write any pending changes."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    @property
+    def pending(self) -> int:
+        """Number of profiles waiting to be written."""
+
+        return len(self._dirty) + len(self._deleted)
+
+    def flush(self) -> int:
+        """Write all dirty profiles in one batch. Returns how many changed."""
+
+        with self._flush_lock:
+            with self._lock:
+                upserts, deletes = self._dirty, self._deleted
+                if not upserts and not deletes:
+                    return 0
+                self._dirty, self._deleted = {}, set()
+                self._inflight, self._inflight_deleted = upserts, deletes
+            try:
+                with timed(_FLUSH_SECONDS):
+                    self.backend.write_batch(upserts, deletes)
+            except BaseException:
+                # Put the changes back unless newer ones replaced them meanwhile
+                with self._lock:
+                    self._inflight, self._inflight_deleted = {}, set()
+                    for name, profile in upserts.items():
+                        if name not in self._deleted:
+                            self._dirty.setdefault(name, profile)
+                    for name in deletes:
+                        if name not in self._dirty:
+                            self._deleted.add(name)
+                raise
+            with self._lock:
+                self._inflight, self._inflight_deleted = {}, set()
+                self._stamp = self.backend.stamp()
+                self._next_stamp_check = time.monotonic() + self.stamp_interval
+                self.flushes += 1
+        return len(upserts) + len(deletes)
+
+    # -- cache maintenance --------------------------------------------------------
+
+    def _profiles_view(self) -> Dict[str, Dict]:
+        """Return the in-memory profiles, (re)loading them when stale."""
+
+        now = time.monotonic()
+        if self._profiles is not None and now < self._next_stamp_check:
+            return self._profiles
+        self._next_stamp_check = now + self.stamp_interval
+        stamp = self.backend.stamp()
+        if self._profiles is None or (stamp is not None and stamp != self._stamp):
+            if self._profiles is not None:
+                self.reloads += 1
+            loaded = self.backend.list_all()
+            for pending, removed in ((self._inflight, self._inflight_deleted), (self._dirty, self._deleted)):
+                for name in removed:
+                    loaded.pop(name, None)
+                loaded.update(pending)
+            self._profiles = loaded
+            self._stamp = stamp
+        return self._profiles
+
+    # -- ProfileStore API ---------------------------------------------------------
+
+    def save(self, profile: Dict) -> None:
+        stored = dict(profile)
+        name = stored["name"]
+        with self._lock:
+            self._profiles_view()[name] = stored
+            self._dirty[name] = stored
+            self._deleted.discard(name)
+
+    def load(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            profile = self._profiles_view().get(name)
+            return dict(profile) if profile is not None else None
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            existed = self._profiles_view().pop(name, None) is not None
+            if existed:
+                self._dirty.pop(name, None)
+                self._deleted.add(name)
+            return existed
+
+    def list_all(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(profile) for name, profile in self._profiles_view().items()}
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Dict]:
+        with self._lock:
+            view = self._profiles_view()
+            return {name: dict(view[name]) for name in names if name in view}
+
+    def write_batch(self, upserts: Dict[str, Dict], deletes: Iterable[str] = ()) -> None:
+        with self._lock:
+            for name in deletes:
+                self.delete(name)
+            for profile in upserts.values():
+                self.save(profile)
+
+    def stamp(self) -> Optional[object]:
+        with self._lock:
+            self._profiles_view()
+            return self.reloads
@@ -0,0 +1,541 @@
+"""Binary checkpoints of whole engines for mid-fight save and resume.
+
+:func:`dumps` serializes a :class:`game.engine.GameEngine` (frame, player,
+enemy and extra entities with every constructor field, e.g.
+``Ogre.slam_cooldown`` or ``Dragon.breath_phase``, queued inputs and the
+fight recorder, so ``/api/replay`` still works after a resume) into a
+versioned, compact binary blob; :func:`loads` rebuilds an equivalent engine.
+Fields are written with their names, so checkpoints taken before a field was
+added or removed still load (missing fields take their defaults).
+
+Layout (little endian)::
+
+    b"KCKP" | u8 version | u32 frame | u64 next event seq
+    character player | u8 has_enemy [character enemy]
+    varint n, n * character entity
+    varint n, n * (u32 target frame, str action)
+    u8 has_wave [wave]                               (version >= 2)
+    u8 has_recorder [varint n, n * u8 recorder]      (version >= 3)
+
+    wave: varint n, n * str boss id | varint stage | u32 stage start
+          varint n, n * u32 stage frames | u8 ended
+    character: str class, varint n, n * (str field, value)
+    value: u8 tag + b"i" i64 | b"n" varint length, signed big-endian int
+           | b"f" f64 | b"s" str | b"p" 2 * i64 | b"t" 2 * value
+    str: varint length + UTF-8
+    recorder: :meth:`game.replay.FightRecorder.to_bytes`
+
+A :class:`CheckpointStore` keeps one file per session token, written
+atomically (temp file + rename), so restoring a session reads exactly one
+small file. The :class:`Checkpointer` serializes changed sessions every
+``interval`` seconds from the scheduler thread, between ticks, so it never
+sees an engine halfway through a step; sessions are spread over the ticks of
+the interval so no single tick pays for all of them, and a background thread
+writes the files.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import fields
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .abstracts import Character
+from .engine import GameEngine, Wave
+from .entities import Knight
+from .level import ENEMY_CLASSES, create_enemy
+from .replay import FightRecorder
+
+if TYPE_CHECKING:
+    from .scheduler import TickScheduler
+    from .sessions import Session, SessionRegistry
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"KCKP"
+VERSION = 3
+CHECKPOINT_DIR = Path("web/data/checkpoints")
+TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+_HEADER = struct.Struct("<4sBIQ")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_POS = struct.Struct("<qq")
+_FRAME = struct.Struct("<I")
+_INT_MIN, _INT_MAX = -(2**63), 2**63 - 1
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_str(out: bytearray, text: str) -> None:
+    raw = text.encode("utf-8")
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def _is_i64(value: object) -> bool:
+    return type(value) is int and _INT_MIN <= value <= _INT_MAX  # type: ignore[operator]
+
+
+def _put_value(out: bytearray, name: str, value: object) -> None:
+    """Write one tagged field value; anything a character can hold round-trips."""
+
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"cannot checkpoint field {name}={value!r}")
+    if isinstance(value, int):
+        if _is_i64(value):
+            out += b"i"
+            out += _INT.pack(value)
+        else:
+            raw = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+            out += b"n"
+            _put_varint(out, len(raw))
+            out += raw
+    elif isinstance(value, float):
+        out += b"f"
+        out += _FLOAT.pack(value)
+    elif isinstance(value, str):
+        out += b"s"
+        _put_str(out, value)
+    elif isinstance(value, tuple) and len(value) == 2:
+        if _is_i64(value[0]) and _is_i64(value[1]):
+            out += b"p"
+            out += _POS.pack(*value)
+        else:
+            out += b"t"
+            _put_value(out, name, value[0])
+            _put_value(out, name, value[1])
+    else:
+        raise ValueError(f"cannot checkpoint field {name}={value!r}")
+
+
+def _put_character(out: bytearray, character: Character) -> None:
+    _put_str(out, type(character).__name__)
+    values = [(f.name, getattr(character, f.name)) for f in fields(character) if f.init]  # type: ignore[arg-type]
+    _put_varint(out, len(values))
+    for name, value in values:
+        _put_str(out, name)
+        _put_value(out, name, value)
+
+
+def dumps(engine: GameEngine) -> bytes:
+    """Serialize ``engine`` (see the module docstring for the layout)."""
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, engine.frame, engine.events.next_seq))
+    _put_character(out, engine.player)
+    if engine.enemy is None:
+        out.append(0)
+    else:
+        out.append(1)
+        _put_character(out, engine.enemy)
+    _put_varint(out, len(engine.entities))
+    for entity in engine.entities:
+        _put_character(out, entity)
+    inputs = list(engine.inputs)
+    _put_varint(out, len(inputs))
+    for target, action in inputs:
+        out += _FRAME.pack(target)
+        _put_str(out, action)
+    wave = engine.wave
+    if wave is None:
+        out.append(0)
+    else:
+        out.append(1)
+        _put_varint(out, len(wave.order))
+        for boss_id in wave.order:
+            _put_str(out, boss_id)
+        _put_varint(out, wave.stage)
+        out += _FRAME.pack(wave.stage_start)
+        _put_varint(out, len(wave.stage_frames))
+        for frames in wave.stage_frames:
+            out += _FRAME.pack(frames)
+        out.append(1 if wave.ended else 0)
+    recorder = engine.recorder
+    if recorder is None:
+        out.append(0)
+    else:
+        out.append(1)
+        raw = recorder.to_bytes()
+        _put_varint(out, len(raw))
+        out += raw
+    return bytes(out)
+
+
+class _Reader:
+    """Cursor over a checkpoint blob; raises ``ValueError`` when truncated."""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def take(self, size: int) -> memoryview:
+        end = self.pos + size
+        if end > len(self.data):
+            raise ValueError("truncated checkpoint")
+        chunk = self.data[self.pos : end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt: struct.Struct) -> Tuple:
+        return fmt.unpack(self.take(fmt.size))
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.take(1)[0]
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def str(self) -> str:
+        return bytes(self.take(self.varint())).decode("utf-8")
+
+    def value(self) -> object:
+        tag = bytes(self.take(1))
+        if tag == b"i":
+            return self.unpack(_INT)[0]
+        if tag == b"n":
+            return int.from_bytes(self.take(self.varint()), "big", signed=True)
+        if tag == b"f":
+            return self.unpack(_FLOAT)[0]
+        if tag == b"s":
+            return self.str()
+        if tag == b"p":
+            return self.unpack(_POS)
+        if tag == b"t":
+            return (self.value(), self.value())
+        raise ValueError(f"unknown field tag {tag!r}")
+
+    def character(self) -> Character:
+        class_name = self.str()
+        cls = Knight if class_name == "Knight" else ENEMY_CLASSES.get(class_name)
+        if cls is None:
+            raise ValueError(f"unknown character class {class_name!r}")
+        known = {f.name for f in fields(cls) if f.init}
+        kwargs: Dict[str, object] = {}
+        for _ in range(self.varint()):
+            name = self.str()
+            value = self.value()
+            if name in known:
+                kwargs[name] = value
+        return cls(**kwargs)  # type: ignore[arg-type]
+
+
+def loads(data: bytes) -> GameEngine:
+    """Rebuild an engine from :func:`dumps` output.
+
+    Raises ``ValueError`` for foreign, truncated or newer-version data.
+    """
+
+    reader = _Reader(data)
+    magic, version, frame, next_seq = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise ValueError("not a checkpoint")
+    if version > VERSION:
+        raise ValueError(f"unsupported checkpoint version {version}")
+    player = reader.character()
+    enemy = reader.character() if reader.take(1)[0] else None
+    entities = [reader.character() for _ in range(reader.varint())]
+    engine = GameEngine(player=player, enemy=enemy, frame=frame, entities=entities)  # type: ignore[arg-type]
+    for _ in range(reader.varint()):
+        target = reader.unpack(_FRAME)[0]
+        engine.inputs.append((target, reader.str()))
+    if version >= 2 and reader.take(1)[0]:
+        order = [reader.str() for _ in range(reader.varint())]
+        stage = reader.varint()
+        stage_start = reader.unpack(_FRAME)[0]
+        stage_frames = [reader.unpack(_FRAME)[0] for _ in range(reader.varint())]
+        # The next boss is built again on the next step
+        engine.wave = Wave(
+            order=order,
+            create=create_enemy,
+            stage=stage,
+            stage_start=stage_start,
+            stage_frames=stage_frames,
+            ended=bool(reader.take(1)[0]),
+        )
+    if version >= 3 and reader.take(1)[0]:
+        engine.recorder = FightRecorder.from_bytes(bytes(reader.take(reader.varint())))
+    # Keep event cursors monotonic; the old event contents are not kept
+    engine.events.next_seq = next_seq
+    return engine
+
+
+class CheckpointStore:
+    """One checkpoint file per session token in ``directory``.
+
+    Tokens must be URL-safe (``[A-Za-z0-9_-]``), as issued by
+    :func:`game.sessions.new_token`; anything else raises ``ValueError``.
+    """
+
+    def __init__(self, directory: Path = CHECKPOINT_DIR) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, token: str) -> Path:
+        if not TOKEN_RE.fullmatch(token):
+            raise ValueError("invalid session token")
+        return self.directory / f"{token}.ckpt"
+
+    def save(self, token: str, data: bytes) -> None:
+        """Write ``data`` for ``token`` atomically (temp file + rename)."""
+
+        path = self._path(token)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{token}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def load(self, token: str) -> Optional[bytes]:
+        """Return the checkpoint for ``token`` or ``None``."""
+
+        try:
+            return self._path(token).read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def exists(self, token: str) -> bool:
+        """Whether a checkpoint is stored for ``token``."""
+
+        try:
+            return self._path(token).exists()
+        except ValueError:
+            return False
+
+    def delete(self, token: str) -> bool:
+        """Remove the checkpoint for ``token``. Returns True if it existed."""
+
+        try:
+            self._path(token).unlink()
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def prune(self, max_age: float) -> int:
+        """Delete checkpoints not written for ``max_age`` seconds."""
+
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.directory.glob("*.ckpt"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def _capture(engine: GameEngine) -> Tuple[bytes, Tuple[int, int, int]]:
+    return dumps(engine), (id(engine.player), id(engine.enemy), engine.frame)
+
+
+class Checkpointer:
+    """Periodically checkpoint every live session and restore them on demand.
+
+    Parameters
+    ----------
+    store:
+        Where checkpoints are written.
+    sessions:
+        Registry whose sessions are checkpointed.
+    interval:
+        Seconds between checkpoints of a session that keeps changing.
+    retention:
+        Checkpoints untouched for this many seconds are pruned by the writer
+        thread. ``None`` keeps them forever.
+    """
+
+    def __init__(
+        self,
+        store: CheckpointStore,
+        sessions: "SessionRegistry",
+        interval: float = 5.0,
+        retention: Optional[float] = 7 * 24 * 3600.0,
+    ) -> None:
+        self.store = store
+        self.sessions = sessions
+        self.interval = interval
+        self.retention = retention
+        self.saved = 0
+        self.restored = 0
+        self.last_checkpoint_seconds = 0.0
+        self._every = 1  # ticks between checkpoints, set by attach()
+        self._versions: Dict[str, Tuple[int, int, int]] = {}
+        self._pending: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- capture ------------------------------------------------------------------
+
+    def attach(self, scheduler: "TickScheduler") -> None:
+        """Checkpoint from ``scheduler``'s thread every ``interval`` seconds."""
+
+        self._every = max(1, round(self.interval * scheduler.hz))
+        scheduler.add_hook(self._on_tick)
+
+    def _on_tick(self, tick: int) -> None:
+        # Spread the work: each tick handles the sessions of one bucket
+        self.checkpoint_all(bucket=(tick % self._every, self._every))
+
+    def checkpoint(self, session: "Session", settle: bool = True) -> None:
+        """Serialize ``session`` now; it is written by the next :meth:`flush`.
+
+        Runs as the engine's owner (:meth:`EngineActor.run`), so it is safe
+        from any thread, e.g. on eviction or at exit. With ``settle`` a
+        parked engine is caught up first, so no fast-forwarded frames are
+        lost when the fight is resumed from this checkpoint.
+        """
+
+        if settle:
+            session.actor.settle()
+        data, version = session.actor.run(_capture)
+        with self._lock:
+            self._pending[session.token] = data
+            self._versions[session.token] = version
+
+    def checkpoint_all(self, bucket: Optional[Tuple[int, int]] = None) -> int:
+        """Serialize every session that changed since its last checkpoint.
+
+        ``bucket=(i, n)`` limits this to the sessions whose token's CRC-32
+        is ``i`` modulo ``n``. The digest is stable across processes (unlike
+        ``hash``), so every session keeps its slot in the interval.
+        """
+
+        started = time.perf_counter()
+        live = self.sessions.sessions()
+        count = 0
+        for session in live:
+            eng = session.engine
+            if eng.enemy is None:
+                continue
+            if bucket is not None and zlib.crc32(session.token.encode("utf-8")) % bucket[1] != bucket[0]:
+                continue
+            if self._versions.get(session.token) != (id(eng.player), id(eng.enemy), eng.frame):
+                # Parked engines are saved as parked: waking them here would
+                # make idle sessions cost a catch-up every interval
+                try:
+                    self.checkpoint(session, settle=False)
+                except Exception:
+                    log.exception("could not checkpoint session %s", session.token)
+                    continue
+                count += 1
+        if len(self._versions) > 2 * len(live):
+            tokens = {s.token for s in live}
+            with self._lock:
+                self._versions = {t: v for t, v in self._versions.items() if t in tokens}
+        self.last_checkpoint_seconds = time.perf_counter() - started
+        return count
+
+    # -- restore ------------------------------------------------------------------
+
+    def restore(self, token: str) -> Optional[GameEngine]:
+        """Return the checkpointed engine for ``token`` or ``None``.
+
+        Unreadable checkpoints are discarded.
+        """
+
+        with self._lock:
+            data = self._pending.get(token)
+        if data is None:
+            data = self.store.load(token)
+        if data is None:
+            return None
+        try:
+            engine = loads(data)
+        except (ValueError, struct.error, UnicodeDecodeError, TypeError):
+            self.store.delete(token)
+            return None
+        self.restored += 1
+        return engine
+
+    def has(self, token: str) -> bool:
+        """Whether ``token`` could be restored."""
+
+        with self._lock:
+            if token in self._pending:
+                return True
+        return self.store.exists(token)
+
+    # -- writer -------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write all pending checkpoints. Returns how many were written."""
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for token, data in pending.items():
+            try:
+                self.store.save(token, data)
+            except ValueError:
+                continue
+        self.saved += len(pending)
+        return len(pending)
+
+    def start(self) -> None:
+        """Start the background writer thread (no-op if already running)."""
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        last_prune = 0.0
+        while not self._stop.wait(max(0.1, self.interval / 2)):
+            self.flush()
+            if self.retention is not None and time.monotonic() - last_prune > 3600:
+                last_prune = time.monotonic()
+                self.store.prune(self.retention)
+
+    def close(self) -> None:
+        """Checkpoint every live session, stop the writer and flush.
+
+        Stop the scheduler first so the final checkpoints are the last state.
+        """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for session in self.sessions.sessions():
+            if session.engine.enemy is not None:
+                try:
+                    self.checkpoint(session)
+                except Exception:
+                    log.exception("could not checkpoint session %s", session.token)
+        self.flush()
+
+    def stats(self) -> Dict[str, object]:
+        """Return checkpoint counters."""
+
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "checkpoints_saved": self.saved,
+            "checkpoints_restored": self.restored,
+            "checkpoints_pending": pending,
+            "last_checkpoint_seconds": self.last_checkpoint_seconds,
+        }
@@ -0,0 +1,257 @@
+"""Compact snapshot encodings for the state endpoints.
+
+:meth:`game.engine.GameEngine.snapshot` returns nested dicts that are mostly
+unchanged from one frame to the next (names, gold, stamina at its cap). The
+:class:`SnapshotEncoder` keeps a short history of flattened snapshots per
+session and encodes each new one relative to the frame the client last
+acknowledged:
+
+- **keyframe**: the full snapshot, sent when the client has no usable base,
+  after a new fight starts, or every ``keyframe_interval`` frames;
+- **delta**: only the flattened fields whose value changed since the base.
+
+Both forms can be rendered as JSON or in a fixed binary layout packed with
+``struct`` (:func:`pack_binary`). Messages carry an ``epoch`` that changes
+whenever the session starts a new fight, so a base frame from an earlier
+fight is never mistaken for one of the current fight.
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+BINARY_MIMETYPE = "application/octet-stream"
+
+# Flattened snapshot: dotted path -> leaf value ("enemy" -> None when absent)
+Flat = Dict[str, object]
+
+_MISSING = object()
+
+
+def flatten(snapshot: Dict[str, object]) -> Flat:
+    """Flatten a snapshot into ``{"player.health": 100, ...}`` form."""
+
+    flat: Flat = {}
+    for section, value in snapshot.items():
+        if section in ("player", "enemy") and value is not None:
+            for key, leaf in value.items():  # type: ignore[union-attr]
+                flat[f"{section}.{key}"] = list(leaf) if isinstance(leaf, tuple) else leaf
+        else:
+            # Scalars and lists (e.g. ``entities``) are compared as a whole
+            flat[section] = value
+    return flat
+
+
+def unflatten(flat: Flat) -> Dict[str, object]:
+    """Inverse of :func:`flatten`."""
+
+    snapshot: Dict[str, object] = {"frame": flat["frame"]}
+    for path, leaf in flat.items():
+        if "." not in path:
+            snapshot.setdefault(path, leaf)
+            continue
+        section, key = path.split(".", 1)
+        bucket = snapshot.get(section)
+        if bucket is None:
+            bucket = snapshot[section] = {}
+        bucket[key] = leaf  # type: ignore[index]
+    snapshot.setdefault("enemy", None)
+    return snapshot
+
+
+def apply_message(base: Optional[Flat], message: Dict[str, object]) -> Flat:
+    """Reconstruct the flattened state described by an encoded message.
+
+    This is the client half of the protocol, used by Python tooling and as a
+    reference for the JavaScript side.
+    """
+
+    if message.get("key"):
+        return flatten(message["state"])  # type: ignore[arg-type]
+    if base is None:
+        raise ValueError("delta message requires a base state")
+    state = dict(base)
+    for path in message.get("del", ()):  # type: ignore[union-attr]
+        state.pop(path, None)
+    changes: Flat = message["d"]  # type: ignore[assignment]
+    state.update(changes)
+    if "enemy" in changes:
+        # The enemy disappeared: drop its stale fields
+        state = {k: v for k, v in state.items() if not k.startswith("enemy.")}
+    elif any(k.startswith("enemy.") for k in changes):
+        state.pop("enemy", None)
+    state["frame"] = message["frame"]
+    return state
+
+
+class SnapshotEncoder:
+    """Per-session encoder producing keyframes and deltas.
+
+    Parameters
+    ----------
+    keyframe_interval:
+        Force a full keyframe at least this many frames apart.
+    history:
+        Number of past frames kept as possible delta bases.
+    """
+
+    def __init__(self, keyframe_interval: int = 120, history: int = 64) -> None:
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.history = max(1, history)
+        self.epoch = 0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._frames: "OrderedDict[int, Flat]" = OrderedDict()
+        self._last_keyframe = -self.keyframe_interval
+        self._lock = threading.Lock()
+
+    def encode(
+        self,
+        snapshot: Dict[str, object],
+        identity: Tuple[int, int],
+        base: Optional[int] = None,
+        epoch: Optional[int] = None,
+    ) -> Dict[str, object]:
+        """Encode ``snapshot`` relative to the client's acknowledged ``base``.
+
+        Parameters
+        ----------
+        snapshot:
+            Output of :meth:`GameEngine.snapshot`.
+        identity:
+            Value that changes when a new fight starts (e.g. the ids of the
+            player and enemy objects); a change bumps the epoch.
+        base, epoch:
+            Last frame and epoch the client holds, if any.
+        """
+
+        flat = flatten(snapshot)
+        frame = int(flat["frame"])  # type: ignore[arg-type]
+        with self._lock:
+            if identity != self._identity:
+                self._identity = identity
+                self.epoch = (self.epoch + 1) & 0xFFFF
+                self._frames.clear()
+                self._last_keyframe = -self.keyframe_interval
+            self._frames[frame] = flat
+            self._frames.move_to_end(frame)
+            while len(self._frames) > self.history:
+                self._frames.popitem(last=False)
+
+            base_flat = self._frames.get(base) if base is not None and epoch == self.epoch else None
+            if base_flat is None or frame - self._last_keyframe >= self.keyframe_interval:
+                self._last_keyframe = frame
+                return {"frame": frame, "epoch": self.epoch, "key": True, "state": snapshot}
+
+            changed = {k: v for k, v in flat.items() if k != "frame" and base_flat.get(k, _MISSING) != v}
+            removed = [k for k in base_flat if k not in flat]
+        message: Dict[str, object] = {"frame": frame, "epoch": self.epoch, "base": base, "d": changed}
+        if removed:
+            message["del"] = removed
+        return message
+
+
+# --- Fixed binary layout --------------------------------------------------------
+#
+# header  <BBHII  version, flags, field mask, frame, base frame
+# epoch   <H
+# fields  packed in the order of BINARY_FIELDS for each bit set in the mask
+#
+# Flags: bit 0 keyframe, bit 1 enemy present. Strings are a length byte plus
+# UTF-8 (truncated to 255 bytes); stamina travels as float32. Fields outside
+# BINARY_FIELDS are not representable and are left out of binary messages.
+
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<BBHIIH")
+BINARY_FIELDS: List[Tuple[str, str]] = [
+    ("player.name", "str"),
+    ("player.health", "<i"),
+    ("player.stamina", "<f"),
+    ("player.position", "<ii"),
+    ("player.gold", "<I"),
+    ("player.alive", "<?"),
+    ("enemy.name", "str"),
+    ("enemy.health", "<i"),
+    ("enemy.position", "<ii"),
+    ("enemy.alive", "<?"),
+]
+_STRUCTS = {fmt: struct.Struct(fmt) for _, fmt in BINARY_FIELDS if fmt != "str"}
+FLAG_KEYFRAME = 0x1
+FLAG_ENEMY = 0x2
+
+
+def pack_binary(message: Dict[str, object], has_enemy: bool) -> bytes:
+    """Pack an encoded message into the fixed binary layout.
+
+    ``has_enemy`` tells whether the encoded state has an enemy, which a delta
+    alone cannot express when none of the enemy fields changed.
+    """
+
+    if message.get("key"):
+        fields = flatten(message["state"])  # type: ignore[arg-type]
+        flags = FLAG_KEYFRAME
+    else:
+        fields = message["d"]  # type: ignore[assignment]
+        flags = 0
+    if has_enemy:
+        flags |= FLAG_ENEMY
+
+    mask = 0
+    body: List[bytes] = []
+    for bit, (path, fmt) in enumerate(BINARY_FIELDS):
+        if path not in fields:
+            continue
+        value = fields[path]
+        mask |= 1 << bit
+        if fmt == "str":
+            raw = str(value).encode("utf-8")[:255]
+            body.append(bytes((len(raw),)) + raw)
+        elif isinstance(value, list):
+            body.append(_STRUCTS[fmt].pack(*value))
+        else:
+            body.append(_STRUCTS[fmt].pack(value))
+
+    base = message.get("base")
+    header = _HEADER.pack(
+        BINARY_VERSION,
+        flags,
+        mask,
+        int(message["frame"]),  # type: ignore[arg-type]
+        0 if base is None else int(base),  # type: ignore[arg-type]
+        int(message["epoch"]) & 0xFFFF,  # type: ignore[arg-type]
+    )
+    return header + b"".join(body)
+
+
+def unpack_binary(data: bytes) -> Dict[str, object]:
+    """Decode :func:`pack_binary` output back into a JSON-style message."""
+
+    version, flags, mask, frame, base, epoch = _HEADER.unpack_from(data, 0)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    offset = _HEADER.size
+    fields: Flat = {}
+    for bit, (path, fmt) in enumerate(BINARY_FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if fmt == "str":
+            size = data[offset]
+            fields[path] = data[offset + 1 : offset + 1 + size].decode("utf-8")
+            offset += 1 + size
+            continue
+        packer = _STRUCTS[fmt]
+        values = packer.unpack_from(data, offset)
+        offset += packer.size
+        fields[path] = list(values) if len(values) > 1 else values[0]
+
+    if flags & FLAG_KEYFRAME:
+        fields["frame"] = frame
+        if not flags & FLAG_ENEMY:
+            fields = {k: v for k, v in fields.items() if not k.startswith("enemy.")}
+            fields["enemy"] = None
+        return {"frame": frame, "epoch": epoch, "key": True, "state": unflatten(fields)}
+    if not flags & FLAG_ENEMY:
+        fields["enemy"] = None
+    return {"frame": frame, "epoch": epoch, "base": base, "d": fields}
@@ -1,30 +1,99 @@
 """CRUD operations for the main Knight entity.
 
-Integrates with :mod:`game.storage` to persist profiles in JSON.
+Integrates with :mod:`game.storage` to persist profiles (SQLite or JSON).
+
+The bulk variants (:func:`create_knights`, :func:`update_knights`,
+:func:`delete_knights`, :func:`import_knights`) validate every item in one
+pass, read the existing profiles with one :func:`game.storage.load_knights`
+call and apply all valid items with one :func:`game.storage.write_knights`
+(a single transaction or file write). Invalid items do not stop the batch;
+they are reported in ``errors`` as ``{"index", "name", "error"}``.
+
+Every write of profile fields (single and bulk updates, imports) goes
+through :func:`field_error`, which checks each field's type and range
+against :data:`FIELD_CHECKS`, so malformed values such as a string
+``gold`` never reach storage. Numbers are also bounded by what the binary
+state format (:mod:`game.codec`) can carry: int32 health and coordinates,
+uint32 gold.
+:func:`export_knights` streams all profiles as NDJSON.
+
+:func:`record_kills` and :func:`record_rush` fold fight results into a
+profile's ``progress`` (``defeated``, ``best_times`` and ``rush``).
 """
 
 from __future__ import annotations
 
-from typing import Dict, Optional
+import json
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from .entities import Knight
-from .storage import delete_knight, load_knight, save_knight
+from .storage import delete_knight, iter_knights, load_knight, load_knights, save_knight, write_knights
 from .utils import valid_name
 
+INVALID_NAME = "Nombre inválido: use 3-16 letras (A-Z/a-z)"
+DUPLICATE_NAME = "Ya existe un caballero con ese nombre"
+NOT_FOUND = "Caballero no encontrado"
+RENAME = "El nombre de un caballero no se puede cambiar"
+UNKNOWN_FIELD = "Campo desconocido: {}"
+INVALID_FIELD = "Valor inválido para {}"
+MAX_STAMINA = 100.0
+MAX_SKIN = 32  # characters
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+UINT32_MAX = 2**32 - 1
+IMPORT_BATCH = 1000  # profiles per storage write during NDJSON import
 
-def create_knight(name: str) -> Dict:
-    """Create a new knight profile if the name is valid and unique.
 
-    Returns the profile dict. Raises ``ValueError`` if invalid.
-    """
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: object) -> bool:
+    return (_is_int(value) or isinstance(value, float)) and math.isfinite(value)  # type: ignore[arg-type]
+
+
+def _valid_progress(progress: object) -> bool:
+    if not isinstance(progress, dict):
+        return False
+    defeated = progress.get("defeated", [])
+    best_times = progress.get("best_times", {})
+    return (
+        isinstance(defeated, list)
+        and all(isinstance(boss, str) for boss in defeated)
+        and isinstance(best_times, dict)
+        and all(_is_number(t) and t >= 0 for t in best_times.values())
+        and isinstance(progress.get("rush", {}), dict)
+    )
+
+
+# Profile field -> whether a value is acceptable for it
+FIELD_CHECKS: Dict[str, Callable[[object], bool]] = {
+    "health": lambda v: _is_int(v) and 0 <= v <= INT32_MAX,  # type: ignore[operator]
+    "stamina": lambda v: _is_number(v) and 0 <= v <= MAX_STAMINA,  # type: ignore[operator]
+    "position": lambda v: isinstance(v, list) and len(v) == 2 and all(_is_int(c) and INT32_MIN <= c <= INT32_MAX for c in v),
+    "gold": lambda v: _is_int(v) and 0 <= v <= UINT32_MAX,  # type: ignore[operator]
+    "skin": lambda v: isinstance(v, str) and 0 < len(v) <= MAX_SKIN,
+    "progress": _valid_progress,
+}
+
+
+def field_error(fields: Dict) -> Optional[str]:
+    """Return why ``fields`` (without ``name``) cannot be stored, or ``None``."""
+
+    for key, value in fields.items():
+        check = FIELD_CHECKS.get(key)
+        if check is None:
+            return UNKNOWN_FIELD.format(key)
+        if not check(value):
+            return INVALID_FIELD.format(key)
+    return None
 
-    if not valid_name(name):
-        raise ValueError("Nombre inválido: use 3-16 letras (A-Z/a-z)")
-    if load_knight(name):
-        raise ValueError("Ya existe un caballero con ese nombre")
+
+def new_profile(name: str) -> Dict:
+    """Return the profile of a brand-new knight called ``name``."""
 
     k = Knight(name=name)
-    profile = {
+    return {
         "name": k.name,
         "health": k.health,
         "stamina": k.stamina,
@@ -33,6 +102,20 @@ def create_knight(name: str) -> Dict:
         "skin": k.skin,
         "progress": {"defeated": []},
     }
+
+
+def create_knight(name: str) -> Dict:
+    """Create a new knight profile if the name is valid and unique.
+
+    Returns the profile dict. Raises ``ValueError`` if invalid.
+    """
+
+    if not valid_name(name):
+        raise ValueError(INVALID_NAME)
+    if load_knight(name):
+        raise ValueError(DUPLICATE_NAME)
+
+    profile = new_profile(name)
     save_knight(profile)
     return profile
 
@@ -44,12 +127,22 @@ def read_knight(name: str) -> Optional[Dict]:
 
 
 def update_knight(name: str, updates: Dict) -> Dict:
-    """Update fields of an existing knight profile and save it."""
+    """Update fields of an existing knight profile and save it.
+
+    Raises ``ValueError`` for an unknown knight, a rename or a field that
+    fails :func:`field_error`.
+    """
 
+    fields = {k: v for k, v in updates.items() if k != "name"}
+    if updates.get("name", name) != name:
+        raise ValueError(RENAME)
+    error = field_error(fields)
+    if error is not None:
+        raise ValueError(error)
     profile = load_knight(name)
     if not profile:
-        raise ValueError("Caballero no encontrado")
-    profile.update(updates)
+        raise ValueError(NOT_FOUND)
+    profile.update(fields)
     save_knight(profile)
     return profile
 
@@ -59,3 +152,187 @@ def delete_knight_profile(name: str) -> bool:
 
     return delete_knight(name)
 
+
+def record_kills(progress: Optional[Dict], kills: Iterable[Tuple[str, float]]) -> Dict:
+    """Return a copy of ``progress`` with ``(boss_id, seconds)`` kills added.
+
+    Each boss joins ``defeated`` once; ``best_times`` keeps the fastest kill.
+    """
+
+    progress = dict(progress or {})
+    defeated = list(progress.get("defeated", []))
+    best_times = dict(progress.get("best_times", {}))
+    for boss_id, seconds in kills:
+        if boss_id not in defeated:
+            defeated.append(boss_id)
+        best_times[boss_id] = min(seconds, best_times.get(boss_id, seconds))
+    progress.update(defeated=defeated, best_times=best_times)
+    return progress
+
+
+def record_rush(name: str, stages: List[Tuple[str, float]], cleared: bool) -> Optional[Dict]:
+    """Store the result of a boss rush in the profile of ``name``.
+
+    ``stages`` holds ``(boss_id, seconds)`` for every cleared stage. They
+    count as kills (see :func:`record_kills`), and ``progress.rush`` keeps
+    the number of runs, the last run and the best full-clear time. Returns
+    the saved profile, or ``None`` if the knight does not exist.
+    """
+
+    profile = load_knight(name)
+    if not profile:
+        return None
+    progress = record_kills(profile.get("progress"), stages)
+    rush = dict(progress.get("rush", {}))
+    total = round(sum(seconds for _, seconds in stages), 3)
+    rush["runs"] = int(rush.get("runs", 0)) + 1
+    rush["last"] = {
+        "stages": [{"boss": boss_id, "seconds": seconds} for boss_id, seconds in stages],
+        "cleared": cleared,
+        "total": total,
+    }
+    if cleared and ("best" not in rush or total < rush["best"]):
+        rush["best"] = total
+    progress["rush"] = rush
+    profile["progress"] = progress
+    save_knight(profile)
+    return profile
+
+
+def _error(index: int, name: object, message: str) -> Dict:
+    return {"index": index, "name": name, "error": message}
+
+
+def create_knights(names: Iterable[str]) -> Dict:
+    """Create many knights in one storage write.
+
+    Returns ``{"created": [profiles], "errors": [...]}``; names that are
+    invalid, repeated in the batch or already taken are reported.
+    """
+
+    items = list(names)
+    errors: List[Dict] = []
+    wanted: Dict[str, int] = {}
+    for i, name in enumerate(items):
+        if not isinstance(name, str) or not valid_name(name.strip()):
+            errors.append(_error(i, name, INVALID_NAME))
+        elif name.strip() in wanted:
+            errors.append(_error(i, name, DUPLICATE_NAME))
+        else:
+            wanted[name.strip()] = i
+    existing = load_knights(wanted)
+    created: Dict[str, Dict] = {}
+    for name, i in wanted.items():
+        if name in existing:
+            errors.append(_error(i, name, DUPLICATE_NAME))
+        else:
+            created[name] = new_profile(name)
+    if created:
+        write_knights(created)
+    errors.sort(key=lambda e: e["index"])
+    return {"created": list(created.values()), "errors": errors}
+
+
+def update_knights(updates: Iterable[Dict]) -> Dict:
+    """Apply many ``{"name": ..., <fields>}`` updates in one storage write.
+
+    Several updates of the same knight are applied in order; an update
+    with an invalid field (see :func:`field_error`) is skipped as a whole.
+    Returns ``{"updated": [profiles], "errors": [...]}``.
+    """
+
+    items = list(updates)
+    errors: List[Dict] = []
+    valid: List[Tuple[int, str, Dict]] = []
+    for i, item in enumerate(items):
+        name = item.get("name") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not valid_name(name):
+            errors.append(_error(i, name, INVALID_NAME))
+            continue
+        fields = {k: v for k, v in item.items() if k != "name"}
+        error = field_error(fields)
+        if error is not None:
+            errors.append(_error(i, name, error))
+        else:
+            valid.append((i, name, fields))
+    profiles = load_knights({name for _, name, _ in valid})
+    changed: Dict[str, Dict] = {}
+    for i, name, fields in valid:
+        profile = changed.get(name) or profiles.get(name)
+        if profile is None:
+            errors.append(_error(i, name, NOT_FOUND))
+            continue
+        profile.update(fields)
+        changed[name] = profile
+    if changed:
+        write_knights(changed)
+    errors.sort(key=lambda e: e["index"])
+    return {"updated": list(changed.values()), "errors": errors}
+
+
+def delete_knights(names: Iterable[str]) -> Dict:
+    """Delete many knights in one storage write.
+
+    Returns ``{"deleted": [names], "errors": [...]}`` (unknown names are
+    errors).
+    """
+
+    items = list(names)
+    existing = load_knights(name for name in items if isinstance(name, str))
+    errors = [_error(i, name, NOT_FOUND) for i, name in enumerate(items) if not isinstance(name, str) or name not in existing]
+    deleted = list(dict.fromkeys(name for name in items if isinstance(name, str) and name in existing))
+    if deleted:
+        write_knights({}, deleted)
+    return {"deleted": deleted, "errors": errors}
+
+
+def import_knights(lines: Iterable[Union[str, bytes]], batch_size: int = IMPORT_BATCH) -> Dict:
+    """Create or replace knights from NDJSON, one profile object per line.
+
+    Lines are consumed as they arrive and written every ``batch_size``
+    profiles (one storage write each), so imports of any size run in
+    bounded memory. Missing fields get new-knight defaults; lines with an
+    invalid field (see :func:`field_error`) are skipped. Returns
+    ``{"imported": count, "errors": [...]}`` where ``index`` is the 1-based
+    line number.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    imported = 0
+    errors: List[Dict] = []
+    batch: Dict[str, Dict] = {}
+    for lineno, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            errors.append(_error(lineno, None, "JSON inválido"))
+            continue
+        name = item.get("name") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not valid_name(name):
+            errors.append(_error(lineno, name, INVALID_NAME))
+            continue
+        error = field_error({k: v for k, v in item.items() if k != "name"})
+        if error is not None:
+            errors.append(_error(lineno, name, error))
+            continue
+        batch[name] = {**new_profile(name), **item}
+        if len(batch) >= batch_size:
+            write_knights(batch)
+            imported += len(batch)
+            batch = {}
+    if batch:
+        write_knights(batch)
+        imported += len(batch)
+    return {"imported": imported, "errors": errors}
+
+
+def export_knights() -> Iterator[str]:
+    """Yield every profile as one NDJSON line (with trailing newline)."""
+
+    for profile in iter_knights():
+        yield json.dumps(profile, ensure_ascii=False) + "\n"
@@ -2,18 +2,89 @@
 
 This engine uses:
 - collections.deque for the input buffer
-- queue.Queue for a simple event bus between API and engine
+- a fixed-capacity :class:`game.events.EventRing` for outbound events
 - basic AABB collision for attacks
+
+The hot path avoids per-tick garbage: characters refill their own
+:class:`~game.abstracts.Hitbox` on each attack and events overwrite
+preallocated records in the ring, which keeps the last ``EVENT_CAPACITY``
+events for clients to read by sequence number.
+
+Besides the main ``enemy`` the world can hold any number of extra hostile
+``entities`` (minions, projectiles, further bosses). Attacks are resolved
+with a direct AABB test per attacker/target pair, in a plain loop that
+allocates nothing: the sword only ever meets the hostiles and the hostiles
+only ever meet the knight, so a spatial index would have to be rebuilt
+every tick to answer one query and costs more than it saves.
+
+The simulation is deterministic: the same starting state and the same
+inputs applied on the same frames always give the same snapshots. An
+optional ``recorder`` (see :mod:`game.replay`) is told about every applied
+input and every finished step, which is all a replay needs.
+
+In boss-rush (wave) mode, started with :meth:`GameEngine.start_wave`, the
+engine fights a whole sequence of bosses: the knight keeps its state from
+stage to stage, the next boss is built one step after the previous stage
+began, and the step that kills a boss swaps the preloaded one in, so stage
+transitions never wait on asset loading or disk. A :class:`Wave` tracks
+the stage and the frames every cleared stage took, and its ``on_end``
+callback runs once the run is over.
+
+:meth:`GameEngine.fast_forward` advances many ticks at once, e.g. to catch
+up a session the scheduler stopped stepping while nobody watched it. Steps
+that apply no input and in which no attack can land (the boss has not
+reached the knight yet, or has already walked past it, and only moves
+further away) are skipped in closed form with the characters' ``advance``
+methods; the rest run normally. The result is identical to stepping.
 """
 
 from __future__ import annotations
 
 from collections import deque
 from dataclasses import dataclass, field
-from queue import Queue
-from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, List, Optional, Tuple
 
 from .entities import Enemy, Knight
+from .events import EventRing
+from .utils import clamp_position
+
+if TYPE_CHECKING:
+    from .metrics import StepMetrics
+    from .replay import FightRecorder
+
+BODY_HALF = 10  # characters collide as 20x20 boxes centred on their position
+EVENT_CAPACITY = 256  # recent events kept per engine
+INPUT_CAPACITY = 64  # queued inputs per engine
+INPUT_MAX_LEAD = 120  # default of how far ahead of the current frame an input may be scheduled
+STEP_DT = 0.016  # game seconds one step advances, whatever the tick rate
+# Action ids shared with recorded inputs (game.replay) and the batch simulator
+ACTION_NAMES: List[str] = ["", "move_left", "move_right", "attack", "jump", "dash"]
+ACTION_IDS: Dict[str, int] = {name: i for i, name in enumerate(ACTION_NAMES)}
+ACTIONS = frozenset(ACTION_NAMES[1:])
+_OPPOSITE = {"move_left": "move_right", "move_right": "move_left"}
+
+
+def coalesce_inputs(entries: Iterable[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """Drop redundant entries from a batch of ``(client_frame, action)`` inputs.
+
+    Entries are ordered by frame (stable for ties). Exact duplicates on the
+    same frame collapse into one, and a move immediately followed by the
+    opposite move cancel out since together they leave the knight where it
+    was. Raises ``ValueError`` for unknown actions.
+    """
+
+    out: List[Tuple[int, str]] = []
+    for frame, action in sorted(entries, key=lambda e: e[0]):
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action: {action!r}")
+        if out and out[-1] == (frame, action):
+            continue
+        if out and _OPPOSITE.get(action) == out[-1][1]:
+            out.pop()
+            continue
+        out.append((frame, action))
+    return out
 
 
 def aabb_overlap(ax: int, ay: int, aw: int, ah: int, bx: int, by: int, bw: int, bh: int) -> bool:
@@ -22,6 +93,61 @@ def aabb_overlap(ax: int, ay: int, aw: int, ah: int, bx: int, by: int, bw: int,
     return (ax < bx + bw) and (bx < ax + aw) and (ay < by + bh) and (by < ay + ah)
 
 
+@dataclass
+class Wave:
+    """Progress of a boss-rush run through ``order``.
+
+    Attributes
+    ----------
+    order:
+        Boss ids fought one after the other.
+    create:
+        Builds the enemy of a boss id (e.g. :func:`game.level.create_enemy`).
+    stage:
+        Index in ``order`` of the boss being fought.
+    stage_start:
+        Frame the current stage began on.
+    stage_frames:
+        Frames each cleared stage took, in order.
+    next_enemy:
+        Enemy of the following stage, built ahead of the transition.
+    ended:
+        Whether the run is over (every boss beaten or the knight fell).
+    on_end:
+        Optional callback ``on_end(engine)`` run once when the run ends.
+    """
+
+    order: List[str]
+    create: Callable[[str], Enemy] = field(repr=False)
+    stage: int = 0
+    stage_start: int = 0
+    stage_frames: List[int] = field(default_factory=list)
+    next_enemy: Optional[Enemy] = field(default=None, repr=False)
+    ended: bool = False
+    on_end: Optional[Callable[["GameEngine"], None]] = field(default=None, repr=False)
+
+    @property
+    def boss_id(self) -> str:
+        return self.order[self.stage]
+
+    @property
+    def cleared(self) -> bool:
+        """Whether every stage was won."""
+
+        return len(self.stage_frames) == len(self.order)
+
+    def status(self) -> Dict[str, object]:
+        """Snapshot-friendly summary of the run."""
+
+        return {
+            "stage": self.stage + 1,
+            "stages": len(self.order),
+            "boss": self.boss_id,
+            "stage_frames": list(self.stage_frames),
+            "ended": self.ended,
+        }
+
+
 @dataclass
 class GameEngine:
     """Simple discrete-time engine to drive a single boss fight.
@@ -33,23 +159,81 @@ class GameEngine:
     enemy:
         Current enemy instance.
     inputs:
-        Buffer of queued actions, fed from API.
+        Buffer of queued ``(target_frame, action)`` inputs, fed from the API.
+        At most one is applied per step, once ``frame`` reaches its target.
     events:
-        Queue for outbound events (e.g., damage numbers) the API could consume.
+        Ring buffer of the most recent outbound events (e.g., damage
+        numbers), read by clients through ``GET /api/events``.
     frame:
         Frame counter; increases at each ``step`` invocation.
+    entities:
+        Extra hostile entities besides ``enemy``; dead ones are removed at
+        the end of each step.
+    recorder:
+        Optional :class:`game.replay.FightRecorder` logging this fight.
+    metrics:
+        Optional :class:`game.metrics.StepMetrics`; when set, one step in
+        every ``metrics.sample_every`` is timed phase by phase.
+    wave:
+        Boss-rush progress when started with :meth:`start_wave`, else
+        ``None``.
     """
 
     player: Knight
     enemy: Optional[Enemy] = None
-    inputs: Deque[str] = field(default_factory=lambda: deque(maxlen=64))
-    events: Queue = field(default_factory=Queue)
+    inputs: Deque[Tuple[int, str]] = field(default_factory=lambda: deque(maxlen=INPUT_CAPACITY))
+    events: EventRing = field(default_factory=lambda: EventRing(EVENT_CAPACITY), repr=False)
     frame: int = 0
+    entities: List[Enemy] = field(default_factory=list)
+    recorder: Optional["FightRecorder"] = field(default=None, repr=False)
+    metrics: Optional["StepMetrics"] = field(default=None, repr=False)
+    wave: Optional[Wave] = field(default=None, repr=False)
+
+    def _emit(self, type: str, amount: int, target: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Record an event for the current frame in the ring buffer."""
+
+        self.events.emit(type, amount, self.frame, target, source)
+
+    def enqueue_action(self, action: str, frame: int = 0) -> None:
+        """Push an input action into the buffer.
 
-    def enqueue_action(self, action: str) -> None:
-        """Push an input action into the buffer."""
+        Parameters
+        ----------
+        action:
+            Action name (see :meth:`_apply_action`).
+        frame:
+            Earliest frame to apply it on; ``0`` means as soon as possible.
+        """
+
+        self.inputs.append((frame, action))
 
-        self.inputs.append(action)
+    def enqueue_batch(self, entries: Iterable[Tuple[int, str]], max_lead: int = INPUT_MAX_LEAD) -> List[int]:
+        """Schedule a batch of ``(client_frame, action)`` inputs.
+
+        The batch is coalesced with :func:`coalesce_inputs`, then every input
+        gets a target frame: its ``client_frame``, but never in the past,
+        never more than ``max_lead`` frames ahead and always after the
+        input queued before it (one input per frame). Inputs that do not fit
+        in the buffer are dropped.
+
+        Returns
+        -------
+        list of int
+            Target frame of each accepted input, in order.
+        """
+
+        targets: List[int] = []
+        last = self.inputs[-1][0] if self.inputs else self.frame
+        for client_frame, action in coalesce_inputs(entries):
+            if len(self.inputs) >= INPUT_CAPACITY:
+                break
+            target = min(max(client_frame, self.frame + 1, last + 1), self.frame + max_lead)
+            if target <= last:
+                break  # lead window full
+            self.inputs.append((target, action))
+            targets.append(target)
+            last = target
+        return targets
 
     def start_boss(self, enemy: Enemy) -> None:
         """Start a new boss fight with the provided enemy."""
@@ -57,8 +241,40 @@ class GameEngine:
         self.enemy = enemy
         self.frame = 0
         self.inputs.clear()
+        self.entities.clear()
+        self.wave = None
+
+    def start_wave(
+        self,
+        order: List[str],
+        create: Callable[[str], Enemy],
+        on_end: Optional[Callable[["GameEngine"], None]] = None,
+    ) -> Wave:
+        """Start a boss rush through ``order`` with the current player.
 
-    def step(self, dt: float = 0.016) -> None:
+        ``create`` builds each boss; the first one is built now and every
+        later one a step after the previous stage began. Raises
+        ``ValueError`` if ``order`` is empty.
+        """
+
+        if not order:
+            raise ValueError("boss-rush order is empty")
+        self.start_boss(create(order[0]))
+        self.wave = Wave(order=list(order), create=create, on_end=on_end)
+        return self.wave
+
+    def spawn(self, entity: Enemy) -> None:
+        """Add an extra hostile entity (minion, projectile, wave boss)."""
+
+        self.entities.append(entity)
+
+    @property
+    def active(self) -> bool:
+        """Whether a fight is in progress (enemy present, both sides alive)."""
+
+        return self.enemy is not None and self.enemy.is_alive() and self.player.is_alive()
+
+    def step(self, dt: float = STEP_DT) -> None:
         """Advance the simulation by one fixed tick.
 
         Notes
@@ -68,17 +284,160 @@ class GameEngine:
         """
 
         self.frame += 1
+        metrics = self.metrics
+        if metrics is not None and self.frame % metrics.sample_every == 0:
+            t0 = perf_counter()
+            self._step_input()
+            t1 = perf_counter()
+            self._step_update(dt)
+            t2 = perf_counter()
+            self._step_collisions()
+            t3 = perf_counter()
+            metrics.input.observe(t1 - t0)
+            metrics.update.observe(t2 - t1)
+            metrics.collision.observe(t3 - t2)
+        else:
+            self._step_input()
+            self._step_update(dt)
+            self._step_collisions()
+
+        if self.wave is not None and not self.wave.ended:
+            self._step_wave()
+
+        if self.recorder is not None:
+            self.recorder.after_step(self, dt)
 
-        # Consume one input per frame (if available)
+    def quiet_ticks(self, limit: int) -> int:
+        """How many of the next ``limit`` steps are quiet and can be skipped.
+
+        A quiet step applies no input, runs no boss-rush transition and no
+        attack in it can land: every character supports closed-form
+        ``advance`` and the boss's attack reach stays clear of the knight's
+        body. Positions only change by a constant drift without inputs, so
+        that can be checked ahead of time.
+        """
+
+        enemy = self.enemy
+        if enemy is None or self.entities or not self.active or type(self.player).update is not Knight.update:
+            return 0
+        wave = self.wave
+        if wave is not None and not wave.ended and wave.next_enemy is None and wave.stage + 1 < len(wave.order):
+            return 0  # the next step preloads the following boss
         if self.inputs:
-            action = self.inputs.popleft()
+            limit = min(limit, self.inputs[0][0] - self.frame - 1)
+        motion = enemy.motion()
+        px, py = self.player.position
+        if limit <= 0 or motion is None or clamp_position((px, py)) != (px, py):
+            return 0
+        drift, reach_left, reach_right = motion
+        if drift > 0:
+            return 0
+        x = enemy.position[0]
+        if x + drift + reach_right <= px - BODY_HALF:
+            return limit  # already past the knight and moving away
+        if drift == 0:
+            return limit if x - reach_left >= px + BODY_HALF else 0
+        # Still to the right: safe while x + t * drift - reach_left >= px + BODY_HALF
+        return max(0, min(limit, int((x - reach_left - px - BODY_HALF) // -drift)))
+
+    def fast_forward(self, ticks: int, dt: float = STEP_DT) -> int:
+        """Advance up to ``ticks`` steps, skipping quiet ones in closed form.
+
+        Equivalent to calling :meth:`step` while the fight is active, as
+        the scheduler does, and stops when it ends. Returns the number of
+        frames advanced.
+        """
+
+        done = 0
+        while done < ticks and self.active:
+            quiet = self.quiet_ticks(ticks - done) if dt > 0 else 0
+            if quiet:
+                self._skip(quiet, dt)
+                done += quiet
+            else:
+                self.step(dt)
+                done += 1
+        return done
+
+    def _skip(self, ticks: int, dt: float) -> None:
+        """Apply ``ticks`` quiet steps (see :meth:`quiet_ticks`)."""
+
+        assert self.enemy is not None
+        recorder = self.recorder
+        while ticks > 0:
+            run = ticks
+            if recorder is not None:
+                # Stop on every keyframe frame so the recording keeps them
+                interval = recorder.keyframe_interval
+                run = min(run, interval - self.frame % interval)
+            self.player.advance(dt, run)
+            self.enemy.advance(dt, run)
+            self.frame += run
+            ticks -= run
+            if recorder is not None:
+                recorder.after_step(self, dt)
+
+    def _step_wave(self) -> None:
+        """Advance the boss rush: preload the next boss or move to it."""
+
+        wave = self.wave
+        assert wave is not None and self.enemy is not None
+        if not self.player.is_alive():
+            self._end_wave()
+        elif not self.enemy.is_alive():
+            wave.stage_frames.append(self.frame - wave.stage_start)
+            if wave.stage + 1 == len(wave.order):
+                self._end_wave()
+                return
+            # Normally preloaded; built here only if the boss fell on its first step
+            upcoming = wave.next_enemy or wave.create(wave.order[wave.stage + 1])
+            self.enemy, wave.next_enemy = upcoming, None
+            self.entities.clear()
+            wave.stage += 1
+            wave.stage_start = self.frame
+            self._emit("stage", wave.stage + 1, target=self.enemy.name)
+        elif wave.next_enemy is None and wave.stage + 1 < len(wave.order):
+            wave.next_enemy = wave.create(wave.order[wave.stage + 1])
+
+    def _end_wave(self) -> None:
+        wave = self.wave
+        assert wave is not None
+        wave.ended = True
+        if wave.on_end is not None:
+            wave.on_end(self)
+
+    def _step_input(self) -> None:
+        """Consume one input per frame (if available and due)."""
+
+        if self.inputs and self.inputs[0][0] <= self.frame:
+            _, action = self.inputs.popleft()
             self._apply_action(action)
+            if self.recorder is not None:
+                self.recorder.record(self.frame, action)
+
+    def _step_update(self, dt: float) -> None:
+        """Advance every character by ``dt``."""
 
-        # Update entities
         self.player.update(dt)
         if self.enemy:
             self.enemy.update(dt)
+        for entity in self.entities:
+            entity.update(dt)
+
+    def _step_collisions(self) -> None:
+        """Resolve hostile attacks, drop dead entities and clamp the player."""
+
+        if self.enemy:
             self._resolve_enemy_attack()
+        if self.entities:
+            self._resolve_entity_attacks()
+            # Prune in place (no new list per tick)
+            for i in range(len(self.entities) - 1, -1, -1):
+                if not self.entities[i].is_alive():
+                    del self.entities[i]
+
+        # Clamp position to arena each step
+        self.player.position = clamp_position(self.player.position)
 
     def _apply_action(self, action: str) -> None:
         """Apply a single action to update the game state.
@@ -100,15 +459,41 @@ class GameEngine:
         # jump/dash are placeholders for visuals; no physics implemented
 
     def _resolve_player_attack(self) -> None:
-        """Resolve the player's attack hitbox against the enemy."""
+        """Resolve the player's attack hitbox against the enemy and entities.
 
-        if not self.enemy:
+        With extra entities around, hit events name their target.
+        """
+
+        enemy, entities = self.enemy, self.entities
+        if not enemy and not entities:
             return
         hb = self.player.attack()
-        ex, ey = self.enemy.position
-        if aabb_overlap(hb["x"], hb["y"], hb["w"], hb["h"], ex - 10, ey - 10, 20, 20):
-            self.enemy.take_damage(int(hb["damage"]))
-            self.events.put({"type": "hit", "amount": hb["damage"], "frame": self.frame})
+        if enemy:
+            ex, ey = enemy.position
+            if aabb_overlap(hb.x, hb.y, hb.w, hb.h, ex - BODY_HALF, ey - BODY_HALF, 2 * BODY_HALF, 2 * BODY_HALF):
+                enemy.take_damage(hb.damage)
+                self._emit("hit", hb.damage, target=enemy.name if entities else None)
+        for target in entities:
+            tx, ty = target.position
+            if aabb_overlap(hb.x, hb.y, hb.w, hb.h, tx - BODY_HALF, ty - BODY_HALF, 2 * BODY_HALF, 2 * BODY_HALF):
+                target.take_damage(hb.damage)
+                self._emit("hit", hb.damage, target=target.name)
+
+    def hostiles(self) -> List[Enemy]:
+        """Return the main enemy (if any) followed by the extra entities."""
+
+        return ([self.enemy] if self.enemy else []) + self.entities
+
+    def _resolve_entity_attacks(self) -> None:
+        """Resolve every extra entity's hitbox against the player."""
+
+        px, py = self.player.position
+        bx, by = px - BODY_HALF, py - BODY_HALF
+        for entity in self.entities:
+            hb = entity.attack()
+            if aabb_overlap(hb.x, hb.y, hb.w, hb.h, bx, by, 2 * BODY_HALF, 2 * BODY_HALF):
+                self.player.take_damage(hb.damage)
+                self._emit("player_hit", hb.damage, source=entity.name)
 
     def _resolve_enemy_attack(self) -> None:
         """Resolve the enemy attack hitbox against the player."""
@@ -117,9 +502,9 @@ class GameEngine:
             return
         hb = self.enemy.attack()
         px, py = self.player.position
-        if aabb_overlap(hb["x"], hb["y"], hb["w"], hb["h"], px - 10, py - 10, 20, 20):
-            self.player.take_damage(int(hb["damage"]))
-            self.events.put({"type": "player_hit", "amount": hb["damage"], "frame": self.frame})
+        if aabb_overlap(hb.x, hb.y, hb.w, hb.h, px - BODY_HALF, py - BODY_HALF, 2 * BODY_HALF, 2 * BODY_HALF):
+            self.player.take_damage(hb.damage)
+            self._emit("player_hit", hb.damage)
 
     def snapshot(self) -> Dict[str, object]:
         """Return an immutable snapshot of the current state for the API."""
@@ -135,7 +520,7 @@ class GameEngine:
         else:
             enemy_state = None
 
-        return {
+        snap: Dict[str, object] = {
             "frame": self.frame,
             "player": {
                 "name": self.player.name,
@@ -146,5 +531,12 @@ class GameEngine:
                 "alive": self.player.is_alive(),
             },
             "enemy": enemy_state,
+            "entities": [
+                {"name": e.name, "health": e.health, "position": e.position, "alive": e.is_alive()}
+                for e in self.entities
+            ],
         }
+        if self.wave is not None:
+            snap["wave"] = self.wave.status()
+        return snap
 
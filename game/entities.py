@@ -3,17 +3,33 @@
 This module implements the concrete classes derived from :class:`game.abstracts.Character`.
 It demonstrates encapsulation (private gold with property), inheritance, and
 polymorphism across ``update``, ``attack``, and ``take_damage``.
+
+Entities are slotted dataclasses and each owns a preallocated
+:class:`~game.abstracts.Hitbox` that ``attack`` refills in place, so a tick
+does not allocate per-attack dicts. Because ``slots=True`` rebuilds the class,
+methods call parent implementations explicitly (``Enemy.attack(self)``)
+instead of through zero-argument ``super()``.
+
+Characters can also jump ``ticks`` updates ahead in closed form with
+``advance`` (see :meth:`game.engine.GameEngine.fast_forward`): positions
+drift linearly, and float timers use :func:`game.utils.repeat_add` or the
+cycle of the ogre's slam cooldown, so the result is bit-for-bit what the
+same number of ticks would give.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, Tuple
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from .abstracts import Character, Hitbox
+from .utils import repeat_add
 
-from .abstracts import Character
+OGRE_SLAM_COOLDOWN = 2.5  # seconds between ogre slams
+MAX_CYCLE = 100_000  # longest cooldown cycle worth caching, in ticks
 
 
-@dataclass
+@dataclass(slots=True)
 class Knight(Character):
     """Player-controlled knight and main CRUD entity.
 
@@ -39,6 +55,7 @@ class Knight(Character):
     position: Tuple[int, int] = (50, 50)
     _Knight__gold: int = field(default=0, repr=False)
     skin: str = "default"
+    _hitbox: Hitbox = field(default_factory=Hitbox, init=False, repr=False, compare=False)
 
     def update(self, dt: float) -> None:
         """Regenerate stamina slightly every tick.
@@ -51,11 +68,23 @@ class Knight(Character):
 
         self.stamina = min(100.0, self.stamina + 10.0 * dt)
 
-    def attack(self) -> Dict[str, int | float | str]:
+    def advance(self, dt: float, ticks: int) -> None:
+        """Same as ``ticks`` calls of :meth:`update`, in closed form."""
+
+        gain = 10.0 * dt
+        if gain > 0:
+            # Sums only grow, so clamping once at the end equals clamping every tick
+            if ticks > 0:
+                self.stamina = min(100.0, repeat_add(self.stamina, gain, ticks))
+        else:
+            for _ in range(ticks):
+                self.update(dt)
+
+    def attack(self) -> Hitbox:
         """Sword slash attack: small AABB in front of the knight."""
 
         x, y = self.position
-        return {"type": "aabb", "x": x + 20, "y": y, "w": 20, "h": 10, "damage": 10}
+        return self._hitbox.set(x + 20, y, 20, 10, 10)
 
     def take_damage(self, amount: int) -> None:
         """Reduce health by ``amount`` (non-negative)."""
@@ -81,7 +110,7 @@ class Knight(Character):
         self._Knight__gold = max(0, int(value))
 
 
-@dataclass
+@dataclass(slots=True)
 class Enemy(Character):
     """Base enemy with simple behavior.
 
@@ -92,15 +121,38 @@ class Enemy(Character):
     health: int
     position: Tuple[int, int]
     attack_damage: int = 8
+    _hitbox: Hitbox = field(default_factory=Hitbox, init=False, repr=False, compare=False)
+
+    def __copy__(self) -> "Enemy":
+        # Clones get their own hitbox instead of sharing the original's
+        return replace(self)
 
     def update(self, dt: float) -> None:  # pragma: no cover - base noop
         """Default enemy update: no movement in base class."""
 
-    def attack(self) -> Dict[str, int | float | str]:
+    def attack(self) -> Hitbox:
         """Default melee AABB around current position."""
 
         x, y = self.position
-        return {"type": "aabb", "x": x - 10, "y": y, "w": 20, "h": 10, "damage": self.attack_damage}
+        return self._hitbox.set(x - 10, y, 20, 10, self.attack_damage)
+
+    def motion(self) -> Optional[Tuple[int, int, int]]:
+        """``(drift, reach_left, reach_right)`` if :meth:`advance` is supported.
+
+        ``drift`` is the x change of every :meth:`update`; every
+        :meth:`attack` hitbox lies within ``reach_left``/``reach_right``
+        pixels of the position. ``None`` (the default for subclasses that
+        change ``update`` or ``attack`` without overriding this) means
+        ticks cannot be skipped.
+        """
+
+        return (0, 10, 10) if _unchanged(self, Enemy) else None
+
+    def advance(self, dt: float, ticks: int) -> None:
+        """Apply ``ticks`` rounds of :meth:`update` and a missed :meth:`attack`.
+
+        Only valid when :meth:`motion` is not ``None``.
+        """
 
     def take_damage(self, amount: int) -> None:
         """Reduce health by ``amount`` (non-negative)."""
@@ -117,16 +169,26 @@ class Enemy(Character):
 class Goblin(Enemy):
     """Goblin: quick pokes, small HP, erratic horizontal movement."""
 
+    __slots__ = ()
+
     def update(self, dt: float) -> None:
         x, y = self.position
         self.position = (x - 15, y)
 
-    def attack(self) -> Dict[str, int | float | str]:
-        hb = super().attack()
-        hb["damage"] = 6
+    def attack(self) -> Hitbox:
+        hb = Enemy.attack(self)
+        hb.damage = 6
         return hb
 
+    def motion(self) -> Optional[Tuple[int, int, int]]:
+        return (-15, 10, 10) if _unchanged(self, Goblin) else None
+
+    def advance(self, dt: float, ticks: int) -> None:
+        x, y = self.position
+        self.position = (x - 15 * ticks, y)
+
 
+@dataclass(slots=True)
 class Ogre(Enemy):
     """Ogre: slow, heavy slam, higher HP."""
 
@@ -137,14 +199,66 @@ class Ogre(Enemy):
         self.position = (x - 5, y)
         self.slam_cooldown = max(0.0, self.slam_cooldown - dt)
 
-    def attack(self) -> Dict[str, int | float | str]:
+    def attack(self) -> Hitbox:
         if self.slam_cooldown <= 0:
-            self.slam_cooldown = 2.5
+            self.slam_cooldown = OGRE_SLAM_COOLDOWN
             x, y = self.position
-            return {"type": "aabb", "x": x - 30, "y": y - 5, "w": 60, "h": 20, "damage": 14}
-        return super().attack()
+            return self._hitbox.set(x - 30, y - 5, 60, 20, 14)
+        return Enemy.attack(self)
+
+    def motion(self) -> Optional[Tuple[int, int, int]]:
+        return (-5, 30, 30) if _unchanged(self, Ogre) else None
+
+    def advance(self, dt: float, ticks: int) -> None:
+        x, y = self.position
+        self.position = (x - 5 * ticks, y)
+        # The cooldown ticks down and every attack at zero resets it, so once
+        # it has been reset it repeats a fixed cycle
+        cooldown = self.slam_cooldown
+        while ticks > 0 and cooldown != OGRE_SLAM_COOLDOWN:
+            cooldown = _slam_tick(cooldown, dt)
+            ticks -= 1
+        if ticks > 0:
+            cycle = _slam_cycle(dt)
+            if cycle is not None:
+                cooldown = cycle[ticks % len(cycle)]
+            else:
+                for _ in range(ticks):
+                    cooldown = _slam_tick(cooldown, dt)
+        self.slam_cooldown = cooldown
+
+
+def _slam_tick(cooldown: float, dt: float) -> float:
+    """One ogre tick of the slam cooldown: :meth:`Ogre.update`, then an attack."""
+
+    cooldown = max(0.0, cooldown - dt)
+    return OGRE_SLAM_COOLDOWN if cooldown <= 0 else cooldown
 
 
+_slam_cycles: Dict[float, Optional[List[float]]] = {}
+
+
+def _slam_cycle(dt: float) -> Optional[List[float]]:
+    """Cooldown values from a fresh slam until the next one, for tick ``dt``.
+
+    ``None`` when the cycle would exceed :data:`MAX_CYCLE` ticks (or never
+    close, for ``dt <= 0``).
+    """
+
+    if dt in _slam_cycles:
+        return _slam_cycles[dt]
+    cycle: Optional[List[float]] = None
+    if dt > 0 and OGRE_SLAM_COOLDOWN / dt < MAX_CYCLE:
+        cycle = [OGRE_SLAM_COOLDOWN]
+        value = _slam_tick(OGRE_SLAM_COOLDOWN, dt)
+        while value != OGRE_SLAM_COOLDOWN:
+            cycle.append(value)
+            value = _slam_tick(value, dt)
+    _slam_cycles[dt] = cycle
+    return cycle
+
+
+@dataclass(slots=True)
 class Dragon(Enemy):
     """Dragon: breathes bursts of fire; faster horizontal drift."""
 
@@ -155,8 +269,46 @@ class Dragon(Enemy):
         self.position = (x - 20, y)
         self.breath_phase += dt
 
-    def attack(self) -> Dict[str, int | float | str]:
+    def attack(self) -> Hitbox:
         x, y = self.position
         wide = 40 if int(self.breath_phase) % 2 == 0 else 20
-        return {"type": "aabb", "x": x - 50, "y": y - 5, "w": 100, "h": wide, "damage": 8}
+        return self._hitbox.set(x - 50, y - 5, 100, wide, 8)
+
+    def motion(self) -> Optional[Tuple[int, int, int]]:
+        return (-20, 50, 50) if _unchanged(self, Dragon) else None
+
+    def advance(self, dt: float, ticks: int) -> None:
+        x, y = self.position
+        self.position = (x - 20 * ticks, y)
+        self.breath_phase = repeat_add(self.breath_phase, dt, ticks)
+
+
+@dataclass(slots=True)
+class Projectile(Enemy):
+    """Hostile projectile (e.g. dragon fire): flies straight, expires after ``ttl``.
+
+    ``velocity`` is in pixels per tick (negative flies left). The projectile
+    is removed from the world when its ``ttl`` (seconds) runs out or it is
+    destroyed by a sword hit.
+    """
+
+    velocity: int = -25
+    ttl: float = 2.0
+
+    def update(self, dt: float) -> None:
+        x, y = self.position
+        self.position = (x + self.velocity, y)
+        self.ttl -= dt
+        if self.ttl <= 0:
+            self.health = 0
+
+    def attack(self) -> Hitbox:
+        x, y = self.position
+        return self._hitbox.set(x - 5, y - 5, 10, 10, self.attack_damage)
+
+
+def _unchanged(enemy: Enemy, cls: type) -> bool:
+    """Whether ``enemy`` moves and attacks exactly like ``cls``."""
 
+    kind = type(enemy)
+    return kind.update is cls.update and kind.attack is cls.attack  # type: ignore[attr-defined]
@@ -0,0 +1,150 @@
+"""Engine events (hits, damage numbers) and the ring buffer that holds them.
+
+Events are small slotted records instead of dicts. The engine writes them
+into an :class:`EventRing`: a fixed number of records, each created the
+first time its slot is used and overwritten in place afterwards, so memory
+stays bounded however long a session runs, emitting an event allocates
+nothing once the ring has wrapped, and an idle engine costs almost nothing.
+
+Every event gets a monotonically increasing sequence number. Readers keep
+their own cursor (the last sequence they saw) and ask for everything after
+it; a reader that fell more than ``capacity`` events behind receives a
+``"gap"`` marker telling it how many events it missed.
+
+The ring has a single writer (the thread stepping the engine) and takes no
+lock. Readers copy a record and check that its sequence number did not
+change while copying; a record overwritten mid-read counts as missed.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+
+class Event:
+    """One engine event, e.g. a sword hit (``"hit"``) or ``"player_hit"``.
+
+    Attributes
+    ----------
+    seq:
+        Sequence number in the owning ring (``-1`` while being written).
+    type:
+        Event kind.
+    amount:
+        Damage dealt.
+    frame:
+        Engine frame on which it happened.
+    target, source:
+        Names of the entity hit / the entity that hit the player, when the
+        fight has more than one hostile.
+    """
+
+    __slots__ = ("seq", "type", "amount", "frame", "target", "source")
+
+    def __init__(self) -> None:
+        self.seq = -1
+        self.type = ""
+        self.amount = 0
+        self.frame = 0
+        self.target: Optional[str] = None
+        self.source: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, object]:
+        """Return a JSON-ready dict (only the fields that are set)."""
+
+        out: Dict[str, object] = {"seq": self.seq, "type": self.type, "amount": self.amount, "frame": self.frame}
+        if self.target is not None:
+            out["target"] = self.target
+        if self.source is not None:
+            out["source"] = self.source
+        return out
+
+    def __repr__(self) -> str:
+        return f"Event({self.as_dict()!r})"
+
+
+class EventRing:
+    """Fixed-capacity ring of :class:`Event` records.
+
+    Parameters
+    ----------
+    capacity:
+        Number of most recent events kept.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._records: List[Optional[Event]] = [None] * capacity
+        self.next_seq = 0  # sequence number the next event will get
+
+    @property
+    def oldest(self) -> int:
+        """Sequence number of the oldest event still held."""
+
+        return max(0, self.next_seq - self.capacity)
+
+    def __len__(self) -> int:
+        return self.next_seq - self.oldest
+
+    def emit(
+        self,
+        type: str,
+        amount: int,
+        frame: int,
+        target: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> None:
+        """Record an event, overwriting the oldest one when full."""
+
+        seq = self.next_seq
+        slot = seq % self.capacity
+        event = self._records[slot]
+        if event is None:
+            event = self._records[slot] = Event()
+        event.seq = -1  # readers skip the record while it is half written
+        event.type = type
+        event.amount = amount
+        event.frame = frame
+        event.target = target
+        event.source = source
+        event.seq = seq
+        self.next_seq = seq + 1
+
+    def since(self, cursor: int, limit: Optional[int] = None) -> Tuple[List[Dict[str, object]], int]:
+        """Return ``(events, next_cursor)`` for the events with ``seq >= cursor``.
+
+        Events are dicts, oldest first. If events the caller has not seen
+        were already overwritten, the list starts with ``{"type": "gap",
+        "from": cursor, "to": <first kept seq>, "missed": <count>}``.
+        ``limit`` caps the number of events returned (the gap marker does not
+        count). ``next_cursor`` is what to pass on the following call; a
+        cursor ahead of the ring (e.g. from a previous engine) is pulled back
+        to :attr:`next_seq`.
+        """
+
+        end = self.next_seq
+        start = min(max(cursor, 0), end)
+        out: List[Dict[str, object]] = []
+        first = last = -1
+        for seq in range(max(start, end - self.capacity), end):
+            if limit is not None and len(out) >= limit:
+                break
+            event = self._records[seq % self.capacity]
+            if event is None:
+                continue  # slot never written (e.g. after a restore)
+            record = event.as_dict()
+            if event.seq != seq or record["seq"] != seq:
+                continue  # overwritten while we were reading
+            out.append(record)
+            if first < 0:
+                first = seq
+            last = seq
+        if not out:
+            # Nothing readable in [start, end): all of it was missed
+            first = end
+            last = end - 1
+        if first > start:
+            out.insert(0, {"type": "gap", "from": start, "to": first, "missed": first - start})
+        return out, last + 1
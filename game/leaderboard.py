@@ -0,0 +1,341 @@
+"""Leaderboards kept sorted as profiles change.
+
+Ranking profiles used to mean loading all of them with
+:func:`game.storage.list_knights` and sorting per request. A
+:class:`Leaderboard` instead keeps one sorted index per board:
+
+- ``gold``: most gold first;
+- ``defeated``: most distinct bosses in ``progress.defeated`` first;
+- ``best_time``: fastest kill (``progress.best_times``, seconds) first;
+  profiles without a kill are not ranked.
+
+The indexes are built from storage once, on the first query, and then
+updated incrementally by a :func:`game.storage.add_listener` callback on
+every ``save_knight``/``delete_knight``. Each index is a
+:class:`SortedKeys`: a list of sorted buckets of at most ``2 * LOAD`` keys
+plus a Fenwick tree of bucket sizes, so an update costs ``O(log n + LOAD)``
+and reading ``limit`` entries from ``offset`` costs ``O(log n + limit)``,
+also at a million profiles (a flat sorted list would move half the list
+on every update).
+
+Writes made elsewhere (another shard with ``--workers``, an outside edit
+reloaded by :class:`game.cache.ProfileCache`) never reach the listener, so
+the board also watches the store's :meth:`~game.storage.ProfileStore.stamp`,
+at most once every ``CHECK_INTERVAL`` seconds, and rebuilds when it moved
+for a reason other than our own writes. Boards therefore agree across
+shards within about a second. Should an outside write land just as one of
+ours and be taken for it, the next check after ``RESYNC_INTERVAL`` seconds
+rebuilds anyway.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import storage
+
+LOAD = 512  # target bucket size of SortedKeys
+PAGE_MAX = 100  # most entries returned by one query
+CHECK_INTERVAL = 1.0  # seconds between checks of the store's stamp
+RESYNC_INTERVAL = 60.0  # seconds after which any stamp change forces a rebuild
+
+Key = Tuple[float, str]
+
+
+class SortedKeys:
+    """Sorted multiset of ``(sort_value, name)`` keys with positional access."""
+
+    def __init__(self, keys: Iterable[Key] = ()) -> None:
+        ordered = sorted(keys)
+        self._buckets: List[List[Key]] = [ordered[i : i + LOAD] for i in range(0, len(ordered), LOAD)]
+        self._maxes: List[Key] = [b[-1] for b in self._buckets]
+        self._len = len(ordered)
+        self._rebuild_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Key]:
+        for bucket in self._buckets:
+            yield from bucket
+
+    # -- Fenwick tree over bucket sizes ------------------------------------------
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(b) for b in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket: int, delta: int) -> None:
+        i, tree = bucket + 1, self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket: int) -> int:
+        """Number of keys in the buckets before ``bucket``."""
+
+        total, i, tree = 0, bucket, self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, pos: int) -> Tuple[int, int]:
+        """Return ``(bucket, index)`` of the key at position ``pos``."""
+
+        tree = self._tree
+        bucket = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(tree) and tree[nxt] <= pos:
+                bucket = nxt
+                pos -= tree[nxt]
+            step >>= 1
+        return bucket, pos
+
+    # -- updates and queries -----------------------------------------------------
+
+    def add(self, key: Key) -> None:
+        """Insert ``key``."""
+
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        bucket = self._buckets[i]
+        bisect.insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * LOAD:
+            self._buckets[i : i + 1] = [bucket[:LOAD], bucket[LOAD:]]
+            self._maxes[i : i + 1] = [bucket[LOAD - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key: Key) -> None:
+        """Remove ``key``. Raises ``KeyError`` if absent."""
+
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            raise KeyError(key)
+        bucket = self._buckets[i]
+        j = bisect.bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i], self._maxes[i]
+            self._rebuild_tree()
+
+    def index(self, key: Key) -> int:
+        """Position of ``key``. Raises ``KeyError`` if absent."""
+
+        i = bisect.bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            bucket = self._buckets[i]
+            j = bisect.bisect_left(bucket, key)
+            if j < len(bucket) and bucket[j] == key:
+                return self._prefix(i) + j
+        raise KeyError(key)
+
+    def slice(self, offset: int, limit: int) -> List[Key]:
+        """Return up to ``limit`` keys starting at position ``offset``."""
+
+        if offset >= self._len or limit <= 0:
+            return []
+        i, j = self._locate(max(0, offset))
+        out: List[Key] = []
+        while i < len(self._buckets) and len(out) < limit:
+            out += self._buckets[i][j : j + limit - len(out)]
+            i, j = i + 1, 0
+        return out
+
+
+def _number(value: object) -> Optional[float]:
+    """``value`` as a finite number, or ``None`` if it is not one."""
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return value
+
+
+def _progress(profile: Dict) -> Dict:
+    progress = profile.get("progress")
+    return progress if isinstance(progress, dict) else {}
+
+
+# Scores of malformed profiles are None: they are left unranked instead of
+# breaking the board for everyone.
+
+
+def _gold(profile: Dict) -> Optional[float]:
+    gold = _number(profile.get("gold", 0))
+    return -int(gold) if gold is not None else None
+
+
+def _defeated(profile: Dict) -> Optional[float]:
+    defeated = _progress(profile).get("defeated", [])
+    if not isinstance(defeated, list):
+        return None
+    return -len({boss for boss in defeated if isinstance(boss, str)})
+
+
+def _best_time(profile: Dict) -> Optional[float]:
+    times = _progress(profile).get("best_times")
+    if not isinstance(times, dict):
+        return None
+    valid = [t for t in map(_number, times.values()) if t is not None]
+    return float(min(valid)) if valid else None
+
+
+# Board name -> sort value of a profile (ascending; None: not ranked)
+BOARDS: Dict[str, Callable[[Dict], Optional[float]]] = {
+    "gold": _gold,
+    "defeated": _defeated,
+    "best_time": _best_time,
+}
+# Boards sorted by a negated score report it un-negated
+_NEGATED = {"gold", "defeated"}
+
+
+class Leaderboard:
+    """Sorted indexes of all profiles, one per entry of :data:`BOARDS`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._store: Optional[storage.ProfileStore] = None
+        self._keys: Dict[str, Dict[str, Key]] = {}
+        self._indexes: Dict[str, SortedKeys] = {}
+        self._stamp: Optional[object] = None  # latest stamp explained by what we know
+        self._built_stamp: Optional[object] = None
+        self._built_at = 0.0
+        self._next_check = 0.0
+        self.rebuilds = 0
+
+    def _ensure_built(self) -> None:
+        """(Re)build every index when the store or its data changed elsewhere."""
+
+        store = storage.get_store()
+        now = time.monotonic()
+        if self._store is store:
+            if now < self._next_check:
+                return
+            self._next_check = now + CHECK_INTERVAL
+            stamp = store.stamp()
+            if stamp is None or stamp == self._built_stamp:
+                return
+            if stamp == self._stamp and now - self._built_at < RESYNC_INTERVAL:
+                return  # only our own writes since the last build
+        self._rebuild(store, now)
+
+    def _rebuild(self, store: storage.ProfileStore, now: float) -> None:
+        # Read the stamp first: a write racing with list_all shows up next check
+        stamp = store.stamp()
+        profiles = storage.list_knights()
+        self._keys = {board: {} for board in BOARDS}
+        for name, profile in profiles.items():
+            for board, score in BOARDS.items():
+                value = score(profile)
+                if value is not None:
+                    self._keys[board][name] = (value, name)
+        self._indexes = {board: SortedKeys(keys.values()) for board, keys in self._keys.items()}
+        self._store = store
+        self._stamp = self._built_stamp = stamp
+        self._built_at = self._next_check = now
+        self._next_check += CHECK_INTERVAL
+        self.rebuilds += 1
+
+    def on_change(self, name: str, profile: Optional[Dict]) -> None:
+        """Storage listener: re-rank ``name`` (``profile=None``: deleted)."""
+
+        with self._lock:
+            store = storage.get_store()
+            if self._store is None or self._store is not store:
+                return  # not built yet, or stale; the next query rebuilds
+            # Our write moved the stamp; do not take it for an outside one
+            self._stamp = store.stamp()
+            for board, score in BOARDS.items():
+                keys, index = self._keys[board], self._indexes[board]
+                value = score(profile) if profile is not None else None
+                new = (value, name) if value is not None else None
+                old = keys.get(name)
+                if old == new:
+                    continue
+                if old is not None:
+                    index.remove(old)
+                    del keys[name]
+                if new is not None:
+                    index.add(new)
+                    keys[name] = new
+
+    def page(self, by: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict[str, object]]]:
+        """Return ``(total, entries)`` of board ``by`` from rank ``offset + 1``.
+
+        Raises ``ValueError`` for an unknown board.
+        """
+
+        if by not in BOARDS:
+            raise ValueError(f"unknown leaderboard {by!r}")
+        limit = max(0, min(limit, PAGE_MAX))
+        offset = max(0, offset)
+        with self._lock:
+            self._ensure_built()
+            index = self._indexes[by]
+            keys = index.slice(offset, limit)
+            total = len(index)
+        sign = -1 if by in _NEGATED else 1
+        entries = [
+            {"rank": offset + i + 1, "name": name, "score": _plain(sign * value)}
+            for i, (value, name) in enumerate(keys)
+        ]
+        return total, entries
+
+    def rank(self, by: str, name: str) -> Optional[int]:
+        """1-based rank of ``name`` on board ``by``, or ``None`` if unranked."""
+
+        if by not in BOARDS:
+            raise ValueError(f"unknown leaderboard {by!r}")
+        with self._lock:
+            self._ensure_built()
+            key = self._keys[by].get(name)
+            return self._indexes[by].index(key) + 1 if key is not None else None
+
+
+def _plain(value: float) -> object:
+    return int(value) if float(value).is_integer() else round(value, 3)
+
+
+_leaderboard: Optional[Leaderboard] = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard() -> Leaderboard:
+    """Return the process-wide leaderboard, subscribing it to storage on first use."""
+
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                board = Leaderboard()
+                storage.add_listener(board.on_change)
+                _leaderboard = board
+    return _leaderboard
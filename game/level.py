@@ -2,18 +2,46 @@
 
 Loads enemy and level configs from JSON assets and exposes helpers to create
 enemies for the requested boss id.
+
+The :class:`AssetRegistry` reads and validates ``enemies.json`` and
+``levels.json`` once, builds one prototype enemy per boss id and hands out
+cheap shallow clones of it. Files are re-checked for changes (by mtime) at
+most every ``check_interval`` seconds; a changed file is loaded into a fresh
+set of prototypes that replaces the old one in a single assignment, so fights
+already running keep their own enemy instances untouched. An invalid edit is
+reported in :attr:`AssetRegistry.last_error` and the previous assets stay in
+use.
+
+Which class an entry instantiates comes from its ``"class"`` key, looked up in
+:data:`ENEMY_CLASSES`; new bosses reusing an existing behaviour only need a
+new JSON entry, and new behaviours register with :func:`register_enemy_class`.
 """
 
 from __future__ import annotations
 
+import copy
 import json
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple, Type
 
-from .entities import Dragon, Enemy, Goblin, Ogre
+from .entities import Dragon, Enemy, Goblin, Ogre, Projectile
 
 ASSETS_DIR = Path(__file__).parent / "assets"
 
+ENEMY_CLASSES: Dict[str, Type[Enemy]] = {"Goblin": Goblin, "Ogre": Ogre, "Dragon": Dragon, "Projectile": Projectile}
+
+
+def register_enemy_class(cls: Type[Enemy]) -> Type[Enemy]:
+    """Make ``cls`` available to ``enemies.json`` under its class name.
+
+    Usable as a class decorator.
+    """
+
+    ENEMY_CLASSES[cls.__name__] = cls
+    return cls
+
 
 def load_json(path: Path) -> Dict:
     """Load and return JSON from a file path."""
@@ -22,28 +50,155 @@ def load_json(path: Path) -> Dict:
         return json.load(f)
 
 
-def create_enemy(boss_id: str) -> Enemy:
-    """Create an enemy instance from asset configs.
+def build_enemy(boss_id: str, cfg: Dict) -> Enemy:
+    """Validate one ``enemies.json`` entry and build the enemy it describes.
+
+    Raises ``ValueError`` with the offending boss id on invalid data.
+    """
+
+    class_name = cfg.get("class", boss_id.capitalize())
+    cls = ENEMY_CLASSES.get(class_name)
+    if cls is None:
+        raise ValueError(f"{boss_id}: unknown enemy class {class_name!r}")
+    hp = cfg.get("health", 80)
+    if not isinstance(hp, int) or hp <= 0:
+        raise ValueError(f"{boss_id}: health must be a positive integer")
+    damage = cfg.get("attack_damage", 8)
+    if not isinstance(damage, int) or damage < 0:
+        raise ValueError(f"{boss_id}: attack_damage must be a non-negative integer")
+    start = cfg.get("start_pos", [220, 50])
+    if not (isinstance(start, list) and len(start) == 2 and all(isinstance(v, int) for v in start)):
+        raise ValueError(f"{boss_id}: start_pos must be [x, y] integers")
+    pos: Tuple[int, int] = (start[0], start[1])
+    return cls(name=str(cfg.get("name", class_name)), health=hp, position=pos, attack_damage=damage)
+
+
+class AssetRegistry:
+    """Validated, cached, hot-reloadable view of the JSON assets.
 
     Parameters
     ----------
-    boss_id:
-        One of ``"goblin"``, ``"ogre"``, ``"dragon"``.
+    assets_dir:
+        Directory containing ``enemies.json`` and ``levels.json``.
+    check_interval:
+        Minimum seconds between mtime checks for hot reload.
     """
 
-    enemies = load_json(ASSETS_DIR / "enemies.json")
-    cfg = enemies.get(boss_id)
-    if not cfg:
-        raise ValueError(f"Unknown boss_id: {boss_id}")
+    def __init__(self, assets_dir: Path = ASSETS_DIR, check_interval: float = 1.0) -> None:
+        self.assets_dir = Path(assets_dir)
+        self.check_interval = check_interval
+        self.last_error: Optional[str] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtimes: Tuple[int, int] = (0, 0)
+        self._prototypes: Dict[str, Enemy] = {}
+        self._configs: Dict[str, Dict] = {}
+        self._order: List[str] = []
+        self.reload()
+
+    @property
+    def _paths(self) -> Tuple[Path, Path]:
+        return self.assets_dir / "enemies.json", self.assets_dir / "levels.json"
+
+    def _current_mtimes(self) -> Tuple[int, int]:
+        enemies, levels = self._paths
+        return enemies.stat().st_mtime_ns, levels.stat().st_mtime_ns
+
+    def reload(self) -> None:
+        """Load and validate both files, then swap them in atomically.
+
+        Raises ``ValueError`` if the assets are invalid; nothing is replaced
+        in that case.
+        """
+
+        enemies_path, levels_path = self._paths
+        mtimes = self._current_mtimes()
+        configs = load_json(enemies_path)
+        if not isinstance(configs, dict) or not configs:
+            raise ValueError("enemies.json must be a non-empty object")
+        prototypes = {boss_id: build_enemy(boss_id, cfg) for boss_id, cfg in configs.items()}
+        order = load_json(levels_path).get("order", [])
+        unknown = [boss_id for boss_id in order if boss_id not in prototypes]
+        if unknown:
+            raise ValueError(f"levels.json: unknown boss ids in order: {unknown}")
+
+        with self._lock:
+            self._prototypes, self._configs, self._order = prototypes, configs, list(order)
+            self._mtimes = mtimes
+            self.reloads += 1
+            self.last_error = None
 
-    pos: Tuple[int, int] = tuple(cfg.get("start_pos", [220, 50]))  # type: ignore[assignment]
-    hp: int = int(cfg.get("health", 80))
-    if boss_id == "goblin":
-        return Goblin(name="Goblin", health=hp, position=pos, attack_damage=6)
-    if boss_id == "ogre":
-        return Ogre(name="Ogre", health=hp, position=pos, attack_damage=12)
-    if boss_id == "dragon":
-        return Dragon(name="Dragon", health=hp, position=pos, attack_damage=8)
+    def maybe_reload(self) -> bool:
+        """Reload if a file changed since the last load. Returns True if so."""
 
-    raise ValueError(f"Unsupported boss: {boss_id}")
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        try:
+            if self._current_mtimes() == self._mtimes:
+                return False
+            self.reload()
+        except (OSError, ValueError) as exc:
+            # Keep serving the last good assets
+            self.last_error = str(exc)
+            return False
+        return True
+
+    def create_enemy(self, boss_id: str) -> Enemy:
+        """Return a fresh enemy cloned from the ``boss_id`` prototype."""
+
+        self.maybe_reload()
+        proto = self._prototypes.get(boss_id)
+        if proto is None:
+            raise ValueError(f"Unknown boss_id: {boss_id}")
+        return copy.copy(proto)
+
+    def enemy_config(self, boss_id: str) -> Dict:
+        """Return the raw ``enemies.json`` entry for ``boss_id``."""
+
+        self.maybe_reload()
+        cfg = self._configs.get(boss_id)
+        if cfg is None:
+            raise ValueError(f"Unknown boss_id: {boss_id}")
+        return dict(cfg)
+
+    def boss_ids(self) -> List[str]:
+        """Return every known boss id."""
+
+        self.maybe_reload()
+        return list(self._prototypes)
+
+    def order(self) -> List[str]:
+        """Return the boss-rush order from ``levels.json``."""
+
+        self.maybe_reload()
+        return list(self._order)
+
+
+_registry: Optional[AssetRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_assets() -> AssetRegistry:
+    """Return the shared registry, loading the assets on first use."""
+
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AssetRegistry()
+    return _registry
+
+
+def create_enemy(boss_id: str) -> Enemy:
+    """Create an enemy instance from asset configs.
+
+    Parameters
+    ----------
+    boss_id:
+        A key of ``enemies.json``, e.g. ``"goblin"``, ``"ogre"``, ``"dragon"``.
+    """
 
+    return get_assets().create_enemy(boss_id)
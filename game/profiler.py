@@ -0,0 +1,171 @@
+"""On-demand sampling profiler producing collapsed stacks.
+
+:class:`SamplingProfiler` starts a background thread only while a profile is
+being taken; it reads the Python stack of every other thread with
+``sys._current_frames()`` every ``interval`` seconds and counts identical
+stacks. Nothing is installed in the interpreter (no ``sys.setprofile`` or
+tracing hooks), so when no profile is running the cost is zero, and while
+one runs the profiled threads are never instrumented, only observed.
+
+The sampler can only look at other threads when it holds the GIL, so
+without help it would mostly see them at the points where they yield it
+voluntarily (``time.sleep(0)`` between scheduler batches, I/O). While a
+profile runs the interpreter switch interval is lowered to
+``SWITCH_INTERVAL`` so the GIL also changes hands in the middle of pure
+Python work; it is restored afterwards.
+
+The result is the "collapsed stack" text understood by ``flamegraph.pl``,
+speedscope and similar tools: one line per distinct stack, frames from the
+thread root to the leaf separated by ``;``, followed by the sample count::
+
+    Thread-3;_bootstrap (threading.py);...;step (game/engine.py) 42
+
+Threads parked in a blocking wait (idle request workers, the scheduler
+between ticks) are skipped unless ``include_idle`` is set, so the output
+shows where the busy time goes. The API exposes it as the admin-only
+``POST /api/admin/profile`` (see :mod:`game.api`).
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Callable, Dict, Optional
+
+DEFAULT_INTERVAL = 0.005  # seconds between samples (200 Hz)
+SWITCH_INTERVAL = 0.0002  # sys.setswitchinterval while profiling
+MAX_SECONDS = 60.0  # longest profile, also the timeout of tick-bounded runs
+# Leaf functions of a thread blocked waiting for work
+IDLE_LEAVES = frozenset({"wait", "select", "poll", "accept", "readinto", "_wait_for_tstate_lock"})
+
+_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _frame_label(frame: FrameType) -> str:
+    """``function (path)`` with paths relative to the repository when inside it."""
+
+    filename = frame.f_code.co_filename
+    try:
+        path = Path(filename).resolve().relative_to(_ROOT).as_posix()
+    except ValueError:
+        path = Path(filename).name
+    return f"{frame.f_code.co_name} ({path})"
+
+
+class SamplingProfiler:
+    """Sample the stacks of all threads for a while and collapse them.
+
+    Parameters
+    ----------
+    interval:
+        Seconds between samples.
+    ticks:
+        Optional callable returning the scheduler tick count, needed to
+        profile for a number of engine ticks instead of seconds.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, ticks: Optional[Callable[[], int]] = None) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.ticks = ticks
+        self._busy = threading.Lock()
+        self._labels: Dict[object, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._busy.locked()
+
+    def profile(
+        self,
+        seconds: Optional[float] = None,
+        ticks: Optional[int] = None,
+        include_idle: bool = False,
+        interval: Optional[float] = None,
+    ) -> "Counter[str]":
+        """Sample for ``seconds``, or until ``ticks`` more engine ticks ran.
+
+        Blocks the caller for the duration and returns the collapsed stack
+        counts. ``interval`` overrides the sampling period for this run.
+        Raises ``ValueError`` for a bad duration and ``RuntimeError`` if
+        another profile is already running.
+        """
+
+        if (seconds is None) == (ticks is None):
+            raise ValueError("give either seconds or ticks")
+        if seconds is not None and not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be in (0, {MAX_SECONDS:g}]")
+        if ticks is not None:
+            if self.ticks is None:
+                raise ValueError("tick-bounded profiles need a tick counter")
+            if ticks < 1:
+                raise ValueError("ticks must be >= 1")
+        if interval is not None and interval <= 0:
+            raise ValueError("interval must be positive")
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("a profile is already running")
+        try:
+            stacks: "Counter[str]" = Counter()
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(stacks, seconds, ticks, include_idle, interval or self.interval),
+                name="profiler",
+                daemon=True,
+            )
+            previous = sys.getswitchinterval()
+            sys.setswitchinterval(min(previous, SWITCH_INTERVAL))
+            try:
+                sampler.start()
+                sampler.join()
+            finally:
+                sys.setswitchinterval(previous)
+            return stacks
+        finally:
+            self._labels.clear()
+            self._busy.release()
+
+    def _sample(
+        self,
+        stacks: "Counter[str]",
+        seconds: Optional[float],
+        ticks: Optional[int],
+        include_idle: bool,
+        interval: float,
+    ) -> None:
+        """Sampler thread body."""
+
+        deadline = time.monotonic() + (seconds if seconds is not None else MAX_SECONDS)
+        target = self.ticks() + ticks if ticks is not None and self.ticks is not None else None
+        own = threading.get_ident()
+        while time.monotonic() < deadline:
+            if target is not None and self.ticks() >= target:  # type: ignore[misc]
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not include_idle and frame.f_code.co_name in IDLE_LEAVES):
+                    continue
+                stacks[self._collapse(names.get(ident, f"thread-{ident}"), frame)] += 1
+            time.sleep(interval)
+
+    def _collapse(self, thread_name: str, frame: Optional[FrameType]) -> str:
+        labels = self._labels
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = _frame_label(frame)
+            parts.append(label)
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+
+def collapsed(stacks: "Counter[str]") -> str:
+    """Render stack counts as collapsed-stack text, heaviest stacks first."""
+
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,398 @@
+"""Deterministic fight recording and headless replay.
+
+A :class:`FightRecorder` attached to a :class:`game.engine.GameEngine`
+(``engine.recorder``) logs every input the engine applies as a pair of
+unsigned LEB128 varints: frames since the previous input and the action id
+from :data:`game.engine.ACTION_NAMES`. Together with the starting state
+(player profile and enemy as configured) and the tick length this is enough
+to re-run the fight exactly, since the engine is deterministic. Typical
+fights cost two bytes per input.
+
+Every ``keyframe_interval`` frames the recorder also captures the full
+engine state and the log offset at that point. :func:`replay` seeks to a
+frame by restoring the nearest earlier keyframe and replaying at most one
+interval of inputs.
+
+The recorder stores the :func:`snapshot_hash` of the frame on which the fight
+was decided; :func:`verify` replays a recording at full speed and compares
+it. Between inputs the replay skips quiet stretches (no attack can land) in
+closed form with :meth:`GameEngine.fast_forward`: idle or sparse stretches
+replay at thousands of frames per millisecond. Frames where the fighters
+are in range or inputs arrive still take one :meth:`GameEngine.step` each,
+so input-dense fights replay at plain step speed, about 100-150 frames per
+millisecond (``replay.full`` in ``bench.py``); only seeking (``--seek``),
+bounded by ``keyframe_interval`` steps, avoids that cost.
+
+Checkpoints carry the recorder (:meth:`FightRecorder.to_bytes`), so a fight
+resumed from one can still be downloaded and replayed from its start.
+
+Recordings serialize with :meth:`FightRecording.to_bytes` (served by
+``GET /api/replay``) and are checked from the command line::
+
+    python -m game.replay verify fight.krpl [--seek FRAME]
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import sys
+import time
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .abstracts import Character
+from .engine import ACTION_IDS, ACTION_NAMES, STEP_DT, GameEngine, Wave
+from .entities import Knight
+from .level import ENEMY_CLASSES, create_enemy
+
+MAGIC = b"KRPL"
+VERSION = 1
+KEYFRAME_INTERVAL = 600  # frames between full-state keyframes
+DEFAULT_DT = STEP_DT
+
+
+def write_varint(buf: bytearray, value: int) -> None:
+    """Append ``value`` (non-negative) to ``buf`` as an unsigned LEB128 varint."""
+
+    if value < 0:
+        raise ValueError("varint must be non-negative")
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Decode a varint at ``pos``. Returns ``(value, next_pos)``."""
+
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def character_state(character: Character) -> Dict[str, object]:
+    """Return the constructor fields of a knight or enemy as a JSON-ready dict."""
+
+    state: Dict[str, object] = {"class": type(character).__name__}
+    for f in fields(character):  # type: ignore[arg-type]
+        if f.init:
+            value = getattr(character, f.name)
+            state[f.name] = list(value) if isinstance(value, tuple) else value
+    return state
+
+
+def build_character(state: Dict[str, object]) -> Character:
+    """Rebuild a character captured by :func:`character_state`."""
+
+    kwargs = dict(state)
+    class_name = kwargs.pop("class")
+    cls = Knight if class_name == "Knight" else ENEMY_CLASSES.get(str(class_name))
+    if cls is None:
+        raise ValueError(f"unknown character class {class_name!r}")
+    kwargs["position"] = tuple(kwargs["position"])  # type: ignore[arg-type]
+    return cls(**kwargs)  # type: ignore[arg-type]
+
+
+def capture_state(engine: GameEngine) -> Dict[str, object]:
+    """Return the simulation state of ``engine`` (not its queues) as a dict."""
+
+    state: Dict[str, object] = {
+        "frame": engine.frame,
+        "player": character_state(engine.player),
+        "enemy": character_state(engine.enemy) if engine.enemy is not None else None,
+        "entities": [character_state(e) for e in engine.entities],
+    }
+    wave = engine.wave
+    if wave is not None:
+        state["wave"] = {
+            "order": list(wave.order),
+            "stage": wave.stage,
+            "stage_start": wave.stage_start,
+            "stage_frames": list(wave.stage_frames),
+            "ended": wave.ended,
+        }
+    return state
+
+
+def restore_state(state: Dict[str, object]) -> GameEngine:
+    """Build a fresh engine from a :func:`capture_state` dict."""
+
+    enemy = state["enemy"]
+    engine = GameEngine(
+        player=build_character(state["player"]),  # type: ignore[arg-type]
+        enemy=build_character(enemy) if enemy is not None else None,  # type: ignore[arg-type]
+        frame=int(state["frame"]),  # type: ignore[call-overload]
+        entities=[build_character(e) for e in state["entities"]],  # type: ignore[attr-defined, misc]
+    )
+    wave = state.get("wave")
+    if wave is not None:
+        engine.wave = Wave(create=create_enemy, **wave)  # type: ignore[arg-type]
+    return engine
+
+
+def snapshot_hash(engine: GameEngine) -> str:
+    """SHA-256 of the canonical JSON form of ``engine.snapshot()``."""
+
+    data = json.dumps(engine.snapshot(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Keyframe:
+    """Full engine state at ``frame``; the log resumes at byte ``offset``.
+
+    ``last_input`` is the frame of the last input before ``offset`` (the
+    base of the next frame delta).
+    """
+
+    frame: int
+    offset: int
+    last_input: int
+    state: Dict[str, object]
+
+
+@dataclass
+class FightRecording:
+    """A recorded fight: start state, input log, keyframes and final hash."""
+
+    start: Dict[str, object]
+    dt: float
+    log: bytes
+    keyframes: List[Keyframe] = field(default_factory=list)
+    final_frame: int = 0
+    final_hash: str = ""
+
+    def inputs(self, offset: int = 0, last_input: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Yield ``(frame, action_id)`` from byte ``offset`` of the log."""
+
+        frame = int(self.start["frame"]) if last_input is None else last_input  # type: ignore[call-overload]
+        log, pos, end = self.log, offset, len(self.log)
+        while pos < end:
+            delta, pos = read_varint(log, pos)
+            action_id, pos = read_varint(log, pos)
+            frame += delta
+            yield frame, action_id
+
+    def to_bytes(self) -> bytes:
+        """Serialize as ``MAGIC``, version, varint header length, JSON header, log."""
+
+        header = {
+            "start": self.start,
+            "dt": self.dt,
+            "keyframes": [[k.frame, k.offset, k.last_input, k.state] for k in self.keyframes],
+            "final_frame": self.final_frame,
+            "final_hash": self.final_hash,
+        }
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        write_varint(out, len(raw))
+        out += raw
+        out += self.log
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FightRecording":
+        """Parse :meth:`to_bytes` output. Raises ``ValueError`` if malformed."""
+
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError("not a fight recording")
+        if len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+            raise ValueError("unsupported recording version")
+        size, pos = read_varint(data, len(MAGIC) + 1)
+        header = json.loads(data[pos : pos + size].decode("utf-8"))
+        return cls(
+            start=header["start"],
+            dt=float(header["dt"]),
+            log=bytes(data[pos + size :]),
+            keyframes=[Keyframe(*k) for k in header["keyframes"]],
+            final_frame=int(header["final_frame"]),
+            final_hash=str(header["final_hash"]),
+        )
+
+
+class FightRecorder:
+    """Record the fight of ``engine`` from its current state onwards.
+
+    Parameters
+    ----------
+    engine:
+        Engine whose starting state is captured. Attach the recorder with
+        ``engine.recorder = recorder`` so it sees inputs and steps.
+    keyframe_interval:
+        Frames between full-state keyframes.
+    """
+
+    def __init__(self, engine: GameEngine, keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        if keyframe_interval <= 0:
+            raise ValueError("keyframe_interval must be positive")
+        self.keyframe_interval = keyframe_interval
+        self.start = capture_state(engine)
+        self.dt: Optional[float] = None
+        self.log = bytearray()
+        self.keyframes: List[Keyframe] = []
+        self.finished: Optional[Tuple[int, str]] = None
+        self._last_input = engine.frame
+
+    def record(self, frame: int, action: str) -> None:
+        """Log ``action`` applied on ``frame`` (unknown actions are no-ops)."""
+
+        action_id = ACTION_IDS.get(action)
+        if not action_id or self.finished is not None:
+            return
+        write_varint(self.log, frame - self._last_input)
+        write_varint(self.log, action_id)
+        self._last_input = frame
+
+    def after_step(self, engine: GameEngine, dt: float) -> None:
+        """Take keyframes and note the final hash once the fight is decided."""
+
+        if self.finished is not None:
+            return
+        if self.dt is None:
+            self.dt = dt
+        if engine.frame % self.keyframe_interval == 0:
+            self.keyframes.append(Keyframe(engine.frame, len(self.log), self._last_input, capture_state(engine)))
+        if not engine.active:
+            self.finished = (engine.frame, snapshot_hash(engine))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the recorder as a varint header length, JSON header, log.
+
+        Used by :mod:`game.checkpoint`; :meth:`from_bytes` restores it.
+        """
+
+        header = {
+            "start": self.start,
+            "dt": self.dt,
+            "keyframe_interval": self.keyframe_interval,
+            "keyframes": [[k.frame, k.offset, k.last_input, k.state] for k in self.keyframes],
+            "finished": list(self.finished) if self.finished is not None else None,
+            "last_input": self._last_input,
+        }
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        out = bytearray()
+        write_varint(out, len(raw))
+        out += raw
+        out += self.log
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FightRecorder":
+        """Parse :meth:`to_bytes` output. Raises ``ValueError`` if malformed."""
+
+        size, pos = read_varint(data, 0)
+        try:
+            header = json.loads(data[pos : pos + size].decode("utf-8"))
+            recorder = cls.__new__(cls)
+            recorder.keyframe_interval = int(header["keyframe_interval"])
+            recorder.start = header["start"]
+            recorder.dt = None if header["dt"] is None else float(header["dt"])
+            recorder.log = bytearray(data[pos + size :])
+            recorder.keyframes = [Keyframe(*k) for k in header["keyframes"]]
+            finished = header["finished"]
+            recorder.finished = (int(finished[0]), str(finished[1])) if finished is not None else None
+            recorder._last_input = int(header["last_input"])
+        except (KeyError, IndexError, TypeError) as exc:
+            raise ValueError(f"malformed recorder state: {exc}") from None
+        if recorder.keyframe_interval <= 0:
+            raise ValueError("keyframe_interval must be positive")
+        return recorder
+
+    def recording(self, engine: GameEngine) -> FightRecording:
+        """Return the recording so far; unfinished fights end at the current frame."""
+
+        final_frame, final_hash = self.finished or (engine.frame, snapshot_hash(engine))
+        return FightRecording(
+            start=self.start,
+            dt=self.dt if self.dt is not None else DEFAULT_DT,
+            log=bytes(self.log),
+            keyframes=list(self.keyframes),
+            final_frame=final_frame,
+            final_hash=final_hash,
+        )
+
+
+def replay(recording: FightRecording, until: Optional[int] = None, seek: bool = True) -> GameEngine:
+    """Re-drive a fresh engine to frame ``until`` (default: the final frame).
+
+    With ``seek`` the replay starts from the latest keyframe at or before
+    ``until``, so it costs at most ``keyframe_interval`` steps; otherwise it
+    runs every frame from the start.
+    """
+
+    start_frame = int(recording.start["frame"])  # type: ignore[call-overload]
+    target = recording.final_frame if until is None else until
+    if not start_frame <= target <= recording.final_frame:
+        raise ValueError(f"frame {target} outside recording [{start_frame}, {recording.final_frame}]")
+
+    i = bisect.bisect_right([k.frame for k in recording.keyframes], target) - 1 if seek else -1
+    if i >= 0:
+        key = recording.keyframes[i]
+        eng = restore_state(key.state)
+        inputs = recording.inputs(key.offset, key.last_input)
+    else:
+        eng = restore_state(recording.start)
+        inputs = recording.inputs()
+
+    dt = recording.dt
+    for frame, action_id in inputs:
+        if frame > target:
+            break
+        _advance(eng, frame - 1, dt)
+        eng.enqueue_action(ACTION_NAMES[action_id], frame)
+        eng.step(dt)
+    _advance(eng, target, dt)
+    return eng
+
+
+def _advance(engine: GameEngine, frame: int, dt: float) -> None:
+    """Step ``engine`` to ``frame``, skipping quiet stretches in closed form."""
+
+    engine.fast_forward(frame - engine.frame, dt)
+    # fast_forward stops once the fight is decided; keep stepping as recorded
+    while engine.frame < frame:
+        engine.step(dt)
+
+
+def verify(recording: FightRecording) -> bool:
+    """Replay the whole fight from the start and compare the final snapshot hash."""
+
+    return snapshot_hash(replay(recording, seek=False)) == recording.final_hash
+
+
+def _main(argv: List[str]) -> int:
+    """Verify a recording file, or print the snapshot at ``--seek``."""
+
+    parser = argparse.ArgumentParser(prog="python -m game.replay", description="Replay recorded fights.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("verify", help="replay a recording and check its final hash")
+    cmd.add_argument("path", type=Path)
+    cmd.add_argument("--seek", type=int, help="print the snapshot at this frame instead")
+    args = parser.parse_args(argv)
+
+    recording = FightRecording.from_bytes(args.path.read_bytes())
+    if args.seek is not None:
+        print(json.dumps(replay(recording, args.seek).snapshot(), indent=2))
+        return 0
+    started = time.perf_counter()
+    ok = verify(recording)
+    elapsed = time.perf_counter() - started
+    frames = recording.final_frame - int(recording.start["frame"])  # type: ignore[call-overload]
+    print(f"{'OK' if ok else 'MISMATCH'}: {frames} frames in {elapsed * 1e3:.1f} ms ({frames / max(elapsed, 1e-9) / 1e3:,.0f} frames/ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
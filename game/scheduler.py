@@ -0,0 +1,320 @@
+"""Fixed-rate background tick scheduler.
+
+Simulation speed must not depend on how often clients poll. The
+:class:`TickScheduler` runs on a dedicated daemon thread and steps every
+active engine in a :class:`game.sessions.SessionRegistry` at a fixed rate,
+processing sessions in batches so request threads get a chance to run
+between them. Every step advances the same ``dt`` of game time
+(:data:`game.engine.STEP_DT` by default), whatever the rate: ``hz`` only
+decides how many frames run per second of wall-clock time, so per-frame
+behaviour (timers, stamina, one input per frame) never depends on it.
+
+Under load the scheduler first catches up by running missed ticks back to
+back (up to ``max_catchup``); beyond that it skips frames and resynchronises
+with the wall clock instead of spiralling further behind. Both situations
+are counted in :meth:`TickScheduler.stats`.
+
+The scheduler thread is the single owner of every engine (see
+:mod:`game.actor`): requests post messages to a session's
+:class:`~game.actor.EngineActor`, and the scheduler runs them at the start
+of each tick, or as soon as they arrive between ticks, before publishing
+the new state of every engine it drained or stepped.
+
+Sessions nobody has touched for ``park_after`` seconds are *parked*: the
+scheduler moves them out of the set it walks every tick, so idle sessions
+cost nothing per tick, not even a check. The
+next access (a message, or a read through
+:meth:`~game.actor.EngineActor.current`) catches the engine up by the
+ticks it missed, at most ``max_idle`` seconds' worth, with
+:meth:`GameEngine.fast_forward`, which jumps over stretches where nothing
+can happen in closed form; the result is the same as if it had been
+stepped all along. Woken actors rejoin the tick set at the start of the
+next tick. The scheduler learns about new and evicted sessions through
+:attr:`SessionRegistry.track`.
+
+Listeners such as streaming endpoints can block in
+:meth:`TickScheduler.wait_tick` instead of polling. Work that must not see
+an engine mid-step (e.g. checkpoints) registers with
+:meth:`TickScheduler.add_hook` and runs on the scheduler thread after each
+tick.
+
+A failure never stops the loop: an engine whose step raises is logged and
+set aside until its session sends a new message (e.g. a new fight), and a
+hook that raises is logged and runs again on the next tick.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .actor import EngineActor
+from .engine import STEP_DT
+from .sessions import Session, SessionRegistry
+
+log = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    """Step all active engines of a registry at ``hz`` ticks per second.
+
+    Parameters
+    ----------
+    sessions:
+        Registry whose engines are driven.
+    hz:
+        Tick rate: engine steps per second of wall-clock time.
+    dt:
+        Game seconds each step advances.
+    batch_size:
+        Engines stepped before yielding the GIL to other threads.
+    max_catchup:
+        Missed ticks replayed back to back before frames are skipped.
+    park_after:
+        Seconds without a :meth:`Session.touch` after which a session is
+        parked. ``None`` steps every active engine on every tick.
+    max_idle:
+        Most seconds of game time a parked engine catches up; the ticks
+        beyond are dropped.
+    """
+
+    def __init__(
+        self,
+        sessions: SessionRegistry,
+        hz: float = 60.0,
+        dt: float = STEP_DT,
+        batch_size: int = 256,
+        max_catchup: int = 5,
+        park_after: Optional[float] = None,
+        max_idle: float = 900.0,
+    ) -> None:
+        if hz <= 0:
+            raise ValueError("hz must be positive")
+        self.sessions = sessions
+        self.hz = hz
+        self.period = 1.0 / hz
+        self.dt = dt
+        self.batch_size = max(1, batch_size)
+        self.max_catchup = max(0, max_catchup)
+        self.park_after = park_after
+        self.max_idle_ticks = max(0, round(max_idle * hz))
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_tick_seconds = 0.0
+        self.last_active = 0
+        self.messages = 0
+        self.last_parked = 0
+        self.caught_up = 0
+        self.failures = 0
+        self._ready: Deque[EngineActor] = deque()
+        # Sessions walked every tick, and parked ones (owner thread only)
+        self._live: Dict[EngineActor, Session] = {}
+        self._parked: Dict[EngineActor, Session] = {}
+        # Engines whose step raised, not stepped until they get mail
+        self._failed: Dict[EngineActor, Session] = {}
+        # Changes to apply at the next tick, posted from any thread
+        self._tracked: Deque[Tuple[Session, bool]] = deque((s, True) for s in sessions.sessions())
+        self._woken: Deque[EngineActor] = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._tick_cond = threading.Condition()
+        self._hooks: List[Callable[[int], None]] = []
+        sessions.dispatch = self._dispatch
+        sessions.track = self._track
+
+    def add_hook(self, hook: Callable[[int], None]) -> None:
+        """Call ``hook(tick_number)`` on the scheduler thread after every tick."""
+
+        self._hooks.append(hook)
+
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)."""
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        """Ask the thread to stop and wait up to ``timeout`` seconds."""
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Nobody owns the engines any more: run what is left here
+        self.drain()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is alive."""
+
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        """Fixed-timestep loop with bounded catch-up and frame skipping."""
+
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now < next_tick:
+                if self._wake.wait(next_tick - now):
+                    self._wake.clear()
+                    self.drain()
+                continue
+            behind = int((now - next_tick) / self.period)
+            if behind > self.max_catchup:
+                dropped = behind - self.max_catchup
+                self.skipped += dropped
+                next_tick += dropped * self.period
+            self.tick()
+            if self.last_tick_seconds > self.period:
+                self.overruns += 1
+            next_tick += self.period
+
+    def _dispatch(self, actor: EngineActor) -> bool:
+        """Hand ``actor``'s new mail to the scheduler thread (``False``: not running)."""
+
+        if not self.running:
+            return False
+        self._ready.append(actor)
+        self._wake.set()
+        return True
+
+    def _track(self, session: Session, live: bool) -> None:
+        """Registry hook: ``session`` was created (``live``) or dropped."""
+
+        self._tracked.append((session, live))
+
+    def _unpark(self, actor: EngineActor) -> None:
+        """``resume`` of parked actors: run the ticks the engine missed.
+
+        Runs wherever the actor is owned at the time; the actor rejoins the
+        tick set at the next tick.
+        """
+
+        if actor.parked_at is None:
+            return
+        missed = min(self.ticks - actor.parked_at, self.max_idle_ticks)
+        actor.parked_at = None
+        self.caught_up += actor.engine.fast_forward(missed, self.dt)
+        actor.publish()
+        self._woken.append(actor)
+
+    def _admit(self) -> None:
+        """Apply session changes posted since the last tick. Owner only."""
+
+        tracked, live, parked = self._tracked, self._live, self._parked
+        while tracked:
+            session, alive = tracked.popleft()
+            if alive:
+                live[session.actor] = session
+            else:
+                live.pop(session.actor, None)
+                parked.pop(session.actor, None)
+                self._failed.pop(session.actor, None)
+        woken = self._woken
+        while woken:
+            actor = woken.popleft()
+            session = parked.pop(actor, None)
+            if session is not None:
+                live[actor] = session
+
+    def drain(self) -> int:
+        """Run the messages of every actor with mail. Returns how many ran."""
+
+        count = 0
+        ready, failed = self._ready, self._failed
+        while ready:
+            actor = ready.popleft()
+            try:
+                count += actor.drain()
+            except Exception:
+                log.exception("draining an engine mailbox failed")
+                continue
+            session = failed.pop(actor, None)
+            if session is not None:
+                # New mail (e.g. a new fight): give the engine another chance
+                self._live[actor] = session
+        self.messages += count
+        return count
+
+    def tick(self) -> int:
+        """Deliver pending messages, then step every active engine once.
+
+        Engines of idle sessions are parked instead (see ``park_after``).
+        Returns how many engines were stepped.
+        """
+
+        started = time.perf_counter()
+        self.drain()
+        self._admit()
+        idle_since = time.monotonic() - self.park_after if self.park_after is not None else None
+        actors: List[EngineActor] = []
+        live = self._live
+        for actor, session in list(live.items()):
+            if idle_since is not None and session.last_seen < idle_since:
+                del live[actor]
+                self._parked[actor] = session
+                actor.parked_at = self.ticks
+                actor.resume = self._unpark
+            elif session.engine.active:
+                actors.append(actor)
+        dt = self.dt
+        for i in range(0, len(actors), self.batch_size):
+            for actor in actors[i : i + self.batch_size]:
+                try:
+                    actor.step(dt)
+                except Exception:
+                    log.exception("engine step failed; not stepped until its session sends a message")
+                    self.failures += 1
+                    self._failed[actor] = live.pop(actor)
+            # Let request threads run between batches
+            time.sleep(0)
+        self.last_active = len(actors)
+        self.last_parked = len(self._parked)
+        self.last_tick_seconds = time.perf_counter() - started
+        with self._tick_cond:
+            self.ticks += 1
+            self._tick_cond.notify_all()
+        for hook in self._hooks:
+            try:
+                hook(self.ticks)
+            except Exception:
+                log.exception("tick hook %r failed", hook)
+                self.failures += 1
+        return len(actors)
+
+    def wait_tick(self, after: int, timeout: Optional[float] = None) -> int:
+        """Block until more than ``after`` ticks have run or ``timeout`` expires.
+
+        Returns the current tick count, so callers can pass it back in as
+        ``after`` on the next wait.
+        """
+
+        with self._tick_cond:
+            self._tick_cond.wait_for(lambda: self.ticks > after, timeout)
+            return self.ticks
+
+    def stats(self) -> Dict[str, float]:
+        """Return tick counters for monitoring."""
+
+        return {
+            "hz": self.hz,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "active": self.last_active,
+            "messages": self.messages,
+            "parked": self.last_parked,
+            "caught_up": self.caught_up,
+            "failures": self.failures,
+            "last_tick_ms": round(self.last_tick_seconds * 1000.0, 3),
+        }
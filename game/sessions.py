@@ -0,0 +1,332 @@
+"""Session registry: one independent engine per player session.
+
+Each browser (or API client) is identified by a session token. The registry
+maps tokens to :class:`Session` objects holding their own
+:class:`game.engine.GameEngine`, so many fights can run side by side in a
+single process.
+
+Memory is bounded by two policies:
+
+- a hard cap on live sessions; when full, the least recently used session
+  is evicted (``OrderedDict`` keeps LRU order in O(1));
+- an idle timeout; sessions not touched for ``idle_timeout`` seconds are
+  dropped by :meth:`SessionRegistry.evict_idle`.
+
+With ``snapshot_on_evict`` the registry keeps the final
+:meth:`~game.engine.GameEngine.snapshot` of evicted sessions (bounded by the
+same cap) so a returning client can still see how its fight ended. An
+optional ``on_evict`` callback receives every evicted session so callers can
+persist it elsewhere before it is discarded, and an optional ``restore``
+callback is asked for a saved engine before a new session starts from
+scratch (see :class:`game.checkpoint.Checkpointer`).
+
+The registry lock only guards the token map: evicted sessions are taken
+out under it, but catching them up, snapshotting them and ``on_evict`` run
+after it is released, and so does ``restore``, so a slow checkpoint read or
+write never holds up other requests. A token whose eviction is still being
+handled is restored only once its ``on_evict`` has finished.
+"""
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .actor import EngineActor
+from .codec import SnapshotEncoder
+from .engine import GameEngine
+from .entities import Knight
+from .metrics import StepMetrics
+
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "X-Session-Id"
+
+
+def new_token() -> str:
+    """Return a fresh, URL-safe session token."""
+
+    return secrets.token_urlsafe(16)
+
+
+@dataclass
+class Session:
+    """A single player session.
+
+    Attributes
+    ----------
+    token:
+        Session identifier (cookie or header value).
+    engine:
+        Engine of this session; only the scheduler thread may touch it,
+        other threads go through ``actor``.
+    created:
+        Monotonic time the session was created.
+    last_seen:
+        Monotonic time of the last access; used for idle eviction.
+    encoder:
+        Delta/keyframe encoder for this session's state responses.
+    event_cursor:
+        Next event sequence number to send to this client from
+        ``GET /api/events`` when the request carries no ``since``.
+    boss_id:
+        Boss of the fight started with ``/api/start_boss`` (``None`` for
+        fights resumed from a checkpoint).
+    actor:
+        Mailbox and published state of ``engine`` (see :mod:`game.actor`).
+    """
+
+    token: str
+    engine: GameEngine
+    created: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    encoder: SnapshotEncoder = field(default_factory=SnapshotEncoder)
+    event_cursor: int = 0
+    boss_id: Optional[str] = None
+    actor: EngineActor = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.actor = EngineActor(self.engine)
+
+    def touch(self) -> None:
+        """Mark the session as used right now."""
+
+        self.last_seen = time.monotonic()
+
+
+class SessionRegistry:
+    """Thread-safe LRU registry of sessions with idle-timeout eviction.
+
+    Parameters
+    ----------
+    max_sessions:
+        Maximum number of live sessions. Creating one more evicts the least
+        recently used session.
+    idle_timeout:
+        Seconds of inactivity after which a session may be evicted by
+        :meth:`evict_idle`. ``None`` disables idle eviction.
+    snapshot_on_evict:
+        Keep the last engine snapshot of evicted sessions, retrievable with
+        :meth:`evicted_snapshot`.
+    on_evict:
+        Optional callback invoked with each evicted :class:`Session`.
+    sweep_interval:
+        Minimum seconds between automatic idle sweeps run from
+        :meth:`get_or_create`.
+    restore:
+        Optional callback returning a saved engine for an unknown token (or
+        ``None``); used instead of a fresh engine when creating the session.
+    step_metrics:
+        Optional :class:`game.metrics.StepMetrics` given to the engine of
+        every new session, so its step phases are timed.
+
+    Attributes
+    ----------
+    dispatch:
+        Owner of the engines, told when a session's actor has mail (set by
+        :class:`game.scheduler.TickScheduler`). Without one, messages run
+        on the posting thread.
+    track:
+        Called with ``(session, True)`` when a session is created and
+        ``(session, False)`` when it is evicted or removed, so the owner
+        can keep its own list of sessions to step (set by the scheduler).
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        idle_timeout: Optional[float] = 900.0,
+        snapshot_on_evict: bool = False,
+        on_evict: Optional[Callable[[Session], None]] = None,
+        sweep_interval: float = 5.0,
+        restore: Optional[Callable[[str], Optional[GameEngine]]] = None,
+        step_metrics: Optional[StepMetrics] = None,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be >= 1")
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.snapshot_on_evict = snapshot_on_evict
+        self.on_evict = on_evict
+        self.sweep_interval = sweep_interval
+        self.restore = restore
+        self.step_metrics = step_metrics
+        self.dispatch: Optional[Callable[[EngineActor], bool]] = None
+        self.track: Optional[Callable[[Session, bool], None]] = None
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._snapshots: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Evicted tokens whose on_evict has not finished yet
+        self._leaving: Dict[str, threading.Event] = {}
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+        self.restored = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._sessions
+
+    def get(self, token: str) -> Optional[Session]:
+        """Return the session for ``token`` (marking it used) or ``None``."""
+
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None:
+                self._sessions.move_to_end(token)
+                session.touch()
+            return session
+
+    def get_or_create(self, token: str) -> Session:
+        """Return the session for ``token``, creating it when missing."""
+
+        with self._lock:
+            evicted = self._maybe_sweep()
+            session = self.get(token)
+            leaving = self._leaving.get(token)
+        self._notify(evicted)
+        if session is not None:
+            return session
+        if leaving is not None:
+            leaving.wait()  # restore the state its on_evict just saved
+        engine = self.restore(token) if self.restore is not None else None
+        with self._lock:
+            session = self.get(token)
+            if session is None:  # else another request created it meanwhile
+                session, evicted = self._insert(token, engine)
+        self._notify(evicted)
+        return session
+
+    def _maybe_sweep(self) -> List[Session]:
+        """Take out idle sessions at most once per ``sweep_interval``. Lock held."""
+
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return []
+        self._last_sweep = now
+        return self._take_idle(now)
+
+    def _insert(self, token: str, engine: Optional[GameEngine]) -> Tuple[Session, List[Session]]:
+        """Insert a new session and take out LRU entries beyond the cap. Lock held."""
+
+        if engine is not None:
+            self.restored += 1
+        else:
+            # Default player stub; actual player is loaded on start
+            engine = GameEngine(player=Knight(name="Player"))
+        engine.metrics = self.step_metrics
+        session = Session(token=token, engine=engine)
+        session.actor.notify = self._dispatch
+        self._sessions[token] = session
+        if self.track is not None:
+            self.track(session, True)
+        evicted: List[Session] = []
+        while len(self._sessions) > self.max_sessions:
+            _, old = self._sessions.popitem(last=False)
+            evicted.append(self._leave(old))
+        return session, evicted
+
+    def _dispatch(self, actor: EngineActor) -> bool:
+        return self.dispatch is not None and self.dispatch(actor)
+
+    def remove(self, token: str) -> bool:
+        """Drop a session without calling ``on_evict``. Returns True if found."""
+
+        with self._lock:
+            session = self._sessions.pop(token, None)
+        if session is None:
+            return False
+        if self.track is not None:
+            self.track(session, False)
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evict sessions idle for longer than ``idle_timeout``.
+
+        Because sessions are kept in LRU order, the scan stops at the first
+        session that is still fresh.
+
+        Returns
+        -------
+        int
+            Number of sessions evicted.
+        """
+
+        if self.idle_timeout is None:
+            return 0
+        with self._lock:
+            evicted = self._take_idle(time.monotonic() if now is None else now)
+        self._notify(evicted)
+        return len(evicted)
+
+    def _take_idle(self, now: float) -> List[Session]:
+        """Remove and return the sessions idle for too long. Lock held."""
+
+        if self.idle_timeout is None:
+            return []
+        cutoff = now - self.idle_timeout
+        evicted: List[Session] = []
+        while self._sessions:
+            token, oldest = next(iter(self._sessions.items()))
+            if oldest.last_seen > cutoff:
+                break
+            del self._sessions[token]
+            evicted.append(self._leave(oldest))
+        return evicted
+
+    def _leave(self, session: Session) -> Session:
+        """Mark ``session`` as being evicted until :meth:`_notify` is done. Lock held."""
+
+        self.evicted += 1
+        self._leaving.setdefault(session.token, threading.Event())
+        if self.track is not None:
+            self.track(session, False)
+        return session
+
+    def _notify(self, evicted: List[Session]) -> None:
+        """Catch evicted sessions up and hand them to ``on_evict``. Lock not held."""
+
+        for session in evicted:
+            try:
+                session.actor.settle()  # a parked engine catches up first
+                if self.snapshot_on_evict:
+                    with self._lock:
+                        self._snapshots[session.token] = session.actor.snapshot
+                        while len(self._snapshots) > self.max_sessions:
+                            self._snapshots.popitem(last=False)
+                if self.on_evict is not None:
+                    self.on_evict(session)
+            finally:
+                with self._lock:
+                    done = self._leaving.pop(session.token, None)
+                if done is not None:
+                    done.set()
+
+    def evicted_snapshot(self, token: str) -> Optional[Dict[str, object]]:
+        """Return the snapshot taken when ``token`` was evicted, if any."""
+
+        with self._lock:
+            return self._snapshots.get(token)
+
+    def sessions(self) -> List[Session]:
+        """Return a point-in-time list of live sessions (LRU first)."""
+
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(self.sessions())
+
+    def stats(self) -> Dict[str, int]:
+        """Return basic occupancy counters."""
+
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "restored": self.restored,
+        }
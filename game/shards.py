@@ -0,0 +1,379 @@
+"""Sharded multi-process serving with session affinity.
+
+Game state lives in the memory of the process that owns a session, so a
+single process can only use one core. :func:`serve_sharded` starts ``N``
+worker processes, each running its own :func:`game.api.create_app` (own
+session registry, tick scheduler and checkpointer) on a Unix domain socket,
+plus a front :class:`Dispatcher` listening on TCP.
+
+The dispatcher reads the session token (``X-Session-Id`` header or
+``session_id`` cookie, minting one for new clients), picks the owning shard
+with :func:`shard_for` (a stable hash of the token) and forwards the request
+to that worker over its socket, streaming the response back, so
+Server-Sent Events work unchanged. Workers share nothing but the profile
+database (SQLite in WAL mode) and the checkpoint directory, in which every
+token belongs to exactly one shard.
+
+Profiles are keyed by knight name, not by session, so any shard may write
+any profile. Each worker's write-behind cache (:class:`game.cache.ProfileCache`)
+would then hold its own stale copy and overwrite the others' changes when
+it flushes, so with more than one worker profiles are written straight to
+the database (see :func:`worker_options`); the leaderboards pick up the
+other shards' writes from the database stamp (see :mod:`game.leaderboard`).
+
+A supervisor thread restarts workers that die; their sessions come back
+from their checkpoints. ``GET /api/shards`` on the dispatcher reports the
+health and the scheduler/session counters of every shard, and
+``GET /api/metrics`` merges the metrics of all shards, adding a ``shard``
+label to every sample.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from .sessions import SESSION_COOKIE, SESSION_HEADER, new_token
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+FORWARD_TIMEOUT = 30.0  # seconds to wait for a worker (streams excepted)
+HEALTH_TIMEOUT = 2.0
+
+
+def shard_for(token: str, shards: int) -> int:
+    """Return the shard (``0 .. shards - 1``) that owns ``token``.
+
+    Uses CRC-32 so every process agrees, unlike the salted built-in ``hash``.
+    """
+
+    return zlib.crc32(token.encode("utf-8")) % shards
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: Optional[float] = FORWARD_TIMEOUT) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _serve_worker(index: int, socket_path: str, app_options: Dict[str, object]) -> None:
+    """Worker process body: serve one shard on ``socket_path``."""
+
+    from werkzeug.serving import make_server
+
+    from .api import create_app
+
+    # Turn SIGTERM into a normal exit so atexit handlers flush profiles and checkpoints
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    app = create_app(**app_options)  # type: ignore[arg-type]
+    app.config["SHARD_INDEX"] = index
+    Path(socket_path).unlink(missing_ok=True)
+    server = make_server(f"unix://{socket_path}", 0, app, threaded=True)
+    server.serve_forever()
+
+
+class Worker:
+    """One shard: a child process serving on a Unix socket."""
+
+    def __init__(self, index: int, socket_path: str, app_options: Dict[str, object]) -> None:
+        self.index = index
+        self.socket_path = socket_path
+        self.app_options = app_options
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.restarts = 0
+
+    def start(self) -> None:
+        """Start (or restart) the worker process."""
+
+        ctx = multiprocessing.get_context("spawn")
+        self.process = ctx.Process(
+            target=_serve_worker,
+            args=(self.index, self.socket_path, self.app_options),
+            name=f"shard-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        """Wait until the worker accepts connections on its socket."""
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.alive:
+                return False
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.socket_path)
+                return True
+            except OSError:
+                time.sleep(0.05)
+        return False
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Terminate the worker; it checkpoints its sessions on the way out."""
+
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        Path(self.socket_path).unlink(missing_ok=True)
+
+
+class Dispatcher:
+    """WSGI front end routing each request to the shard owning its session.
+
+    Parameters
+    ----------
+    workers:
+        Shard workers, indexed by shard number.
+    """
+
+    def __init__(self, workers: List[Worker]) -> None:
+        if not workers:
+            raise ValueError("at least one worker is required")
+        self.workers = workers
+        self.forwarded = [0] * len(workers)
+        self.errors = [0] * len(workers)
+
+    def __call__(self, environ: Dict, start_response):  # type: ignore[no-untyped-def]
+        if environ.get("PATH_INFO") == "/api/shards":
+            return self._shards(start_response)
+        if environ.get("PATH_INFO") == "/api/metrics":
+            return self._metrics(start_response)
+
+        token = environ.get("HTTP_X_SESSION_ID")
+        if not token:
+            cookie = SimpleCookie(environ.get("HTTP_COOKIE", ""))
+            morsel = cookie.get(SESSION_COOKIE)
+            token = morsel.value if morsel is not None else None
+        new_session = not token
+        token = token or new_token()
+        index = shard_for(token, len(self.workers))
+        try:
+            status, headers, body = self._forward(self.workers[index], environ, token)
+        except OSError:
+            self.errors[index] += 1
+            start_response("503 Service Unavailable", [("Content-Type", "application/json")])
+            return [json.dumps({"error": "shard unavailable", "shard": index}).encode("utf-8")]
+        self.forwarded[index] += 1
+        if new_session:
+            headers.append(("Set-Cookie", f"{SESSION_COOKIE}={token}; HttpOnly; Path=/; SameSite=Lax"))
+        start_response(status, headers)
+        return body
+
+    def _forward(self, worker: Worker, environ: Dict, token: str) -> Tuple[str, List[Tuple[str, str]], Iterable[bytes]]:
+        """Send the request to ``worker`` and return its streamed response."""
+
+        path = quote(environ.get("PATH_INFO", "/"), safe="/:@!$&'()*+,;=")
+        query = environ.get("QUERY_STRING")
+        if query:
+            path = f"{path}?{query}"
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else None
+
+        headers = {}
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                name = key[5:].replace("_", "-").title()
+                if name.lower() not in HOP_BY_HOP:
+                    headers[name] = value
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        # The worker trusts the header, so it never issues its own cookie
+        headers[SESSION_HEADER] = token
+
+        stream = path.startswith("/api/stream")
+        conn = UnixHTTPConnection(worker.socket_path, timeout=None if stream else FORWARD_TIMEOUT)
+        conn.request(environ["REQUEST_METHOD"], path, body=body, headers=headers)
+        resp = conn.getresponse()
+        out_headers = [(k, v) for k, v in resp.getheaders() if k.lower() not in HOP_BY_HOP]
+        return f"{resp.status} {resp.reason}", out_headers, self._relay(conn, resp)
+
+    @staticmethod
+    def _relay(conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> Iterator[bytes]:
+        """Yield the response body as it arrives (SSE included)."""
+
+        try:
+            while True:
+                chunk = resp.read1(65536)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            conn.close()
+
+    def shard_stats(self) -> List[Dict[str, object]]:
+        """Health and load of every shard."""
+
+        out = []
+        for worker in self.workers:
+            entry: Dict[str, object] = {
+                "shard": worker.index,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": worker.alive,
+                "restarts": worker.restarts,
+                "forwarded": self.forwarded[worker.index],
+                "errors": self.errors[worker.index],
+                "healthy": False,
+            }
+            started = time.perf_counter()
+            try:
+                conn = UnixHTTPConnection(worker.socket_path, timeout=HEALTH_TIMEOUT)
+                conn.request("GET", "/api/scheduler")
+                resp = conn.getresponse()
+                stats = json.loads(resp.read())
+                conn.close()
+                entry.update(stats)
+                entry["healthy"] = resp.status == 200
+            except (OSError, ValueError):
+                pass
+            entry["latency_ms"] = round((time.perf_counter() - started) * 1e3, 3)
+            out.append(entry)
+        return out
+
+    def _shards(self, start_response):  # type: ignore[no-untyped-def]
+        body = json.dumps({"shards": self.shard_stats()}).encode("utf-8")
+        start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def _metrics(self, start_response):  # type: ignore[no-untyped-def]
+        texts = []
+        for worker in self.workers:
+            try:
+                conn = UnixHTTPConnection(worker.socket_path, timeout=HEALTH_TIMEOUT)
+                conn.request("GET", "/api/metrics")
+                resp = conn.getresponse()
+                if resp.status == 200:
+                    texts.append((worker.index, resp.read().decode("utf-8")))
+                conn.close()
+            except OSError:
+                pass
+        body = merge_metrics(texts).encode("utf-8")
+        start_response("200 OK", [("Content-Type", "text/plain; version=0.0.4"), ("Content-Length", str(len(body)))])
+        return [body]
+
+
+def merge_metrics(texts: Iterable[Tuple[int, str]]) -> str:
+    """Merge Prometheus texts of several shards, labelling samples ``shard``.
+
+    ``HELP``/``TYPE`` lines are kept once per metric and the samples of
+    every shard are grouped under them.
+    """
+
+    families: Dict[str, List[str]] = {}
+    for index, text in texts:
+        header: List[str] = []
+        samples: Optional[List[str]] = None
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                header = [line]
+            elif line.startswith("# TYPE "):
+                header.append(line)
+                samples = families.setdefault(line.split()[2], header)
+            elif line and samples is not None:
+                name, sep, rest = line.partition("{")
+                if sep:
+                    samples.append(f'{name}{{shard="{index}",{rest}')
+                else:
+                    name, _, value = line.partition(" ")
+                    samples.append(f'{name}{{shard="{index}"}} {value}')
+    return "".join(line + "\n" for lines in families.values() for line in lines)
+
+
+def _supervise(workers: List[Worker], stop: threading.Event, interval: float = 1.0) -> None:
+    """Restart workers whose process died."""
+
+    while not stop.wait(interval):
+        for worker in workers:
+            if not worker.alive:
+                worker.restarts += 1
+                worker.start()
+                worker.wait_ready()
+
+
+def worker_options(workers: int, app_options: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """Return the :func:`game.api.create_app` options of every worker.
+
+    With more than one worker the write-behind profile cache is turned off
+    (``profile_flush_interval=None``) unless ``app_options`` sets it.
+    """
+
+    options: Dict[str, object] = {"profile_flush_interval": None} if workers > 1 else {}
+    options.update(app_options or {})
+    return options
+
+
+def serve_sharded(
+    workers: int,
+    host: str = "127.0.0.1",
+    port: int = 5000,
+    socket_dir: Optional[str] = None,
+    app_options: Optional[Dict[str, object]] = None,
+) -> None:
+    """Run ``workers`` shard processes behind a dispatcher on ``host:port``.
+
+    Blocks until interrupted, then stops the workers.
+    """
+
+    from werkzeug.serving import run_simple
+
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    base = Path(socket_dir or tempfile.mkdtemp(prefix="boss-rush-shards-"))
+    base.mkdir(parents=True, exist_ok=True)
+    options = worker_options(workers, app_options)
+    pool = [Worker(i, str(base / f"shard-{i}.sock"), dict(options)) for i in range(workers)]
+    for worker in pool:
+        worker.start()
+    for worker in pool:
+        if not worker.wait_ready():
+            raise RuntimeError(f"shard {worker.index} failed to start")
+
+    stop = threading.Event()
+    threading.Thread(target=_supervise, args=(pool, stop), name="shard-supervisor", daemon=True).start()
+    try:
+        run_simple(host, port, Dispatcher(pool), threaded=True)
+    finally:
+        stop.set()
+        for worker in pool:
+            worker.stop()
+        if socket_dir is None:
+            try:
+                os.rmdir(base)
+            except OSError:
+                pass
@@ -0,0 +1,178 @@
+"""Content-hashed, precompressed static assets.
+
+:func:`build_assets` copies every file under ``web/static`` to
+``web/static/dist`` under a fingerprinted name (``js/game.js`` becomes
+``js/game.<hash>.js``, the hash being the first 12 hex digits of the
+SHA-256 of the content), next to a ``.gz`` variant and, when the optional
+``brotli`` package is installed, a ``.br`` one. ``manifest.json`` maps the
+original paths to the fingerprinted ones. Run it as a build step with::
+
+    python -m game.static_assets build
+
+:func:`init_app` hooks the result into Flask: the ``asset_url`` template
+global turns ``"js/game.js"`` into ``/assets/js/game.<hash>.js``, and the
+``/assets/`` route serves the best precompressed variant the client accepts
+(``br``, then ``gzip``, then identity) with ``Vary: Accept-Encoding`` and an
+immutable one-year ``Cache-Control``: a fingerprinted URL never changes
+content, so browsers never revalidate it. The build runs automatically at
+startup when the sources are newer than the manifest.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from flask import Flask, abort, request, send_file, url_for
+
+try:  # optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+ROOT = Path(__file__).resolve().parents[1]
+STATIC_DIR = ROOT / "web/static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST = "manifest.json"
+HASH_LENGTH = 12
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Precompressed variants, most preferred first: (encoding, suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` via a temp file + rename (workers may race)."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)  # readable by a front web server too
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def fingerprint(relpath: str, data: bytes) -> str:
+    """Return ``relpath`` with the content hash of ``data`` before its suffix."""
+
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    path = Path(relpath)
+    return path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+
+
+def build_assets(src: Path = STATIC_DIR, dest: Path = DIST_DIR) -> Dict[str, str]:
+    """Fingerprint and precompress every file of ``src`` into ``dest``.
+
+    Compressed variants are only kept when smaller than the original.
+    Returns the manifest (original relative path -> fingerprinted path).
+    """
+
+    manifest: Dict[str, str] = {}
+    for path in sorted(src.rglob("*")):
+        if not path.is_file() or dest in path.parents or path.name.startswith("."):
+            continue
+        relpath = path.relative_to(src).as_posix()
+        data = path.read_bytes()
+        hashed = fingerprint(relpath, data)
+        manifest[relpath] = hashed
+        target = dest / hashed
+        if target.exists():
+            continue  # same content already built
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, packed in variants.items():
+            if len(packed) < len(data):
+                _write_atomic(target.with_name(target.name + suffix), packed)
+        _write_atomic(target, data)
+    _write_atomic(dest / MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def _stale(src: Path, dest: Path) -> bool:
+    """Whether any source file is newer than the manifest (or it is missing)."""
+
+    try:
+        built = (dest / MANIFEST).stat().st_mtime_ns
+    except FileNotFoundError:
+        return True
+    return any(
+        p.is_file() and dest not in p.parents and p.stat().st_mtime_ns > built for p in src.rglob("*")
+    )
+
+
+def load_manifest(src: Path = STATIC_DIR, dest: Path = DIST_DIR, build: bool = True) -> Dict[str, str]:
+    """Return the manifest, (re)building the assets first if ``build`` and stale."""
+
+    if build and _stale(src, dest):
+        return build_assets(src, dest)
+    try:
+        return json.loads((dest / MANIFEST).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def init_app(app: Flask, src: Path = STATIC_DIR, dest: Path = DIST_DIR, build: bool = True) -> Dict[str, str]:
+    """Register ``asset_url`` and the ``/assets/`` route on ``app``.
+
+    Files missing from the manifest fall back to the plain ``/static/`` URL.
+    """
+
+    manifest = load_manifest(src, dest, build)
+    app.extensions["static_assets"] = manifest
+
+    def asset_url(relpath: str) -> str:
+        hashed = manifest.get(relpath)
+        if hashed is None:
+            return url_for("static", filename=relpath)
+        return url_for("asset", filename=hashed)
+
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    @app.get("/assets/<path:filename>")
+    def asset(filename: str):  # type: ignore[no-untyped-def]
+        """Serve a fingerprinted asset, precompressed when the client accepts it."""
+        path = (dest / filename).resolve()
+        hidden = path.name == MANIFEST or path.suffix in {suffix for _, suffix in ENCODINGS}
+        if dest.resolve() not in path.parents or hidden or not path.is_file():
+            abort(404)
+        mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        chosen, encoding = path, None
+        for name, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if request.accept_encodings[name] and variant.is_file():
+                chosen, encoding = variant, name
+                break
+        response = send_file(chosen, mimetype=mimetype, max_age=None, conditional=True, etag=True)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return manifest
+
+
+def _main(argv: List[str]) -> int:
+    if argv != ["build"]:
+        print("usage: python -m game.static_assets build", file=sys.stderr)
+        return 2
+    manifest = build_assets()
+    for relpath, hashed in manifest.items():
+        variants = [s for _, s in ENCODINGS if (DIST_DIR / (hashed + s)).exists()]
+        print(f"{relpath} -> {hashed} {' '.join(variants)}".rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
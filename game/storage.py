@@ -1,65 +1,408 @@
-"""Storage utilities for JSON persistence of profiles and stats.
+"""Storage utilities for persistence of profiles and stats.
 
-Uses ``json`` to store and load knight profiles at ``web/data/knights.json``.
+Knight profiles live behind a small pluggable backend interface,
+:class:`ProfileStore`, with two implementations:
+
+- :class:`SqliteStore` (default): stdlib ``sqlite3`` in WAL mode at
+  ``web/data/knights.db``. Lookups, upserts and deletes touch a single row
+  through the primary-key index, and concurrent writers are serialised by
+  SQLite instead of clobbering each other.
+- :class:`JsonStore`: the original whole-file ``json`` store at
+  ``web/data/knights.json``; every operation reads (and writes) all profiles.
+
+The module-level ``save_knight``/``load_knight``/``delete_knight``/
+``list_knights`` functions (and the bulk ``load_knights``/``write_knights``/
+``iter_knights``) delegate to the active store, selected with the
+``KNIGHTS_STORAGE`` environment variable (``sqlite`` or ``json``) or
+:func:`set_store`, and time every call into the ``storage_seconds{op=...}``
+histogram of :mod:`game.metrics`. Callbacks registered with
+:func:`add_listener` hear about every save and delete made through them
+(the leaderboard indexes of :mod:`game.leaderboard` stay current this way).
+:func:`migrate_json_to_sqlite` copies an existing JSON
+file into SQLite; it runs automatically the first time the default SQLite
+database is created, or manually with ``python -m game.storage migrate``.
 """
 
 from __future__ import annotations
 
 import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .metrics import REGISTRY, timed
 
 DATA_DIR = Path("web/data")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 KNIGHTS_PATH = DATA_DIR / "knights.json"
+KNIGHTS_DB_PATH = DATA_DIR / "knights.db"
 
+log = logging.getLogger(__name__)
 
-def _read_all() -> Dict[str, Dict]:
-    """Read and return all knight profiles from storage."""
 
-    if not KNIGHTS_PATH.exists():
-        return {}
-    with KNIGHTS_PATH.open("r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
+class ProfileStore(ABC):
+    """Backend contract for knight profile persistence."""
+
+    @abstractmethod
+    def save(self, profile: Dict) -> None:
+        """Create or update ``profile`` (keyed by its ``name``)."""
+
+    @abstractmethod
+    def load(self, name: str) -> Optional[Dict]:
+        """Return the profile for ``name`` or ``None``."""
+
+    @abstractmethod
+    def delete(self, name: str) -> bool:
+        """Remove the profile for ``name``. Returns True if it existed."""
+
+    @abstractmethod
+    def list_all(self) -> Dict[str, Dict]:
+        """Return every profile keyed by name."""
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Dict]:
+        """Return the existing profiles among ``names``, keyed by name."""
+
+        found = {}
+        for name in names:
+            profile = self.load(name)
+            if profile is not None:
+                found[name] = profile
+        return found
+
+    def iter_all(self) -> Iterator[Dict]:
+        """Yield every profile; backends may stream instead of loading all."""
+
+        yield from self.list_all().values()
+
+    def write_batch(self, upserts: Dict[str, Dict], deletes: Iterable[str] = ()) -> None:
+        """Apply many upserts and deletes as one write.
+
+        Backends override this to commit everything atomically; the default
+        simply loops over :meth:`save` and :meth:`delete`.
+        """
+
+        for name in deletes:
+            self.delete(name)
+        for profile in upserts.values():
+            self.save(profile)
+
+    def stamp(self) -> Optional[object]:
+        """Return a token that changes whenever the underlying data changes.
+
+        Used by caches to notice edits made outside this process. ``None``
+        means the backend cannot tell.
+        """
+
+        return None
+
+
+class JsonStore(ProfileStore):
+    """Whole-file JSON store (one dict of profiles keyed by name)."""
+
+    def __init__(self, path: Path = KNIGHTS_PATH) -> None:
+        self.path = Path(path)
+
+    def _read_all(self) -> Dict[str, Dict]:
+        """Read and return all knight profiles from storage."""
+
+        if not self.path.exists():
             return {}
+        with self.path.open("r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return {}
+
+    def _write_all(self, data: Dict[str, Dict]) -> None:
+        """Write all knight profiles to storage atomically (temp file + rename)."""
+
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def save(self, profile: Dict) -> None:
+        data = self._read_all()
+        data[profile["name"]] = profile
+        self._write_all(data)
 
+    def load(self, name: str) -> Optional[Dict]:
+        return self._read_all().get(name)
 
-def _write_all(data: Dict[str, Dict]) -> None:
-    """Write all knight profiles to storage."""
+    def delete(self, name: str) -> bool:
+        data = self._read_all()
+        if name in data:
+            del data[name]
+            self._write_all(data)
+            return True
+        return False
+
+    def list_all(self) -> Dict[str, Dict]:
+        return self._read_all()
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Dict]:
+        data = self._read_all()
+        return {name: data[name] for name in names if name in data}
+
+    def write_batch(self, upserts: Dict[str, Dict], deletes: Iterable[str] = ()) -> None:
+        data = self._read_all()
+        for name in deletes:
+            data.pop(name, None)
+        data.update(upserts)
+        self._write_all(data)
+
+    def stamp(self) -> Optional[object]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
 
-    with KNIGHTS_PATH.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+
+class SqliteStore(ProfileStore):
+    """SQLite store: one row per profile, indexed by name.
+
+    Each thread gets its own connection (``sqlite3`` connections must not be
+    shared across threads); WAL mode lets readers proceed while a writer
+    commits.
+    """
+
+    def __init__(self, path: Path = KNIGHTS_DB_PATH) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS knights (name TEXT PRIMARY KEY, profile TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, profile: Dict) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO knights (name, profile) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET profile = excluded.profile",
+                (profile["name"], json.dumps(profile, ensure_ascii=False)),
+            )
+
+    def load(self, name: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT profile FROM knights WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, name: str) -> bool:
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM knights WHERE name = ?", (name,)).rowcount > 0
+
+    def list_all(self) -> Dict[str, Dict]:
+        rows = self._conn().execute("SELECT name, profile FROM knights ORDER BY name")
+        return {name: json.loads(profile) for name, profile in rows}
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Dict]:
+        wanted = list(dict.fromkeys(names))
+        found = {}
+        conn = self._conn()
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for name, profile in conn.execute(f"SELECT name, profile FROM knights WHERE name IN ({marks})", chunk):
+                found[name] = json.loads(profile)
+        return found
+
+    def iter_all(self) -> Iterator[Dict]:
+        # A dedicated connection keeps the cursor independent of writes on this thread
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        try:
+            for (profile,) in conn.execute("SELECT profile FROM knights ORDER BY name"):
+                yield json.loads(profile)
+        finally:
+            conn.close()
+
+    def write_batch(self, upserts: Dict[str, Dict], deletes: Iterable[str] = ()) -> None:
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM knights WHERE name = ?", [(name,) for name in deletes])
+            conn.executemany(
+                "INSERT INTO knights (name, profile) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET profile = excluded.profile",
+                [(name, json.dumps(p, ensure_ascii=False)) for name, p in upserts.items()],
+            )
+
+    def stamp(self) -> Optional[object]:
+        # Commits land in the -wal file first, so watch both files
+        stamps = []
+        for path in (self.path, self.path.with_name(self.path.name + "-wal")):
+            try:
+                stamps.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+
+def migrate_json_to_sqlite(json_path: Path = KNIGHTS_PATH, db_path: Path = KNIGHTS_DB_PATH) -> int:
+    """Copy every profile from a JSON store into a SQLite store.
+
+    Existing rows with the same name are overwritten. Returns the number of
+    profiles migrated. The JSON file is left untouched.
+    """
+
+    profiles = JsonStore(json_path).list_all()
+    SqliteStore(db_path).write_batch(profiles)
+    return len(profiles)
+
+
+def _default_store() -> ProfileStore:
+    """Build the store selected by ``KNIGHTS_STORAGE`` (default ``sqlite``)."""
+
+    kind = os.environ.get("KNIGHTS_STORAGE", "sqlite").lower()
+    if kind == "json":
+        return JsonStore(KNIGHTS_PATH)
+    if kind != "sqlite":
+        raise ValueError(f"Unknown KNIGHTS_STORAGE: {kind}")
+    fresh = not KNIGHTS_DB_PATH.exists()
+    store = SqliteStore(KNIGHTS_DB_PATH)
+    if fresh and KNIGHTS_PATH.exists():
+        migrate_json_to_sqlite(KNIGHTS_PATH, KNIGHTS_DB_PATH)
+    return store
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+# Called with (name, profile) after a save and (name, None) after a delete
+_listeners: List[Callable[[str, Optional[Dict]], None]] = []
+
+_STORAGE_HELP = "Time spent in profile storage calls"
+_SAVE_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="save")
+_LOAD_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="load")
+_DELETE_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="delete")
+_LIST_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="list")
+_LOAD_MANY_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="load_many")
+_BATCH_SECONDS = REGISTRY.histogram("storage_seconds", _STORAGE_HELP, op="write_batch")
+
+
+def get_store() -> ProfileStore:
+    """Return the active store, creating the default one on first use."""
+
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _default_store()
+    return _store
+
+
+def set_store(store: ProfileStore) -> None:
+    """Replace the active store (e.g. for tests or tooling)."""
+
+    global _store
+    _store = store
+
+
+def add_listener(listener: Callable[[str, Optional[Dict]], None]) -> None:
+    """Call ``listener(name, profile)`` after every :func:`save_knight` and
+    ``listener(name, None)`` after every successful :func:`delete_knight`."""
+
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[str, Optional[Dict]], None]) -> None:
+    """Stop notifying ``listener``."""
+
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify(name: str, profile: Optional[Dict]) -> None:
+    """Tell every listener about a change; the write already happened, so a
+    failing listener is logged instead of failing the caller."""
+
+    for listener in _listeners:
+        try:
+            listener(name, profile)
+        except Exception:
+            log.exception("profile listener failed for %r", name)
 
 
 def save_knight(profile: Dict) -> None:
     """Create or update a knight profile in storage."""
 
-    data = _read_all()
-    data[profile["name"]] = profile
-    _write_all(data)
+    with timed(_SAVE_SECONDS):
+        get_store().save(profile)
+    _notify(profile["name"], profile)
 
 
 def load_knight(name: str) -> Optional[Dict]:
     """Load a knight profile by name or return ``None`` if missing."""
 
-    return _read_all().get(name)
+    with timed(_LOAD_SECONDS):
+        return get_store().load(name)
 
 
 def delete_knight(name: str) -> bool:
     """Delete a knight profile by name. Returns True if removed."""
 
-    data = _read_all()
-    if name in data:
-        del data[name]
-        _write_all(data)
-        return True
-    return False
+    with timed(_DELETE_SECONDS):
+        removed = get_store().delete(name)
+    if removed:
+        _notify(name, None)
+    return removed
 
 
 def list_knights() -> Dict[str, Dict]:
     """Return a dict of all knights keyed by name."""
 
-    return _read_all()
+    with timed(_LIST_SECONDS):
+        return get_store().list_all()
+
+
+def load_knights(names: Iterable[str]) -> Dict[str, Dict]:
+    """Load the existing profiles among ``names`` in one storage read."""
+
+    with timed(_LOAD_MANY_SECONDS):
+        return get_store().load_many(names)
+
+
+def iter_knights() -> Iterator[Dict]:
+    """Yield every knight profile without holding all of them at once (SQLite)."""
+
+    return get_store().iter_all()
+
+
+def write_knights(upserts: Dict[str, Dict], deletes: Iterable[str] = ()) -> None:
+    """Apply many saves and deletes in one storage write (one transaction).
+
+    Listeners hear about every upsert and every name in ``deletes``.
+    """
+
+    deletes = list(deletes)
+    with timed(_BATCH_SECONDS):
+        get_store().write_batch(upserts, deletes)
+    for name in deletes:
+        _notify(name, None)
+    for name, profile in upserts.items():
+        _notify(name, profile)
+
 
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        sys.exit("usage: python -m game.storage migrate")
+    count = migrate_json_to_sqlite()
+    print(f"Migrated {count} profiles from {KNIGHTS_PATH} to {KNIGHTS_DB_PATH}")
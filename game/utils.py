@@ -5,9 +5,13 @@ Demonstrates usage of ``re`` for player name validation.
 
 from __future__ import annotations
 
+import math
 import re
+import sys
 from typing import Tuple
 
+_BINADE = 1 << 52  # integer mantissas of doubles lie in [2**52, 2**53)
+
 NAME_RE = re.compile(r"^[A-Za-z]{3,16}$")
 
 
@@ -30,3 +34,50 @@ def clamp_position(pos: Tuple[int, int], min_x: int = 0, max_x: int = 300) -> Tu
     x = max(min_x, min(max_x, x))
     return (x, y)
 
+
+def repeat_add(value: float, step: float, times: int) -> float:
+    """Return ``value`` after ``times`` repetitions of ``value += step``.
+
+    The result is bit-for-bit what the loop computes, not ``value + times *
+    step`` (which rounds differently). While the sums stay within one binade
+    (same exponent) each addition rounds to the same number of ulps, so a
+    whole run of them collapses into one multiplication; only additions
+    crossing into the next binade, and one parity fix-up when ``step``
+    falls exactly halfway between ulps (ties round to even), are done one
+    by one. The cost is ``O(log(result / step))`` instead of ``O(times)``.
+    Requires ``step > 0`` and a finite ``value >= 0``; other inputs use the
+    plain loop.
+    """
+
+    if not (step > 0 and 0 <= value < math.inf and step < math.inf):
+        for _ in range(times):
+            value += step
+        return value
+    num, den = step.as_integer_ratio()
+    while times > 0:
+        value += step  # a real addition: the result is on its binade's grid
+        times -= 1
+        if times == 0 or value < sys.float_info.min:
+            continue
+        mantissa, exponent = math.frexp(value)
+        ulp_exp = exponent - 53
+        k = int(mantissa * (1 << 53))  # value in ulps
+        # step in ulps, as the exact fraction sn / sd
+        sn, sd = (num, den << ulp_exp) if ulp_exp >= 0 else (num << -ulp_exp, den)
+        d, rem = divmod(sn, sd)
+        if 2 * rem == sd:  # exact tie: stable only once k is even
+            if k & 1:
+                continue
+            inc = d + (d & 1)
+        else:
+            inc = d + (2 * rem > sd)
+        if inc == 0:
+            return value  # step below half an ulp: no addition changes value
+        # Whole additions that cannot reach the next binade
+        room = (2 * _BINADE - 1 - k) // inc - 1
+        if room <= 0:
+            continue
+        run = min(times, room)
+        value = math.ldexp(k + inc * run, ulp_exp)
+        times -= run
+    return value
@@ -1,29 +1,47 @@
 """Main entry point for the medieval boss-rush game.
 
-Runs the Flask development server and initializes the game engine.
+Runs the Flask development server and initializes the game engine, or, with
+``--workers N``, the sharded multi-process server (see :mod:`game.shards`).
 
 Usage:
     python main.py
+    python main.py --workers 4 --host 0.0.0.0 --port 8000
 
 Then open http://localhost:5000 in your browser.
 """
 
 from __future__ import annotations
 
+import argparse
+from typing import List, Optional
+
 from game.api import create_app
 
 
-def main() -> None:
-    """Start the Flask dev server.
+def main(argv: Optional[List[str]] = None) -> None:
+    """Start the Flask dev server, or the sharded server with ``--workers``.
 
-    This function creates the Flask application via ``create_app`` and runs it
-    in development mode on port 5000.
+    Without ``--workers`` this creates the Flask application via
+    ``create_app`` and runs it in development mode (without the reloader)
+    on port 5000.
     """
 
+    parser = argparse.ArgumentParser(description="Medieval boss-rush game server.")
+    parser.add_argument("--workers", type=int, default=0, help="shard worker processes (0: single-process dev server)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.workers > 0:
+        from game.shards import serve_sharded
+
+        serve_sharded(args.workers, host=args.host, port=args.port)
+        return
+
     app = create_app()
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    # The reloader would run create_app (and its scheduler threads) twice
+    app.run(host=args.host, port=args.port, debug=True, use_reloader=False)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,43 @@
+"""Shared fixtures of the test suite (run with ``python -m pytest``)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pytest  # noqa: E402
+
+from game import storage  # noqa: E402
+
+
+@pytest.fixture
+def profiles(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> storage.ProfileStore:
+    """Install a fresh SQLite profile store, so tests never touch ``web/data``."""
+
+    store = storage.SqliteStore(tmp_path / "knights.db")
+    monkeypatch.setattr(storage, "_store", store)
+    return store
+
+
+@pytest.fixture
+def make_app(profiles: storage.ProfileStore, tmp_path: Path):  # type: ignore[no-untyped-def]
+    """Return a factory of test apps stepped by hand (``scheduler.tick()``).
+
+    Profiles go to the temporary store and checkpoints (off unless
+    ``checkpoint_interval`` is given) to ``tmp_path``.
+    """
+
+    from game.api import create_app
+
+    def make(**kwargs):  # type: ignore[no-untyped-def]
+        kwargs.setdefault("start_scheduler", False)
+        kwargs.setdefault("profile_flush_interval", None)
+        kwargs.setdefault("checkpoint_interval", None)
+        kwargs.setdefault("checkpoint_dir", tmp_path / "checkpoints")
+        return create_app(**kwargs)
+
+    return make
@@ -0,0 +1,55 @@
+"""Batched, frame-stamped inputs: :meth:`GameEngine.enqueue_batch` and ``POST /api/actions``."""
+
+from __future__ import annotations
+
+import pytest
+
+from game.engine import INPUT_CAPACITY, GameEngine, coalesce_inputs
+from game.entities import Knight
+
+
+def test_coalesce_drops_duplicates_and_cancelling_moves() -> None:
+    batch = [(3, "attack"), (1, "move_left"), (1, "move_right"), (3, "attack"), (2, "jump")]
+    assert coalesce_inputs(batch) == [(2, "jump"), (3, "attack")]
+    with pytest.raises(ValueError):
+        coalesce_inputs([(0, "teleport")])
+
+
+def test_targets_are_ordered_and_bounded() -> None:
+    engine = GameEngine(player=Knight(name="K"), frame=10)
+    targets = engine.enqueue_batch([(0, "attack"), (0, "jump"), (50, "dash"), (500, "attack")], max_lead=20)
+    assert targets == [11, 12, 30]  # the far-future input does not fit in the lead window
+    assert engine.enqueue_batch([(11, "move_left")], max_lead=20) == []
+    assert list(engine.inputs) == [(11, "attack"), (12, "jump"), (30, "dash")]
+
+
+def test_buffer_capacity_is_respected() -> None:
+    engine = GameEngine(player=Knight(name="K"))
+    engine.enqueue_batch([(i, "attack" if i % 2 else "jump") for i in range(200)], max_lead=1000)
+    assert len(engine.inputs) == INPUT_CAPACITY
+
+
+def test_inputs_apply_one_per_frame() -> None:
+    engine = GameEngine(player=Knight(name="K", position=(100, 50)))
+    engine.enqueue_batch([(0, "move_left"), (0, "jump"), (0, "move_left")])
+    for x in (90, 90, 80):
+        engine.step()
+        assert engine.player.position[0] == x
+
+
+def test_endpoint_schedules_within_the_lead(make_app) -> None:  # type: ignore[no-untyped-def]
+    app = make_app(tick_hz=10.0)
+    client = app.test_client()
+    body = client.post("/api/actions", json={"inputs": [{"action": "attack", "client_frame": 5000}]}).get_json()
+    assert body["ok"] and body["accepted"] == 1
+    assert body["last_frame"] == 20  # INPUT_LEAD_SECONDS at 10 Hz
+    body = client.post("/api/actions", json=[{"action": "jump"}]).get_json()
+    assert body["accepted"] == 0  # the window is full
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [{"inputs": "attack"}, [{"client_frame": 1}], [{"action": "attack", "client_frame": "1"}], [{"action": "fly"}]],
+)
+def test_endpoint_rejects_malformed_batches(make_app, payload) -> None:  # type: ignore[no-untyped-def]
+    assert make_app().test_client().post("/api/actions", json=payload).status_code == 400
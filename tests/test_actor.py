@@ -0,0 +1,99 @@
+"""Single-owner mailboxes of :class:`game.actor.EngineActor`."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from game.actor import EngineActor
+from game.engine import GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+
+
+def _actor() -> EngineActor:
+    engine = GameEngine(player=Knight(name="Owner"))
+    engine.start_boss(create_enemy("goblin"))
+    return EngineActor(engine)
+
+
+def test_messages_run_inline_without_an_owner() -> None:
+    actor = _actor()
+    assert actor.call(lambda eng: eng.player.name) == "Owner"
+    actor.post(lambda eng: eng.step())
+    assert actor.published.frame == 1
+    assert actor.processed == 2
+
+
+def test_call_reraises_and_post_logs() -> None:
+    actor = _actor()
+    with pytest.raises(KeyError):
+        actor.call(lambda eng: {}["missing"])
+    actor.post(lambda eng: {}["missing"])  # logged, does not raise
+    assert actor.call(lambda eng: eng.frame) == 0
+
+
+def test_owner_thread_runs_queued_messages_in_order() -> None:
+    owner: list = []
+    actor = _actor()
+    actor.notify = lambda a: owner.append(a) or True  # type: ignore[func-returns-value]
+    order: list = []
+    actor.post(lambda eng: order.append(1))
+    actor.post(lambda eng: order.append(2))
+    assert owner == [actor] and order == [] and len(actor) == 2
+    assert actor.drain() == 2
+    assert order == [1, 2]
+
+
+def test_call_waits_for_the_owner() -> None:
+    ready = threading.Event()
+    actor = _actor()
+    actor.notify = lambda a: ready.set() or True  # type: ignore[func-returns-value]
+    result: list = []
+    caller = threading.Thread(target=lambda: result.append(actor.call(lambda eng: eng.frame + 1)))
+    caller.start()
+    assert ready.wait(2.0)
+    actor.drain()
+    caller.join(2.0)
+    assert result == [1]
+
+
+def test_call_times_out_without_owner_progress() -> None:
+    actor = _actor()
+    actor.notify = lambda a: True
+    with pytest.raises(TimeoutError):
+        actor.call(lambda eng: None, timeout=0.01)
+
+
+def test_run_waits_for_a_step_in_progress() -> None:
+    actor = _actor()
+    stepping, release = threading.Event(), threading.Event()
+    step = actor.engine.step
+
+    def slow_step(dt: float) -> None:
+        stepping.set()
+        release.wait(2.0)
+        step(dt)
+
+    actor.engine.step = slow_step  # type: ignore[method-assign]
+    stepper = threading.Thread(target=actor.step, args=(0.016,))
+    stepper.start()
+    assert stepping.wait(2.0)
+    frames: list = []
+    reader = threading.Thread(target=lambda: frames.append(actor.run(lambda eng: eng.frame)))
+    reader.start()
+    reader.join(0.05)
+    assert reader.is_alive()  # blocked behind the step
+    release.set()
+    stepper.join(2.0)
+    reader.join(2.0)
+    assert frames == [1]
+
+
+def test_published_view_tracks_new_fights() -> None:
+    actor = _actor()
+    before = actor.published.identity
+    actor.call(lambda eng: eng.start_boss(create_enemy("ogre")))
+    assert actor.published.identity != before
+    assert actor.published.active and actor.snapshot["enemy"]["name"]  # type: ignore[index]
@@ -0,0 +1,72 @@
+"""Cached, hot-reloadable :class:`game.level.AssetRegistry`."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from game.entities import Ogre
+from game.level import ASSETS_DIR, AssetRegistry, build_enemy
+
+
+@pytest.fixture
+def assets_dir(tmp_path: Path) -> Path:
+    for name in ("enemies.json", "levels.json"):
+        shutil.copy(ASSETS_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+def _edit(path: Path, change) -> None:  # type: ignore[no-untyped-def]
+    data = json.loads(path.read_text(encoding="utf-8"))
+    change(data)
+    path.write_text(json.dumps(data), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # coarse mtime clocks
+
+
+def test_enemies_are_independent_clones(assets_dir: Path) -> None:
+    registry = AssetRegistry(assets_dir)
+    first, second = registry.create_enemy("ogre"), registry.create_enemy("ogre")
+    assert isinstance(first, Ogre) and first is not second
+    first.health -= 50
+    assert second.health == registry.enemy_config("ogre")["health"]
+    assert registry.order() == ["goblin", "ogre", "dragon"]
+    with pytest.raises(ValueError):
+        registry.create_enemy("unicorn")
+
+
+def test_edits_are_picked_up(assets_dir: Path) -> None:
+    registry = AssetRegistry(assets_dir, check_interval=0.0)
+    running = registry.create_enemy("goblin")
+    _edit(assets_dir / "enemies.json", lambda d: d["goblin"].update(health=999))
+    assert registry.create_enemy("goblin").health == 999
+    assert running.health == 60  # fights in progress keep their enemy
+    assert registry.reloads == 2
+
+
+def test_invalid_edit_keeps_the_last_good_assets(assets_dir: Path) -> None:
+    registry = AssetRegistry(assets_dir, check_interval=0.0)
+    _edit(assets_dir / "levels.json", lambda d: d["order"].append("unicorn"))
+    assert not registry.maybe_reload()
+    assert "unicorn" in (registry.last_error or "")
+    assert registry.order() == ["goblin", "ogre", "dragon"]
+
+
+def test_checks_are_rate_limited(assets_dir: Path) -> None:
+    registry = AssetRegistry(assets_dir, check_interval=3600.0)
+    registry.maybe_reload()
+    _edit(assets_dir / "enemies.json", lambda d: d["goblin"].update(health=999))
+    assert registry.create_enemy("goblin").health == 60
+
+
+@pytest.mark.parametrize(
+    "cfg",
+    [{"class": "Wizard"}, {"health": 0}, {"health": "lots"}, {"attack_damage": -1}, {"start_pos": [1]}],
+)
+def test_build_enemy_validates(cfg: dict) -> None:
+    with pytest.raises(ValueError):
+        build_enemy("goblin", cfg)
@@ -0,0 +1,43 @@
+"""Monte Carlo balance runs of :mod:`game.balance`."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from game.balance import POLICIES, format_table, play_fight, run_balance, work_units
+
+
+def test_results_do_not_depend_on_workers() -> None:
+    kwargs = dict(fights=6, bosses=["goblin", "ogre"], policies=["greedy", "random"], chunk=4, seed=7, max_frames=300)
+    inline = run_balance(workers=1, **kwargs)  # type: ignore[arg-type]
+    pooled = run_balance(workers=2, **kwargs)  # type: ignore[arg-type]
+    assert inline == pooled
+    assert [(row["boss"], row["policy"], row["fights"]) for row in inline] == [
+        ("goblin", "greedy", 6),
+        ("goblin", "random", 6),
+        ("ogre", "greedy", 6),
+        ("ogre", "random", 6),
+    ]
+    assert "goblin" in format_table(inline)
+
+
+def test_fights_use_the_given_dt() -> None:
+    # The ogre's slam cooldown runs in game seconds, so longer steps slam more often per frame
+    short = play_fight("ogre", POLICIES["kiting"], random.Random(1), dt=0.016)
+    long = play_fight("ogre", POLICIES["kiting"], random.Random(1), dt=0.1)
+    assert short.frames == long.frames and short.damage_taken < long.damage_taken
+
+
+def test_work_units_cover_every_fight() -> None:
+    units = work_units(["ogre"], ["kiting"], fights=10, chunk=4, seed=0, max_frames=50, dt=0.05)
+    assert [u[4] for u in units] == [4, 4, 2]
+    assert {u[6] for u in units} == {0.05}
+
+
+def test_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        run_balance(fights=1, policies=["cheater"], workers=1)
+    with pytest.raises(ValueError):
+        run_balance(fights=1, workers=1, dt=0.0)
@@ -0,0 +1,61 @@
+"""Parity of the vectorised :class:`game.batch.BatchSimulator` with the scalar engine."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from game.batch import ACTIONS, ATTACK, MOVE_LEFT, MOVE_RIGHT, NOOP, BatchSimulator, _scalar_state, parity_check
+from game.engine import GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+
+TICKS = 400
+
+
+def _fights(boss: str, count: int, seed: int):  # type: ignore[no-untyped-def]
+    """Long fights with the boss starting within reach of the knight."""
+
+    rng = random.Random(seed)
+    engines = []
+    for _ in range(count):
+        player = Knight(name="Parity", health=10**6, position=(rng.randrange(0, 301, 10), 50))
+        enemy = create_enemy(boss)
+        enemy.health = 10**6
+        enemy.position = (player.position[0] + rng.randrange(-20, 120), enemy.position[1])
+        engines.append(GameEngine(player=player, enemy=enemy))
+    return engines
+
+
+@pytest.mark.parametrize("dt", [0.016, 0.1])
+@pytest.mark.parametrize("boss", ["goblin", "ogre", "dragon"])
+def test_batch_matches_scalar_engine(boss: str, dt: float) -> None:
+    rng = random.Random(boss)
+    engines = _fights(boss, 24, seed=len(boss))
+    sim = BatchSimulator.from_engines(engines)
+    slams = 0
+    for tick in range(TICKS):
+        actions = np.array([rng.choice((NOOP, MOVE_LEFT, MOVE_RIGHT, ATTACK)) for _ in engines])
+        before = [getattr(eng.enemy, "slam_cooldown", 0.0) for eng in engines]
+        for eng, action in zip(engines, actions):
+            if action:
+                eng.enqueue_action(ACTIONS[action])
+            eng.step(dt)
+        sim.step(actions, dt)
+        for i, eng in enumerate(engines):
+            assert sim.state(i) == _scalar_state(eng), f"fight {i} diverged at tick {tick + 1}"
+            slams += getattr(eng.enemy, "slam_cooldown", 0.0) > before[i]
+    # Knights took hits, so the enemy attacks (slam, breath) were exercised
+    assert any(eng.player.health < 10**6 for eng in engines)
+    if boss == "ogre":
+        # The cooldown ran out and re-armed during the run, not only at tick 1
+        assert slams > len(engines)
+    if boss == "dragon":
+        assert max(eng.enemy.breath_phase for eng in engines) > 2.0
+
+
+def test_parity_check_passes() -> None:
+    parity_check(fights=12, ticks=120, seed=3)
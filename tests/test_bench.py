@@ -0,0 +1,32 @@
+"""Baseline save and regression compare of ``bench.py``."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import bench
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold() -> None:
+    baseline = {"engine.step": 1e-6, "api.state": 2e-5, "alloc.tick.peak": 0.0, "gone": 1.0}
+    results = {"engine.step": 1.05e-6, "api.state": 3e-5, "alloc.tick.peak": 512.0, "new": 1.0}
+    assert bench.compare(results, baseline, threshold=10.0) == ["api.state", "alloc.tick.peak"]
+    assert bench.compare(results, baseline, threshold=60.0) == ["alloc.tick.peak"]
+
+
+def test_main_saves_and_compares(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    timings = {"engine.step": 1e-6}
+    monkeypatch.setattr(bench, "run", lambda pattern, sizes: dict(timings))
+    path = tmp_path / "baseline.json"
+    assert bench.main(["--save", str(path)]) == 0
+    assert json.loads(path.read_text(encoding="utf-8"))["results"] == timings
+    assert bench.main(["--compare", str(path)]) == 0
+    timings["engine.step"] = 2e-6
+    assert bench.main(["--compare", str(path), "--threshold", "50"]) == 1
+
+
+def test_measure_returns_per_call_seconds() -> None:
+    assert 0 < bench.measure(lambda: None, repeat=2) < 1e-3
@@ -0,0 +1,100 @@
+"""Write-behind :class:`game.cache.ProfileCache`."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+from game.cache import ProfileCache
+from game.storage import ProfileStore, SqliteStore
+
+
+class CountingStore(SqliteStore):
+    """SQLite store that counts writes and stamp checks."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.batches = 0
+        self.stamps = 0
+
+    def write_batch(self, upserts, deletes=()):  # type: ignore[no-untyped-def]
+        self.batches += 1
+        super().write_batch(upserts, deletes)
+
+    def stamp(self):  # type: ignore[no-untyped-def]
+        self.stamps += 1
+        return super().stamp()
+
+
+@pytest.fixture
+def backend(tmp_path: Path) -> CountingStore:
+    return CountingStore(tmp_path / "knights.db")
+
+
+def test_writes_are_coalesced_into_one_batch(backend: CountingStore) -> None:
+    cache = ProfileCache(backend)
+    for gold in range(50):
+        cache.save({"name": "A", "gold": gold})
+    cache.save({"name": "B", "gold": 1})
+    cache.delete("B")
+    assert backend.load("A") is None and cache.pending == 2
+    assert cache.flush() == 2
+    assert backend.batches == 1 and backend.load("A") == {"name": "A", "gold": 49}
+    assert cache.flush() == 0
+
+
+def test_reads_are_copies(backend: CountingStore) -> None:
+    cache = ProfileCache(backend)
+    profile = {"name": "A", "gold": 1}
+    cache.save(profile)
+    profile["gold"] = 2
+    loaded = cache.load("A")
+    assert loaded == {"name": "A", "gold": 1}
+    loaded["gold"] = 3  # type: ignore[index]
+    assert cache.load("A")["gold"] == 1  # type: ignore[index]
+    assert cache.list_all()["A"] is not cache.list_all()["A"]
+
+
+def test_stamp_is_checked_on_a_timer(backend: CountingStore) -> None:
+    cache = ProfileCache(backend, stamp_interval=0.05)
+    cache.load("A")
+    checks = backend.stamps
+    for _ in range(100):
+        cache.load("A")
+    assert backend.stamps == checks
+    backend.save({"name": "Outside", "gold": 7})  # written by another process
+    assert cache.load("Outside") is None
+    time.sleep(0.06)
+    assert cache.load("Outside") == {"name": "Outside", "gold": 7}
+
+
+def test_reload_keeps_pending_writes(backend: CountingStore) -> None:
+    cache = ProfileCache(backend, stamp_interval=0.0)
+    cache.save({"name": "Local", "gold": 1})
+    backend.save({"name": "Outside", "gold": 2})
+    assert sorted(cache.list_all()) == ["Local", "Outside"]
+
+
+def test_failed_flush_keeps_changes(backend: CountingStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ProfileCache(backend)
+    cache.save({"name": "A", "gold": 1})
+
+    def fail(upserts, deletes=()):  # type: ignore[no-untyped-def]
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "write_batch", fail)
+    with pytest.raises(OSError):
+        cache.flush()
+    monkeypatch.undo()
+    assert cache.pending == 1 and cache.flush() == 1
+    assert backend.load("A") == {"name": "A", "gold": 1}
+
+
+def test_close_flushes_the_background_thread(backend: ProfileStore) -> None:
+    cache = ProfileCache(backend, flush_interval=60.0)
+    cache.start()
+    cache.save({"name": "A", "gold": 1})
+    cache.close()
+    assert backend.load("A") == {"name": "A", "gold": 1}
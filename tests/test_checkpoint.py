@@ -0,0 +1,164 @@
+"""KCKP engine checkpoints, their store and resuming sessions from them."""
+
+from __future__ import annotations
+
+import os
+import time
+import zlib
+from pathlib import Path
+
+import pytest
+
+from game import checkpoint
+from game.checkpoint import CheckpointStore, Checkpointer, dumps, loads
+from game.engine import GameEngine
+from game.entities import Goblin, Knight, Projectile
+from game.level import create_enemy
+from game.replay import FightRecording, snapshot_hash, verify
+from game.sessions import SessionRegistry
+
+
+def _busy_engine() -> GameEngine:
+    engine = GameEngine(player=Knight(name="Saver", stamina=42.5, position=(80, 50)))
+    engine.start_wave(["ogre", "dragon"], create_enemy)
+    engine.spawn(Projectile(name="Fire", health=1, position=(200, 50), ttl=0.7))
+    for _ in range(37):
+        engine.step()
+    engine.player.gold = 12
+    engine.enqueue_action("attack", engine.frame + 3)
+    engine.events.emit("hit", 5, engine.frame)
+    return engine
+
+
+def test_round_trip_is_exact() -> None:
+    engine = _busy_engine()
+    restored = loads(dumps(engine))
+    assert restored.snapshot() == engine.snapshot()
+    assert restored.enemy == engine.enemy and restored.entities == engine.entities
+    assert list(restored.inputs) == list(engine.inputs)
+    assert restored.events.next_seq == engine.events.next_seq
+    assert restored.wave is not None and restored.wave.order == ["ogre", "dragon"]
+    for _ in range(300):
+        engine.step()
+        restored.step()
+    assert snapshot_hash(restored) == snapshot_hash(engine)
+
+
+def test_older_versions_still_load() -> None:
+    engine = GameEngine(player=Knight(name="Old"))
+    engine.start_boss(create_enemy("goblin"))
+    current = dumps(engine)
+    assert current[4] == checkpoint.VERSION == 3
+    # Version 2 had no recorder flag, version 1 no wave flag either
+    v2 = current[:4] + bytes([2]) + current[5:-1]
+    v1 = current[:4] + bytes([1]) + current[5:-2]
+    for data in (v2, v1):
+        assert loads(data).snapshot() == engine.snapshot()
+
+
+def test_bad_data_is_rejected() -> None:
+    data = dumps(_busy_engine())
+    with pytest.raises(ValueError):
+        loads(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        loads(data[:4] + bytes([checkpoint.VERSION + 1]) + data[5:])
+    with pytest.raises(ValueError):
+        loads(data[:-5])
+
+
+def test_any_number_a_character_holds_round_trips() -> None:
+    engine = GameEngine(player=Knight(name="Odd", position=(50.5, 2**70), stamina=3))
+    engine.start_boss(create_enemy("goblin"))
+    engine.player.gold = 10**20
+    engine.player.health = -(2**64)
+    restored = loads(dumps(engine))
+    assert restored.player.position == (50.5, 2**70)
+    assert restored.player.gold == 10**20 and restored.player.health == -(2**64)
+    assert restored.snapshot() == engine.snapshot()
+
+
+def test_one_bad_session_does_not_stop_the_others(tmp_path: Path) -> None:
+    registry = SessionRegistry()
+    for token in ("bad", "good"):
+        registry.get_or_create(token).actor.call(lambda eng: eng.start_boss(create_enemy("goblin")))
+    registry.get("bad").engine.player.position = [1, 2]  # type: ignore[union-attr]
+    checkpoints = Checkpointer(CheckpointStore(tmp_path), registry)
+    assert checkpoints.checkpoint_all() == 1
+    checkpoints.close()
+    assert CheckpointStore(tmp_path).exists("good") and not CheckpointStore(tmp_path).exists("bad")
+
+
+def test_out_of_range_profile_keeps_the_scheduler_running(make_app) -> None:  # type: ignore[no-untyped-def]
+    from game import storage
+
+    headers = {"X-Session-Id": "legacy"}
+    storage.save_knight({"name": "Legacy", "position": [50.5, 50], "gold": 10**20})
+    app = make_app(checkpoint_interval=1 / 60)
+    client = app.test_client()
+    assert client.post("/api/start_boss/ogre", json={"name": "Legacy"}, headers=headers).status_code == 200
+    scheduler = app.extensions["scheduler"]
+    for _ in range(3):
+        scheduler.tick()
+    assert scheduler.stats()["failures"] == 0
+    app.extensions["checkpoints"].close()
+    resumed = make_app(checkpoint_interval=1 / 60).test_client()
+    state = resumed.get("/api/state", headers=headers).get_json()
+    assert state["frame"] == 3 and state["player"]["gold"] == 10**20
+
+
+def test_store_is_atomic_per_token(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path)
+    store.save("tok_1", b"abc")
+    assert store.load("tok_1") == b"abc" and store.exists("tok_1")
+    assert [p.name for p in tmp_path.iterdir()] == ["tok_1.ckpt"]
+    with pytest.raises(ValueError):
+        store.save("../escape", b"x")
+    assert store.load("../escape") is None
+    old = time.time() - 3600
+    os.utime(tmp_path / "tok_1.ckpt", (old, old))
+    assert store.prune(60) == 1 and not store.delete("tok_1")
+
+
+def test_buckets_are_stable_and_cover_every_session(tmp_path: Path) -> None:
+    registry = SessionRegistry()
+    tokens = [f"token{i}" for i in range(40)]
+    for token in tokens:
+        registry.get_or_create(token).actor.call(lambda eng: eng.start_boss(create_enemy("goblin")))
+    checkpoints = Checkpointer(CheckpointStore(tmp_path), registry)
+    counts = [checkpoints.checkpoint_all(bucket=(i, 4)) for i in range(4)]
+    assert sum(counts) == len(tokens)
+    assert counts[1] == sum(zlib.crc32(t.encode()) % 4 == 1 for t in tokens)
+    assert checkpoints.checkpoint_all() == 0  # nothing changed since
+    assert checkpoints.flush() == len(tokens)
+
+
+def test_unreadable_checkpoints_are_discarded(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path)
+    store.save("broken", b"KCKP\x03garbage")
+    assert Checkpointer(store, SessionRegistry()).restore("broken") is None
+    assert not store.exists("broken")
+
+
+def test_session_resumes_with_its_recording(make_app, tmp_path: Path) -> None:  # type: ignore[no-untyped-def]
+    headers = {"X-Session-Id": "resumer"}
+    app = make_app(checkpoint_interval=5.0)
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Resumer"})
+    client.post("/api/start_boss/dragon", json={"name": "Resumer"}, headers=headers)
+    for _ in range(40):
+        client.post("/api/action", json={"action": "attack"}, headers=headers)
+        app.extensions["scheduler"].tick()
+    before = client.get("/api/state", headers=headers).get_json()
+    app.extensions["checkpoints"].close()
+
+    resumed = make_app(checkpoint_interval=5.0).test_client()
+    assert resumed.get("/api/state", headers=headers).get_json() == before
+    response = resumed.get("/api/replay", headers=headers)
+    assert response.status_code == 200
+    recording = FightRecording.from_bytes(response.data)
+    assert recording.final_frame == 40 and verify(recording)
+
+
+def test_entities_keep_their_class() -> None:
+    engine = GameEngine(player=Knight(name="K"), entities=[Goblin(name="Minion", health=3, position=(1, 2))])
+    assert type(loads(dumps(engine)).entities[0]) is Goblin
@@ -0,0 +1,95 @@
+"""Delta and binary snapshot encodings of :mod:`game.codec`."""
+
+from __future__ import annotations
+
+import pytest
+
+from game.codec import BINARY_FIELDS, SnapshotEncoder, apply_message, flatten, pack_binary, unflatten, unpack_binary
+from game.engine import GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+
+
+def _engine() -> GameEngine:
+    engine = GameEngine(player=Knight(name="Codec", position=(120, 50)))
+    engine.start_boss(create_enemy("ogre"))
+    return engine
+
+
+def _identity(engine: GameEngine):  # type: ignore[no-untyped-def]
+    return (id(engine.player), id(engine.enemy))
+
+
+def test_flatten_round_trips() -> None:
+    snapshot = _engine().snapshot()
+    flat = flatten(snapshot)
+    assert flat["player.name"] == "Codec"
+    assert flatten(unflatten(flat)) == flat
+
+
+def test_client_follows_deltas() -> None:
+    engine, encoder = _engine(), SnapshotEncoder()
+    message = encoder.encode(engine.snapshot(), _identity(engine))
+    assert message["key"]
+    state = apply_message(None, message)
+    for action in ["attack", "move_left", None, "attack", "move_right"] * 6:
+        if action:
+            engine.enqueue_action(action)
+        engine.step()
+        message = encoder.encode(engine.snapshot(), _identity(engine), base=state["frame"], epoch=message["epoch"])
+        assert not message.get("key")
+        assert "player.name" not in message["d"]  # type: ignore[operator]
+        state = apply_message(state, message)
+        assert state == flatten(engine.snapshot())
+
+
+def test_unknown_base_or_new_fight_sends_a_keyframe() -> None:
+    engine, encoder = _engine(), SnapshotEncoder()
+    first = encoder.encode(engine.snapshot(), _identity(engine))
+    engine.step()
+    assert encoder.encode(engine.snapshot(), _identity(engine), base=999, epoch=first["epoch"])["key"]
+    engine.start_boss(create_enemy("dragon"))
+    fresh = encoder.encode(engine.snapshot(), _identity(engine), base=0, epoch=first["epoch"])
+    assert fresh["key"] and fresh["epoch"] != first["epoch"]
+
+
+def test_keyframe_interval_forces_keyframes() -> None:
+    engine, encoder = _engine(), SnapshotEncoder(keyframe_interval=5)
+    message = encoder.encode(engine.snapshot(), _identity(engine))
+    keys = []
+    for _ in range(10):
+        engine.step()
+        message = encoder.encode(engine.snapshot(), _identity(engine), base=engine.frame - 1, epoch=message["epoch"])
+        keys.append(bool(message.get("key")))
+    assert keys == [False, False, False, False, True] * 2
+
+
+def test_delta_needs_a_base() -> None:
+    with pytest.raises(ValueError):
+        apply_message(None, {"frame": 1, "epoch": 1, "base": 0, "d": {}})
+
+
+def test_binary_round_trips_keyframes_and_deltas() -> None:
+    engine, encoder = _engine(), SnapshotEncoder()
+    key = encoder.encode(engine.snapshot(), _identity(engine))
+    decoded = unpack_binary(pack_binary(key, has_enemy=True))
+    assert decoded["key"] and decoded["frame"] == 0 and decoded["epoch"] == key["epoch"]
+    flat = flatten(decoded["state"])  # type: ignore[arg-type]
+    for path, _ in BINARY_FIELDS:
+        assert flat[path] == pytest.approx(flatten(engine.snapshot())[path])
+
+    engine.enqueue_action("move_left")
+    engine.step()
+    delta = encoder.encode(engine.snapshot(), _identity(engine), base=0, epoch=key["epoch"])
+    got = unpack_binary(pack_binary(delta, has_enemy=True))
+    assert got["base"] == 0 and got["frame"] == 1
+    assert got["d"]["player.position"] == [110, 50]  # type: ignore[index]
+
+
+def test_binary_marks_missing_enemy() -> None:
+    engine = GameEngine(player=Knight(name="Alone"))
+    message = SnapshotEncoder().encode(engine.snapshot(), _identity(engine))
+    decoded = unpack_binary(pack_binary(message, has_enemy=False))
+    assert decoded["state"]["enemy"] is None  # type: ignore[index]
+    with pytest.raises(ValueError):
+        unpack_binary(b"\x09" + pack_binary(message, has_enemy=False)[1:])
@@ -0,0 +1,165 @@
+"""Single and bulk knight CRUD, field validation and NDJSON import/export."""
+
+from __future__ import annotations
+
+import json
+import re
+
+import pytest
+
+from game import crud, storage
+from game.crud import (
+    DUPLICATE_NAME,
+    INVALID_NAME,
+    NOT_FOUND,
+    create_knight,
+    create_knights,
+    delete_knights,
+    export_knights,
+    field_error,
+    import_knights,
+    record_rush,
+    update_knight,
+    update_knights,
+)
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"gold": "100"},
+        {"gold": -1},
+        {"gold": 2**32},
+        {"health": 2**31},
+        {"position": [50.5, 50]},
+        {"position": [0, -(2**31) - 1]},
+        {"health": True},
+        {"stamina": 101},
+        {"stamina": float("inf")},
+        {"position": [1]},
+        {"skin": ""},
+        {"progress": {"best_times": {"ogre": -2}}},
+        {"wings": 2},
+    ],
+)
+def test_field_error_rejects_bad_values(fields) -> None:  # type: ignore[no-untyped-def]
+    assert field_error(fields) is not None
+
+
+def test_field_error_accepts_a_full_profile() -> None:
+    fields = {k: v for k, v in crud.new_profile("Arthur").items() if k != "name"}
+    assert field_error(fields) is None
+
+
+def test_single_crud(profiles) -> None:  # type: ignore[no-untyped-def]
+    create_knight("Arthur")
+    with pytest.raises(ValueError, match=DUPLICATE_NAME):
+        create_knight("Arthur")
+    with pytest.raises(ValueError, match=re.escape(INVALID_NAME)):
+        create_knight("A1")
+    assert update_knight("Arthur", {"gold": 7, "name": "Arthur"})["gold"] == 7
+    with pytest.raises(ValueError):
+        update_knight("Arthur", {"name": "Lancelot"})
+    with pytest.raises(ValueError, match=NOT_FOUND):
+        update_knight("Lancelot", {"gold": 1})
+    with pytest.raises(ValueError):
+        update_knight("Arthur", {"gold": "7"})
+    assert storage.load_knight("Arthur")["gold"] == 7
+
+
+def test_bulk_operations_report_per_item_errors(profiles) -> None:  # type: ignore[no-untyped-def]
+    create_knight("Arthur")
+    result = create_knights(["Gawain", "x", "Gawain", "Arthur", 5, "Percival"])
+    assert [p["name"] for p in result["created"]] == ["Gawain", "Percival"]
+    assert [(e["index"], e["error"]) for e in result["errors"]] == [
+        (1, INVALID_NAME),
+        (2, DUPLICATE_NAME),
+        (3, DUPLICATE_NAME),
+        (4, INVALID_NAME),
+    ]
+
+    result = update_knights(
+        [{"name": "Gawain", "gold": 1}, {"name": "Gawain", "skin": "red"}, {"name": "Tristan", "gold": 2}, {"name": "Arthur", "gold": -5}]
+    )
+    assert result["updated"] == [dict(storage.load_knight("Gawain"))]
+    assert storage.load_knight("Gawain")["gold"] == 1 and storage.load_knight("Gawain")["skin"] == "red"
+    assert [e["index"] for e in result["errors"]] == [2, 3]
+    assert storage.load_knight("Arthur")["gold"] == 0
+
+    result = delete_knights(["Gawain", "Tristan", "Gawain"])
+    assert result["deleted"] == ["Gawain"] and [e["index"] for e in result["errors"]] == [1]
+    assert storage.load_knight("Gawain") is None
+
+
+def test_ndjson_import_and_export(profiles) -> None:  # type: ignore[no-untyped-def]
+    lines = [
+        json.dumps({"name": "Arthur", "gold": 3}),
+        "",
+        "{not json",
+        json.dumps({"name": "Kay", "gold": "3"}),
+        json.dumps({"name": "Bedivere"}).encode("utf-8"),
+        json.dumps({"name": "Galahad", "skin": "gold"}),
+        json.dumps({"name": "Tristan", "position": [1.5, 2]}),
+    ]
+    result = import_knights(iter(lines), batch_size=2)
+    assert result["imported"] == 3
+    assert [(e["index"], e["name"]) for e in result["errors"]] == [(3, None), (4, "Kay"), (7, "Tristan")]
+    assert storage.load_knight("Arthur")["gold"] == 3 and storage.load_knight("Bedivere")["health"] == 100
+    exported = {json.loads(line)["name"]: json.loads(line) for line in export_knights()}
+    assert exported == storage.list_knights()
+    with pytest.raises(ValueError):
+        import_knights([], batch_size=0)
+
+
+def test_record_rush_keeps_best_full_clear(profiles) -> None:  # type: ignore[no-untyped-def]
+    create_knight("Arthur")
+    record_rush("Arthur", [("goblin", 10.0), ("ogre", 20.0)], cleared=True)
+    profile = record_rush("Arthur", [("goblin", 5.0)], cleared=False)
+    rush = profile["progress"]["rush"]
+    assert rush["runs"] == 2 and rush["best"] == 30.0 and rush["last"]["total"] == 5.0
+    assert profile["progress"]["best_times"] == {"goblin": 5.0, "ogre": 20.0}
+    assert record_rush("Nobody", [], cleared=False) is None
+
+
+@pytest.mark.parametrize("fields", [{"position": [50.5, 50]}, {"gold": 10**20}])
+def test_out_of_range_put_is_rejected_and_the_fight_still_checkpoints(make_app, fields) -> None:  # type: ignore[no-untyped-def]
+    headers = {"X-Session-Id": "ranger"}
+    app = make_app(checkpoint_interval=1 / 60)
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Ranger"})
+    assert client.put("/api/knight/Ranger", json=fields).status_code == 400
+    client.post("/api/start_boss/ogre", json={"name": "Ranger"}, headers=headers)
+    scheduler = app.extensions["scheduler"]
+    scheduler.tick()
+    assert scheduler.stats()["failures"] == 0
+    binary = client.get("/api/state", headers={**headers, "Accept": "application/octet-stream"})
+    assert binary.status_code == 200
+    app.extensions["checkpoints"].close()
+    assert app.extensions["checkpoints"].store.exists("ranger")
+
+
+def test_crud_endpoints(make_app) -> None:  # type: ignore[no-untyped-def]
+    client = make_app(admin_token="s3cret").test_client()
+    assert client.post("/api/knight", json={"name": "Arthur"}).status_code == 201
+    assert client.post("/api/knight", json={"name": "Arthur"}).status_code == 400
+    assert client.post("/api/knight", json={"name": "A1"}).status_code == 400
+    assert client.post("/api/knight", json=["Arthur"]).status_code == 400
+    assert client.put("/api/knight/Arthur", json={"gold": 4}).get_json()["gold"] == 4
+    assert client.put("/api/knight/Arthur", json={"gold": "4"}).status_code == 400
+    assert client.put("/api/knight/Arthur", json=[1]).status_code == 400
+    assert client.put("/api/knight/Nobody", json={"gold": 4}).status_code == 404
+    assert client.delete("/api/knight/Arthur").status_code == 204
+    assert client.get("/api/knight/Arthur").status_code == 404
+
+    assert client.post("/api/knights", json=["Gawain"]).status_code == 403
+    assert client.post("/api/knights", json={"names": "Gawain"}, headers=ADMIN).status_code == 400
+    created = client.post("/api/knights", json={"names": ["Gawain", "Kay"]}, headers=ADMIN).get_json()
+    assert len(created["created"]) == 2
+    body = b'{"name": "Percival", "gold": 9}\n{"name": "Kay", "gold": 1}\n'
+    assert client.post("/api/knights/import", data=body, headers=ADMIN).get_json() == {"imported": 2, "errors": []}
+    export = client.get("/api/knights/export", headers=ADMIN)
+    assert export.mimetype == "application/x-ndjson"
+    names = sorted(json.loads(line)["name"] for line in export.get_data(as_text=True).splitlines())
+    assert names == ["Gawain", "Kay", "Percival"]
@@ -0,0 +1,62 @@
+"""Event ring cursors, ``GET /api/events`` and events on the SSE stream."""
+
+from __future__ import annotations
+
+import json
+
+from game.events import EventRing
+
+
+def _fight(make_app):  # type: ignore[no-untyped-def]
+    app = make_app()
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Eventful"})
+    client.post("/api/start_boss/ogre", json={"name": "Eventful"})
+    scheduler = app.extensions["scheduler"]
+    for _ in range(60):
+        client.post("/api/action", json={"action": "attack"})
+        scheduler.tick()
+    return client
+
+
+def test_ring_cursors() -> None:
+    ring = EventRing(capacity=8)
+    for i in range(5):
+        ring.emit("hit", i, frame=i, target="Ogre" if i % 2 else None)
+    events, cursor = ring.since(0, limit=2)
+    assert [e["seq"] for e in events] == [0, 1] and cursor == 2
+    assert events[1]["target"] == "Ogre" and "target" not in events[0]
+    events, cursor = ring.since(cursor)
+    assert [e["seq"] for e in events] == [2, 3, 4] and cursor == 5
+    assert ring.since(99) == ([], 5)  # a cursor from another engine is pulled back
+
+
+def test_events_endpoint_pages_with_the_session_cursor(make_app) -> None:  # type: ignore[no-untyped-def]
+    client = _fight(make_app)
+    first = client.get("/api/events?limit=1").get_json()
+    assert len(first["events"]) == 1 and first["next"] == first["events"][0]["seq"] + 1
+    rest = client.get("/api/events").get_json()
+    assert rest["events"] and rest["events"][0]["seq"] == first["next"]
+    assert {e["type"] for e in first["events"] + rest["events"]} <= {"hit", "player_hit"}
+    assert client.get("/api/events").get_json()["events"] == []
+    again = client.get("/api/events?since=0").get_json()
+    assert len(again["events"]) == len(first["events"]) + len(rest["events"])
+
+
+def test_stream_sends_events_before_the_snapshot(make_app) -> None:  # type: ignore[no-untyped-def]
+    client = _fight(make_app)
+    response = client.get("/api/stream", buffered=False)
+    chunks = iter(response.response)
+    try:
+        events = next(chunks)
+        snapshot = next(chunks)
+    finally:
+        response.close()
+    events = events.decode() if isinstance(events, bytes) else events
+    snapshot = snapshot.decode() if isinstance(snapshot, bytes) else snapshot
+    assert events.startswith("event: events\n")
+    body = json.loads(events.split("data: ", 1)[1])
+    assert body["events"] and body["next"] == body["events"][-1]["seq"] + 1
+    assert snapshot.startswith("id: 60\n")
+    # The stream advanced the session cursor: nothing left to poll
+    assert client.get("/api/events").get_json()["events"] == []
@@ -0,0 +1,71 @@
+"""Allocation-free hot path: slotted entities, reused hitboxes and event records."""
+
+from __future__ import annotations
+
+import copy
+import gc
+import tracemalloc
+
+import pytest
+
+from game.engine import GameEngine
+from game.entities import Dragon, Goblin, Knight, Ogre, Projectile
+from game.events import EventRing
+from game.level import create_enemy
+
+
+@pytest.mark.parametrize("cls", [Knight, Goblin, Ogre, Dragon, Projectile])
+def test_entities_are_slotted(cls: type) -> None:
+    entity = Knight(name="K") if cls is Knight else cls(name="E", health=10, position=(0, 0))
+    assert not hasattr(entity, "__dict__")
+
+
+def test_attacks_refill_one_hitbox() -> None:
+    knight = Knight(name="K", position=(0, 50))
+    first = knight.attack()
+    knight.position = (40, 50)
+    second = knight.attack()
+    assert first is second and second.x == 60 and second["x"] == 60
+    ogre = create_enemy("ogre")
+    clone = copy.copy(ogre)
+    assert clone.attack() is not ogre.attack()
+
+
+def test_event_ring_reuses_records() -> None:
+    ring = EventRing(capacity=4)
+    for i in range(4):
+        ring.emit("hit", i, frame=i)
+    records = list(ring._records)
+    for i in range(4, 10):
+        ring.emit("hit", i, frame=i)
+    assert all(a is b for a, b in zip(records, ring._records))
+    events, cursor = ring.since(0)
+    assert events[0] == {"type": "gap", "from": 0, "to": 6, "missed": 6}
+    assert [e["amount"] for e in events[1:]] == [6, 7, 8, 9] and cursor == 10
+
+
+def test_steady_fight_retains_no_memory_per_tick() -> None:
+    engine = GameEngine(player=Knight(name="K", health=10**9, position=(220, 50)))
+    engine.start_boss(create_enemy("goblin"))
+    enemy = engine.enemy
+    assert enemy is not None
+    enemy.health = 10**9
+
+    def ticks(count: int) -> None:
+        for _ in range(count):
+            enemy.position = (260, 50)  # hold the goblin in reach of the sword
+            engine.enqueue_action("attack")
+            engine.step()
+
+    tracemalloc.start()
+    try:
+        ticks(500)  # fill the event ring while traced, so its reuse balances out
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        ticks(2000)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    assert engine.events.next_seq > 2 * engine.events.capacity  # the ring wrapped
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert grown < 2000  # bytes over 2000 ticks, i.e. nothing per tick
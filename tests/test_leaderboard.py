@@ -0,0 +1,136 @@
+"""Sorted leaderboard indexes kept current by storage listeners."""
+
+from __future__ import annotations
+
+import random
+import time
+
+import pytest
+
+from game import leaderboard, storage
+from game.cache import ProfileCache
+from game.leaderboard import Leaderboard, SortedKeys
+from game.storage import SqliteStore
+
+
+@pytest.fixture
+def board(profiles):  # type: ignore[no-untyped-def]
+    board = Leaderboard()
+    storage.add_listener(board.on_change)
+    yield board
+    storage.remove_listener(board.on_change)
+
+
+def test_sorted_keys_match_a_sorted_list(monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(leaderboard, "LOAD", 4)
+    rng = random.Random(7)
+    keys = SortedKeys((rng.randrange(50), f"k{i}") for i in range(30))
+    expected = sorted(keys)
+    for i in range(400):
+        if expected and rng.random() < 0.45:
+            key = expected.pop(rng.randrange(len(expected)))
+            keys.remove(key)
+        else:
+            key = (rng.randrange(50), f"n{i}")
+            keys.add(key)
+            expected.append(key)
+            expected.sort()
+        assert len(keys) == len(expected)
+    assert list(keys) == expected
+    for offset in (0, 3, 17, len(expected) - 1, len(expected)):
+        assert keys.slice(offset, 9) == expected[offset : offset + 9]
+    assert [keys.index(key) for key in expected] == list(range(len(expected)))
+    with pytest.raises(KeyError):
+        keys.remove((99, "missing"))
+
+
+def test_boards_follow_saves_and_deletes(board) -> None:  # type: ignore[no-untyped-def]
+    storage.save_knight({"name": "a", "gold": 10, "progress": {"defeated": ["ogre"], "best_times": {"ogre": 30.5}}})
+    storage.save_knight({"name": "b", "gold": 50})
+    assert board.page("gold") == (2, [{"rank": 1, "name": "b", "score": 50}, {"rank": 2, "name": "a", "score": 10}])
+    storage.save_knight({"name": "c", "gold": 20, "progress": {"defeated": ["ogre", "dragon", "ogre"]}})
+    storage.save_knight({"name": "b", "gold": 5})
+    assert [e["name"] for e in board.page("gold")[1]] == ["c", "a", "b"]
+    assert board.page("defeated", limit=1)[1] == [{"rank": 1, "name": "c", "score": 2}]
+    assert board.page("best_time")[1] == [{"rank": 1, "name": "a", "score": 30.5}]
+    storage.delete_knight("c")
+    assert board.rank("gold", "c") is None and board.rank("gold", "b") == 2
+    with pytest.raises(ValueError):
+        board.page("speed")
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        {"name": "bad", "gold": "lots"},
+        {"name": "bad", "gold": float("nan")},
+        {"name": "bad", "gold": True},
+        {"name": "bad", "progress": {"defeated": "ogre", "best_times": {"ogre": "fast"}}},
+        {"name": "bad", "progress": ["ogre"]},
+    ],
+)
+def test_malformed_values_are_left_unranked(board, profile) -> None:  # type: ignore[no-untyped-def]
+    storage.save_knight({"name": "good", "gold": 1, "progress": {"defeated": ["ogre"], "best_times": {"ogre": 9}}})
+    board.page("gold")
+    storage.save_knight(profile)
+    for by in leaderboard.BOARDS:
+        assert "good" in [e["name"] for e in board.page(by)[1]]
+    # Also when the index is rebuilt from storage with the bad profile in it
+    rebuilt = Leaderboard()
+    assert rebuilt.rank("gold", "good") == 1
+
+
+def test_failing_listener_does_not_break_save(board, caplog) -> None:  # type: ignore[no-untyped-def]
+    def broken(name, profile):  # type: ignore[no-untyped-def]
+        raise RuntimeError("boom")
+
+    storage.add_listener(broken)
+    try:
+        storage.save_knight({"name": "a", "gold": 3})
+        assert storage.load_knight("a")["gold"] == 3
+        assert board.rank("gold", "a") == 1
+        assert "profile listener failed" in caplog.text
+    finally:
+        storage.remove_listener(broken)
+
+
+def test_leaderboard_endpoint(make_app) -> None:  # type: ignore[no-untyped-def]
+    client = make_app().test_client()
+    for name, gold in (("a", 3), ("b", 9), ("c", 6)):
+        storage.save_knight({"name": name, "gold": gold})
+    body = client.get("/api/leaderboard?by=gold&offset=1&limit=1&name=a").get_json()
+    assert body["total"] == 3 and body["entries"] == [{"rank": 2, "name": "c", "score": 6}]
+    assert body["rank"] == 3
+    assert client.get("/api/leaderboard?by=speed").status_code == 400
+
+
+def _outside_write(path, profile) -> None:  # type: ignore[no-untyped-def]
+    time.sleep(0.02)  # let the file mtime move past the previous write
+    SqliteStore(path).save(profile)
+
+
+def test_outside_writes_trigger_a_rebuild(board, monkeypatch, tmp_path) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(leaderboard, "CHECK_INTERVAL", 0.0)
+    storage.save_knight({"name": "a", "gold": 10})
+    assert board.rank("gold", "a") == 1 and board.rebuilds == 1
+    for gold in (11, 12):
+        time.sleep(0.02)
+        storage.save_knight({"name": "a", "gold": gold})
+        assert board.page("gold")[1][0]["score"] == gold
+    assert board.rebuilds == 1  # our own writes are applied incrementally
+
+    _outside_write(tmp_path / "knights.db", {"name": "shard2", "gold": 99})
+    assert board.rank("gold", "shard2") == 1 and board.rebuilds == 2
+
+
+def test_cache_reloads_reach_the_board(board, monkeypatch, tmp_path) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.setattr(leaderboard, "CHECK_INTERVAL", 0.0)
+    cache = ProfileCache(storage.get_store(), stamp_interval=0.0)
+    monkeypatch.setattr(storage, "_store", cache)
+    storage.save_knight({"name": "a", "gold": 10})
+    assert board.rank("gold", "a") == 1
+    cache.flush()
+    assert board.rank("gold", "a") == 1 and board.rebuilds == 1
+
+    _outside_write(tmp_path / "knights.db", {"name": "edited", "gold": 50})
+    assert board.rank("gold", "edited") == 1 and cache.reloads == 1
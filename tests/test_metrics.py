@@ -0,0 +1,71 @@
+"""Histograms, the Prometheus rendering and ``GET /api/metrics``."""
+
+from __future__ import annotations
+
+import pytest
+
+from game.metrics import Histogram, MetricsRegistry, StepMetrics, summary, timed
+
+
+@pytest.mark.parametrize("seconds", [3e-6, 0.000777, 0.0123, 1.5, 42.0])
+def test_quantiles_are_within_bucket_precision(seconds: float) -> None:
+    histogram = Histogram()
+    histogram.observe(seconds)
+    assert seconds <= histogram.quantile(0.5) <= seconds * 1.125 + 1e-6
+
+
+def test_quantiles_over_many_samples() -> None:
+    histogram = Histogram()
+    for us in range(1, 1001):
+        histogram.observe(us / 1e6)
+    stats = summary(histogram)
+    assert stats["count"] == 1000 and stats["max"] == pytest.approx(0.001)
+    assert 0.000500 <= stats["p50"] <= 0.000500 * 1.125
+    assert 0.000990 <= stats["p99"] <= 0.000990 * 1.125
+    assert histogram.cumulative([1, 1024])[-1] == 1000
+
+
+def test_render_prometheus_text() -> None:
+    registry = MetricsRegistry(prefix="t_")
+    registry.counter("requests_total", "Requests", route="/a").inc(2)
+    with timed(registry.histogram("latency_seconds", "Latency", route="/a")):
+        pass
+    registry.gauge("sessions", lambda: 7, "Live sessions")
+    registry.gauge("broken", lambda: 1 / 0, "Never rendered")
+    text = registry.render()
+    assert 't_requests_total{route="/a"} 2' in text
+    assert "# TYPE t_latency_seconds histogram" in text
+    assert 't_latency_seconds_bucket{route="/a",le="+Inf"} 1' in text
+    assert 't_latency_seconds_count{route="/a"} 1' in text
+    assert "t_sessions 7" in text and "t_broken" not in text
+    with pytest.raises(ValueError):
+        registry.counter("latency_seconds")
+
+
+def test_step_metrics_sample_engine_phases() -> None:
+    registry = MetricsRegistry()
+    metrics = StepMetrics(registry, sample_every=4)
+    from game.engine import GameEngine
+    from game.entities import Knight
+
+    engine = GameEngine(player=Knight(name="K"))
+    engine.metrics = metrics
+    for _ in range(40):
+        engine.step()
+    assert metrics.input.count == metrics.update.count == metrics.collision.count == 10
+    with pytest.raises(ValueError):
+        StepMetrics(registry, sample_every=0)
+
+
+def test_metrics_endpoint(make_app) -> None:  # type: ignore[no-untyped-def]
+    app = make_app()
+    client = app.test_client()
+    client.get("/api/state")
+    app.extensions["scheduler"].tick()
+    response = client.get("/api/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE game_http_request_duration_seconds histogram" in text
+    assert 'game_http_requests_total{method="GET",route="/api/state",status="200"}' in text
+    assert "game_sessions " in text
+    assert client.get("/api/scheduler").get_json()["ticks"] == 1
@@ -0,0 +1,75 @@
+"""Parking idle sessions and catching them up with ``fast_forward``."""
+
+from __future__ import annotations
+
+from game.engine import STEP_DT, GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+from game.replay import snapshot_hash
+from game.scheduler import TickScheduler
+from game.sessions import SessionRegistry
+
+
+def _engine(boss: str) -> GameEngine:
+    engine = GameEngine(player=Knight(name="Player", position=(0, 50)))
+    engine.start_boss(create_enemy(boss))
+    return engine
+
+
+def _parked(boss: str, registry: SessionRegistry, scheduler: TickScheduler, ticks: int) -> GameEngine:
+    """Start a fight, park it and let ``ticks`` ticks pass; return a twin stepped all along."""
+
+    session = registry.get_or_create("idle")
+    session.actor.call(lambda eng: eng.start_boss(create_enemy(boss)))
+    session.engine.player.position = (0, 50)
+    twin = _engine(boss)
+    session.last_seen -= 3600.0
+    for _ in range(ticks):
+        scheduler.tick()
+        if twin.active:
+            twin.step(STEP_DT)
+    return twin
+
+
+def test_parked_sessions_are_not_stepped() -> None:
+    registry = SessionRegistry(idle_timeout=None)
+    scheduler = TickScheduler(registry, park_after=60.0)
+    _parked("goblin", registry, scheduler, ticks=50)
+    session = registry.get("idle")
+    assert scheduler.stats()["parked"] == 1 and scheduler.stats()["active"] == 0
+    assert session.actor.parked_at is not None  # type: ignore[union-attr]
+    assert session.engine.frame == 0  # type: ignore[union-attr]
+
+
+def test_catch_up_matches_stepping_all_along() -> None:
+    for boss in ("goblin", "ogre", "dragon"):
+        registry = SessionRegistry(idle_timeout=None)
+        scheduler = TickScheduler(registry, park_after=60.0)
+        twin = _parked(boss, registry, scheduler, ticks=400)
+        session = registry.get("idle")
+        assert session is not None
+        published = session.actor.current()
+        assert published.frame == twin.frame
+        assert session.actor.call(snapshot_hash) == snapshot_hash(twin)
+        # Touched again, the session rejoins the tick set
+        scheduler.tick()
+        assert scheduler.stats()["parked"] == 0
+
+
+def test_catch_up_is_capped_by_max_idle() -> None:
+    registry = SessionRegistry(idle_timeout=None)
+    scheduler = TickScheduler(registry, hz=10.0, park_after=60.0, max_idle=2.0)
+    _parked("goblin", registry, scheduler, ticks=100)
+    session = registry.get("idle")
+    assert session is not None
+    assert session.actor.current().frame == 20
+
+
+def test_evicted_parked_session_settles_before_on_evict() -> None:
+    frames = []
+    registry = SessionRegistry(idle_timeout=None, on_evict=lambda s: frames.append(s.engine.frame))
+    scheduler = TickScheduler(registry, park_after=60.0)
+    twin = _parked("dragon", registry, scheduler, ticks=120)
+    registry.max_sessions = 1
+    registry.get_or_create("newcomer")
+    assert frames == [twin.frame]
@@ -0,0 +1,76 @@
+"""Sampling profiler and the admin-only ``POST /api/admin/profile``."""
+
+from __future__ import annotations
+
+import itertools
+import sys
+import threading
+
+import pytest
+
+from game.profiler import SamplingProfiler, collapsed
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(200))
+
+
+@pytest.fixture
+def busy_thread():  # type: ignore[no-untyped-def]
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="busy", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_profile_sees_busy_thread_and_restores_switch_interval(busy_thread) -> None:  # type: ignore[no-untyped-def]
+    previous = sys.getswitchinterval()
+    stacks = SamplingProfiler(interval=0.001).profile(seconds=0.2)
+    assert sys.getswitchinterval() == previous
+    busy = [stack for stack in stacks if stack.startswith("busy;")]
+    assert busy and any("_spin (tests/test_profiler.py)" in stack for stack in busy)
+    lines = collapsed(stacks).splitlines()
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_tick_bounded_profile_stops_at_target() -> None:
+    counter = itertools.count()
+    stacks = SamplingProfiler(interval=0.001, ticks=lambda: next(counter)).profile(ticks=5)
+    assert sum(stacks.values()) <= 5
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"seconds": 1, "ticks": 1}, {"seconds": 0}, {"seconds": 61}, {"ticks": 1}, {"seconds": 1, "interval": 0}],
+)
+def test_profile_rejects_bad_arguments(kwargs) -> None:  # type: ignore[no-untyped-def]
+    with pytest.raises(ValueError):
+        SamplingProfiler().profile(**kwargs)
+
+
+def test_profile_endpoint_needs_admin_token(make_app, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.delenv("GAME_ADMIN_TOKEN", raising=False)
+    assert make_app().test_client().post("/api/admin/profile?seconds=0.05").status_code == 404
+    client = make_app(admin_token="s3cret").test_client()
+    assert client.post("/api/admin/profile?seconds=0.05").status_code == 403
+    headers = {"X-Admin-Token": "s3cret"}
+    assert client.post("/api/admin/profile?seconds=0.05&interval_ms=0.01", headers=headers).status_code == 400
+    assert client.post("/api/admin/profile", headers=headers).status_code == 400
+    response = client.post("/api/admin/profile?seconds=0.05&idle=1", headers=headers)
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    assert response.get_data(as_text=True).strip()
+
+
+def test_concurrent_profile_is_rejected(make_app) -> None:  # type: ignore[no-untyped-def]
+    app = make_app(admin_token="s3cret")
+    profiler = app.extensions["profiler"]
+    assert profiler._busy.acquire(blocking=False)
+    try:
+        response = app.test_client().post("/api/admin/profile?seconds=0.05", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 409
+    finally:
+        profiler._busy.release()
@@ -0,0 +1,83 @@
+"""Fight recordings (varint input logs, keyframes) and replay of :mod:`game.replay`."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from game import checkpoint
+from game.engine import GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+from game.replay import FightRecorder, FightRecording, read_varint, replay, snapshot_hash, verify, write_varint
+
+
+def _recorded(boss: str, frames: int, density: float, seed: int = 0) -> GameEngine:
+    rng = random.Random(seed)
+    engine = GameEngine(player=Knight(name="Rec", position=(rng.randrange(0, 301, 10), 50)))
+    engine.start_boss(create_enemy(boss))
+    engine.recorder = FightRecorder(engine, keyframe_interval=100)
+    while engine.frame < frames and engine.active:
+        if rng.random() < density:
+            engine.enqueue_action(rng.choice(["move_left", "move_right", "attack", "jump"]))
+        engine.step()
+    return engine
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**21, 2**63])
+def test_varint_round_trip(value: int) -> None:
+    buf = bytearray(b"x")
+    write_varint(buf, value)
+    assert read_varint(bytes(buf), 1) == (value, len(buf))
+
+
+def test_varint_errors() -> None:
+    with pytest.raises(ValueError):
+        write_varint(bytearray(), -1)
+    with pytest.raises(ValueError):
+        read_varint(b"\x80", 0)
+
+
+def test_inputs_cost_two_bytes() -> None:
+    engine = _recorded("ogre", 300, density=0.2)
+    recording = engine.recorder.recording(engine)  # type: ignore[union-attr]
+    inputs = list(recording.inputs())
+    assert inputs and len(recording.log) == 2 * len(inputs)
+    assert [k.frame for k in recording.keyframes] == [100, 200, 300]
+
+
+@pytest.mark.parametrize("boss", ["goblin", "ogre", "dragon"])
+@pytest.mark.parametrize("density", [0.0, 0.02, 0.5])
+def test_replay_matches_the_fight(boss: str, density: float) -> None:
+    engine = _recorded(boss, 1500, density, seed=len(boss))
+    recording = FightRecording.from_bytes(engine.recorder.recording(engine).to_bytes())  # type: ignore[union-attr]
+    assert verify(recording)
+    assert snapshot_hash(replay(recording)) == snapshot_hash(engine)
+    rng = random.Random(boss)
+    for frame in [0, recording.final_frame] + [rng.randrange(recording.final_frame) for _ in range(4)]:
+        assert snapshot_hash(replay(recording, frame)) == snapshot_hash(replay(recording, frame, seek=False))
+
+
+def test_replay_rejects_frames_outside_the_recording() -> None:
+    engine = _recorded("goblin", 50, density=0.2)
+    recording = engine.recorder.recording(engine)  # type: ignore[union-attr]
+    with pytest.raises(ValueError):
+        replay(recording, 51)
+    with pytest.raises(ValueError):
+        FightRecording.from_bytes(b"NOPE")
+
+
+def test_recorder_survives_a_checkpoint() -> None:
+    engine = _recorded("dragon", 250, density=0.3, seed=5)
+    resumed = checkpoint.loads(checkpoint.dumps(engine))
+    assert resumed.recorder is not None
+    for target in (engine, resumed):
+        rng = random.Random(9)
+        for _ in range(200):
+            if rng.random() < 0.3:
+                target.enqueue_action("attack")
+            target.step()
+    recording = resumed.recorder.recording(resumed)
+    assert recording.to_bytes() == engine.recorder.recording(engine).to_bytes()  # type: ignore[union-attr]
+    assert verify(recording)
@@ -0,0 +1,117 @@
+"""Fixed-rate stepping of :class:`game.scheduler.TickScheduler`."""
+
+from __future__ import annotations
+
+import pytest
+
+from game.engine import STEP_DT
+from game.level import create_enemy
+from game.scheduler import TickScheduler
+from game.sessions import SessionRegistry
+
+
+def _fight(registry: SessionRegistry, token: str) -> None:
+    registry.get_or_create(token).actor.call(lambda eng: eng.start_boss(create_enemy("goblin")))
+
+
+@pytest.mark.parametrize("hz", [10.0, 60.0])
+def test_steps_advance_step_dt_whatever_the_rate(hz: float) -> None:
+    registry = SessionRegistry()
+    scheduler = TickScheduler(registry, hz=hz)
+    _fight(registry, "a")
+    stamina = []
+    for _ in range(3):
+        registry.get("a").engine.player.stamina = 50.0  # type: ignore[union-attr]
+        scheduler.tick()
+        stamina.append(registry.get("a").engine.player.stamina)  # type: ignore[union-attr]
+    assert stamina == [pytest.approx(50.0 + 10.0 * STEP_DT)] * 3
+    assert scheduler.period == pytest.approx(1.0 / hz)
+
+
+def test_tick_steps_only_active_engines_and_publishes() -> None:
+    registry = SessionRegistry()
+    scheduler = TickScheduler(registry, hz=60.0)
+    _fight(registry, "fighting")
+    registry.get_or_create("lobby")
+    assert scheduler.tick() == 1
+    assert registry.get("fighting").actor.published.frame == 1  # type: ignore[union-attr]
+    assert registry.get("lobby").engine.frame == 0  # type: ignore[union-attr]
+    assert scheduler.stats()["active"] == 1
+
+
+def test_hooks_and_wait_tick() -> None:
+    scheduler = TickScheduler(SessionRegistry(), hz=60.0)
+    seen = []
+    scheduler.add_hook(seen.append)
+    scheduler.tick()
+    scheduler.tick()
+    assert seen == [1, 2]
+    assert scheduler.wait_tick(1, timeout=0) == 2
+    assert scheduler.wait_tick(5, timeout=0.01) == 2
+
+
+def test_background_thread_ticks_and_runs_messages() -> None:
+    registry = SessionRegistry()
+    scheduler = TickScheduler(registry, hz=200.0)
+    scheduler.start()
+    try:
+        _fight(registry, "a")
+        ticks = scheduler.wait_tick(0, timeout=2.0)
+        scheduler.wait_tick(ticks + 2, timeout=2.0)
+        assert registry.get("a").actor.published.frame > 0  # type: ignore[union-attr]
+    finally:
+        scheduler.stop()
+    assert not scheduler.running
+
+
+def test_rate_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        TickScheduler(SessionRegistry(), hz=0)
+
+
+def test_failing_hook_does_not_stop_the_thread() -> None:
+    registry = SessionRegistry()
+    scheduler = TickScheduler(registry, hz=200.0)
+    seen = []
+
+    def broken(tick: int) -> None:
+        raise RuntimeError("boom")
+
+    scheduler.add_hook(broken)
+    scheduler.add_hook(seen.append)
+    scheduler.start()
+    try:
+        _fight(registry, "a")
+        scheduler.wait_tick(5, timeout=2.0)
+        assert scheduler.running and len(seen) >= 5
+        assert registry.get("a").actor.published.frame > 0  # type: ignore[union-attr]
+    finally:
+        scheduler.stop()
+    assert scheduler.stats()["failures"] >= 5
+
+
+def test_failing_engine_is_set_aside_until_it_gets_mail() -> None:
+    registry = SessionRegistry()
+    scheduler = TickScheduler(registry, hz=200.0)
+    scheduler.start()
+    try:
+        _fight(registry, "bad")
+        _fight(registry, "good")
+
+        def broken_step(dt: float) -> None:
+            raise RuntimeError("boom")
+
+        bad = registry.get("bad").actor  # type: ignore[union-attr]
+        bad.call(lambda eng: setattr(eng, "step", broken_step))
+        ticks = scheduler.wait_tick(scheduler.ticks + 3, timeout=2.0)
+        frame = registry.get("good").actor.published.frame  # type: ignore[union-attr]
+        scheduler.wait_tick(ticks + 3, timeout=2.0)
+        assert scheduler.running and scheduler.stats()["failures"] == 1
+        assert registry.get("good").actor.published.frame > frame  # type: ignore[union-attr]
+
+        bad.call(lambda eng: eng.__dict__.pop("step"))
+        frame = bad.call(lambda eng: eng.frame)
+        scheduler.wait_tick(scheduler.ticks + 3, timeout=2.0)
+        assert bad.call(lambda eng: eng.frame) > frame
+    finally:
+        scheduler.stop()
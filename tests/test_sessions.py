@@ -0,0 +1,104 @@
+"""LRU and idle eviction of :class:`game.sessions.SessionRegistry`."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from game.engine import GameEngine
+from game.entities import Knight
+from game.sessions import SessionRegistry
+
+
+def test_sessions_have_independent_engines() -> None:
+    registry = SessionRegistry()
+    a, b = registry.get_or_create("a"), registry.get_or_create("b")
+    assert a.engine is not b.engine
+    assert registry.get_or_create("a") is a
+    assert len(registry) == 2 and "b" in registry
+
+
+def test_cap_evicts_least_recently_used() -> None:
+    evicted = []
+    registry = SessionRegistry(max_sessions=2, on_evict=lambda s: evicted.append(s.token))
+    registry.get_or_create("a")
+    registry.get_or_create("b")
+    registry.get("a")  # "b" is now the least recently used
+    registry.get_or_create("c")
+    assert evicted == ["b"]
+    assert [s.token for s in registry.sessions()] == ["a", "c"]
+    assert registry.stats()["evicted"] == 1
+
+
+def test_idle_sessions_are_evicted_with_their_snapshot() -> None:
+    registry = SessionRegistry(idle_timeout=10.0, snapshot_on_evict=True)
+    old = registry.get_or_create("old")
+    fresh = registry.get_or_create("fresh")
+    old.last_seen = fresh.last_seen - 60.0
+    assert registry.evict_idle(now=fresh.last_seen + 1.0) == 1
+    assert "old" not in registry and "fresh" in registry
+    assert registry.evicted_snapshot("old")["player"]["name"] == "Player"  # type: ignore[index]
+
+
+def test_idle_eviction_can_be_disabled() -> None:
+    registry = SessionRegistry(idle_timeout=None)
+    registry.get_or_create("a").last_seen = -1e9
+    assert registry.evict_idle() == 0
+
+
+def test_restore_callback_seeds_new_sessions() -> None:
+    saved = GameEngine(player=Knight(name="Saved"), frame=42)
+    registry = SessionRegistry(restore=lambda token: saved if token == "back" else None)
+    assert registry.get_or_create("back").engine is saved
+    assert registry.get_or_create("new").engine.frame == 0
+    assert registry.stats()["restored"] == 1
+
+
+def _other_thread_gets_through(registry: SessionRegistry) -> bool:
+    done = threading.Event()
+    threading.Thread(target=lambda: (registry.get_or_create("other"), done.set()), daemon=True).start()
+    return done.wait(timeout=2.0)
+
+
+def test_restore_and_on_evict_run_without_the_registry_lock() -> None:
+    seen = []
+    registry = SessionRegistry(max_sessions=2)
+    registry.on_evict = lambda session: seen.append(("evict", _other_thread_gets_through(registry)))
+    registry.restore = lambda token: seen.append(("restore", _other_thread_gets_through(registry))) if token == "slow" else None
+    registry.get_or_create("a")
+    registry.get_or_create("slow")
+    assert seen[0] == ("restore", True) and ("evict", True) in seen
+
+
+def test_evicted_token_is_restored_after_its_on_evict() -> None:
+    saved = {}
+    release = threading.Event()
+
+    def on_evict(session):  # type: ignore[no-untyped-def]
+        release.wait(timeout=2.0)
+        saved[session.token] = GameEngine(player=Knight(name="Saved"), frame=7)
+
+    registry = SessionRegistry(idle_timeout=10.0, on_evict=on_evict, restore=lambda token: saved.get(token))
+    registry.get_or_create("a").last_seen -= 60.0
+    evicting = threading.Thread(target=registry.evict_idle)
+    evicting.start()
+    while "a" in registry:
+        time.sleep(0.001)
+    threading.Timer(0.05, release.set).start()
+    assert registry.get_or_create("a").engine.frame == 7
+    evicting.join()
+
+
+def test_remove_skips_on_evict() -> None:
+    evicted = []
+    registry = SessionRegistry(on_evict=evicted.append)
+    registry.get_or_create("a")
+    assert registry.remove("a") and not registry.remove("a")
+    assert evicted == []
+
+
+def test_max_sessions_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        SessionRegistry(max_sessions=0)
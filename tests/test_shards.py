@@ -0,0 +1,87 @@
+"""Session affinity of the sharded dispatcher (:mod:`game.shards`)."""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from werkzeug.serving import make_server
+from werkzeug.test import Client
+
+from game.shards import Dispatcher, Worker, merge_metrics, shard_for, worker_options
+
+
+def test_shard_for_is_stable_and_in_range() -> None:
+    tokens = [f"t{i}" for i in range(200)]
+    owners = [shard_for(t, 4) for t in tokens]
+    assert set(owners) == {0, 1, 2, 3}
+    assert owners == [shard_for(t, 4) for t in tokens]
+    assert shard_for("abc", 4) == 891568578 % 4  # CRC-32 of "abc": the same in every process
+
+
+def test_merge_metrics_labels_every_sample() -> None:
+    text = "# HELP ticks Ticks run\n# TYPE ticks counter\nticks 3\n# HELP lat Latency\n# TYPE lat histogram\nlat_bucket{le=\"1\"} 2\n"
+    merged = merge_metrics([(0, text), (1, text.replace("3", "5"))])
+    assert merged.count("# TYPE ticks counter") == 1
+    assert 'ticks{shard="0"} 3' in merged and 'ticks{shard="1"} 5' in merged
+    assert 'lat_bucket{shard="1",le="1"} 2' in merged
+
+
+@pytest.fixture
+def shards(tmp_path: Path):  # type: ignore[no-untyped-def]
+    """Two in-process shard servers on Unix sockets that echo what they receive."""
+
+    servers, workers = [], []
+    for index in range(2):
+
+        def app(environ, start_response, index=index):  # type: ignore[no-untyped-def]
+            body = json.dumps({"shard": index, "token": environ.get("HTTP_X_SESSION_ID"), "path": environ["PATH_INFO"]})
+            start_response("200 OK", [("Content-Type", "application/json")])
+            return [body.encode("utf-8")]
+
+        path = str(tmp_path / f"s{index}.sock")
+        server = make_server(f"unix://{path}", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        workers.append(Worker(index, path, {}))
+    yield workers
+    for server in servers:
+        server.shutdown()
+
+
+def test_requests_go_to_the_owning_shard(shards) -> None:  # type: ignore[no-untyped-def]
+    dispatcher = Dispatcher(shards)
+    client = Client(dispatcher)
+    for token in ("alpha", "beta", "gamma", "delta"):
+        body = json.loads(client.get("/api/state", headers={"X-Session-Id": token}).get_data())
+        assert body == {"shard": shard_for(token, 2), "token": token, "path": "/api/state"}
+    assert sum(dispatcher.forwarded) == 4
+
+
+def test_new_clients_get_a_cookie_that_sticks(shards) -> None:  # type: ignore[no-untyped-def]
+    client = Client(Dispatcher(shards))
+    first = client.get("/api/state")
+    token = json.loads(first.get_data())["token"]
+    assert f"session_id={token}" in first.headers["Set-Cookie"]
+    again = json.loads(client.get("/api/state").get_data())
+    assert again["token"] == token and again["shard"] == shard_for(token, 2)
+
+
+def test_dead_shard_answers_503(tmp_path: Path) -> None:
+    dispatcher = Dispatcher([Worker(0, str(tmp_path / "missing.sock"), {})])
+    response = Client(dispatcher).get("/api/state", headers={"X-Session-Id": "x"})
+    assert response.status_code == 503 and dispatcher.errors == [1]
+
+
+def test_dispatcher_needs_workers() -> None:
+    with pytest.raises(ValueError):
+        Dispatcher([])
+
+
+def test_several_workers_write_profiles_straight_through() -> None:
+    assert worker_options(1) == {}
+    assert worker_options(4) == {"profile_flush_interval": None}
+    assert worker_options(4, {"admin_token": "x"}) == {"profile_flush_interval": None, "admin_token": "x"}
+    assert worker_options(4, {"profile_flush_interval": 2.0})["profile_flush_interval"] == 2.0
@@ -0,0 +1,79 @@
+"""Fingerprinted, precompressed static assets and the ``/assets/`` route."""
+
+from __future__ import annotations
+
+import gzip
+import os
+
+import pytest
+from flask import Flask, render_template_string
+
+from game.static_assets import CACHE_CONTROL, MANIFEST, build_assets, fingerprint, init_app, load_manifest
+
+SCRIPT = b"function tick() { return 1; }\n" * 50
+
+
+@pytest.fixture
+def src(tmp_path):  # type: ignore[no-untyped-def]
+    src = tmp_path / "static"
+    (src / "js").mkdir(parents=True)
+    (src / "js" / "game.js").write_bytes(SCRIPT)
+    (src / "tiny.txt").write_bytes(b"x")
+    (src / ".hidden").write_bytes(b"secret")
+    return src
+
+
+def test_build_fingerprints_and_compresses(src, tmp_path) -> None:  # type: ignore[no-untyped-def]
+    dest = tmp_path / "dist"
+    manifest = build_assets(src, dest)
+    assert set(manifest) == {"js/game.js", "tiny.txt"}
+    hashed = manifest["js/game.js"]
+    assert hashed == fingerprint("js/game.js", SCRIPT) and hashed.startswith("js/game.") and hashed.endswith(".js")
+    assert (dest / hashed).read_bytes() == SCRIPT
+    assert gzip.decompress((dest / (hashed + ".gz")).read_bytes()) == SCRIPT
+    assert not (dest / (manifest["tiny.txt"] + ".gz")).exists()  # would not be smaller
+    assert fingerprint("js/game.js", SCRIPT + b" ") != hashed
+
+
+def test_manifest_rebuilds_only_when_sources_change(src, tmp_path) -> None:  # type: ignore[no-untyped-def]
+    dest = tmp_path / "dist"
+    first = load_manifest(src, dest)
+    assert load_manifest(src, dest, build=False) == first
+    built = (dest / MANIFEST).stat().st_mtime_ns
+    (src / "js" / "game.js").write_bytes(SCRIPT + b"// v2\n")
+    os.utime(src / "js" / "game.js", ns=(built + 10**9, built + 10**9))
+    second = load_manifest(src, dest)
+    assert second["js/game.js"] != first["js/game.js"] and second["tiny.txt"] == first["tiny.txt"]
+    assert load_manifest(src, tmp_path / "missing", build=False) == {}
+
+
+@pytest.fixture
+def client(src, tmp_path):  # type: ignore[no-untyped-def]
+    app = Flask(__name__, static_folder=str(src))
+    manifest = init_app(app, src, tmp_path / "dist")
+    app.add_url_rule("/page", "page", lambda: render_template_string("{{ asset_url('js/game.js') }} {{ asset_url('x.css') }}"))
+    client = app.test_client()
+    client.manifest = manifest  # type: ignore[attr-defined]
+    return client
+
+
+def test_asset_url_template_global(client) -> None:  # type: ignore[no-untyped-def]
+    page = client.get("/page").get_data(as_text=True)
+    assert page == f"/assets/{client.manifest['js/game.js']} /static/x.css"
+
+
+@pytest.mark.parametrize("accept, encoding", [("gzip, deflate", "gzip"), ("identity", None)])
+def test_route_serves_best_variant(client, accept, encoding) -> None:  # type: ignore[no-untyped-def]
+    response = client.get(f"/assets/{client.manifest['js/game.js']}", headers={"Accept-Encoding": accept})
+    assert response.status_code == 200 and response.mimetype in {"text/javascript", "application/javascript"}
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.headers["Cache-Control"] == CACHE_CONTROL
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = response.get_data()
+    assert (gzip.decompress(body) if encoding else body) == SCRIPT
+
+
+def test_route_hides_manifest_variants_and_outside_files(client) -> None:  # type: ignore[no-untyped-def]
+    hashed = client.manifest["js/game.js"]
+    for path in (MANIFEST, hashed + ".gz", "../static/tiny.txt", "js/missing.js"):
+        assert client.get(f"/assets/{path}").status_code == 404
@@ -0,0 +1,96 @@
+"""Profile stores of :mod:`game.storage` and the JSON to SQLite migration."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from game import storage
+from game.storage import JsonStore, SqliteStore, migrate_json_to_sqlite
+
+KNIGHT = {"name": "Galahad", "health": 90, "stamina": 80.0, "position": [10, 50], "gold": 5}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> storage.ProfileStore:
+    if request.param == "json":
+        return JsonStore(tmp_path / "knights.json")
+    return SqliteStore(tmp_path / "knights.db")
+
+
+def test_save_load_delete(store: storage.ProfileStore) -> None:
+    assert store.load("Galahad") is None
+    store.save(KNIGHT)
+    assert store.load("Galahad") == KNIGHT
+    store.save({**KNIGHT, "gold": 6})
+    assert store.load("Galahad")["gold"] == 6  # type: ignore[index]
+    assert store.delete("Galahad") and not store.delete("Galahad")
+    assert store.list_all() == {}
+
+
+def test_bulk_operations(store: storage.ProfileStore) -> None:
+    store.write_batch({f"K{i}": {**KNIGHT, "name": f"K{i}"} for i in range(5)})
+    store.write_batch({"K5": {**KNIGHT, "name": "K5"}}, deletes=["K0", "missing"])
+    assert sorted(store.list_all()) == ["K1", "K2", "K3", "K4", "K5"]
+    assert sorted(store.load_many(["K1", "K0", "K5"])) == ["K1", "K5"]
+    assert sorted(p["name"] for p in store.iter_all()) == ["K1", "K2", "K3", "K4", "K5"]
+
+
+def test_stamp_moves_on_writes(store: storage.ProfileStore) -> None:
+    store.save(KNIGHT)
+    before = store.stamp()
+    store.save({**KNIGHT, "name": "Other"})
+    assert store.stamp() != before
+
+
+def test_migrate_json_to_sqlite(tmp_path: Path) -> None:
+    source = JsonStore(tmp_path / "knights.json")
+    source.write_batch({"A": {**KNIGHT, "name": "A"}, "B": {**KNIGHT, "name": "B"}})
+    target = SqliteStore(tmp_path / "knights.db")
+    target.save({**KNIGHT, "name": "A", "gold": 999})
+    assert migrate_json_to_sqlite(tmp_path / "knights.json", tmp_path / "knights.db") == 2
+    assert target.list_all() == source.list_all()  # existing rows are overwritten
+    assert (tmp_path / "knights.json").exists()
+
+
+def test_default_store_migrates_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    JsonStore(tmp_path / "knights.json").save(KNIGHT)
+    monkeypatch.setattr(storage, "KNIGHTS_PATH", tmp_path / "knights.json")
+    monkeypatch.setattr(storage, "KNIGHTS_DB_PATH", tmp_path / "knights.db")
+    monkeypatch.setattr(storage, "_store", None)
+    monkeypatch.delenv("KNIGHTS_STORAGE", raising=False)
+    store = storage.get_store()
+    assert isinstance(store, SqliteStore) and store.load("Galahad") == KNIGHT
+    # A database that already exists is not migrated again
+    JsonStore(tmp_path / "knights.json").save({**KNIGHT, "name": "Later"})
+    monkeypatch.setattr(storage, "_store", None)
+    assert storage.get_store().load("Later") is None
+
+
+def test_unknown_backend_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(storage, "_store", None)
+    monkeypatch.setenv("KNIGHTS_STORAGE", "floppy")
+    with pytest.raises(ValueError):
+        storage.get_store()
+
+
+def test_listeners_hear_writes_and_never_fail_them(profiles: storage.ProfileStore) -> None:
+    heard = []
+
+    def broken(name: str, profile: object) -> None:
+        raise RuntimeError("listener bug")
+
+    def listener(name: str, profile: object) -> None:
+        heard.append((name, profile is None))
+
+    storage.add_listener(broken)
+    storage.add_listener(listener)
+    try:
+        storage.save_knight(KNIGHT)
+        storage.write_knights({"B": {**KNIGHT, "name": "B"}}, deletes=["Galahad"])
+    finally:
+        storage.remove_listener(broken)
+        storage.remove_listener(listener)
+    assert heard == [("Galahad", False), ("Galahad", True), ("B", False)]
+    assert profiles.load("B") is not None
@@ -0,0 +1,37 @@
+"""Server-Sent Events state stream of ``GET /api/stream``."""
+
+from __future__ import annotations
+
+import json
+
+
+def _text(chunk) -> str:  # type: ignore[no-untyped-def]
+    return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+
+def test_stream_pushes_the_snapshot_and_ends_with_the_fight(make_app) -> None:  # type: ignore[no-untyped-def]
+    headers = {"X-Session-Id": "streamer"}
+    app = make_app()
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Streamer"})
+    client.post("/api/start_boss/goblin", json={"name": "Streamer"}, headers=headers)
+    scheduler = app.extensions["scheduler"]
+    scheduler.tick()
+    actor = app.extensions["sessions"].get_or_create("streamer").actor
+
+    def finish(engine) -> None:  # type: ignore[no-untyped-def]
+        engine.enemy.health = 0
+        engine.step(scheduler.dt)
+
+    actor.call(finish)
+    response = client.get("/api/stream", headers=headers, buffered=False)
+    assert response.mimetype == "text/event-stream" and response.headers["Cache-Control"] == "no-cache"
+    try:
+        chunks = [_text(chunk) for chunk in response.response]
+    finally:
+        response.close()
+    snapshots = [chunk for chunk in chunks if chunk.startswith("id: ")]
+    assert len(snapshots) == 1 and snapshots[0].startswith("id: 2\n")
+    state = json.loads(snapshots[0].split("data: ", 1)[1])
+    assert state["enemy"]["health"] == 0 and state == client.get("/api/state", headers=headers).get_json()
+    assert chunks[-1] == "event: end\ndata: {}\n\n"
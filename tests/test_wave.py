@@ -0,0 +1,100 @@
+"""Boss-rush (wave) mode: preloading, stage transitions and the run result."""
+
+from __future__ import annotations
+
+import pytest
+
+from game import storage
+from game.engine import GameEngine
+from game.entities import Knight
+from game.level import create_enemy
+
+ORDER = ["goblin", "ogre", "dragon"]
+
+
+class CountingFactory:
+    def __init__(self) -> None:
+        self.built: list = []
+
+    def __call__(self, boss_id: str):  # type: ignore[no-untyped-def]
+        self.built.append(boss_id)
+        return create_enemy(boss_id)
+
+
+def _kill(engine: GameEngine) -> None:
+    assert engine.enemy is not None
+    engine.enemy.health = 0
+
+
+def test_stages_preload_and_swap_without_building_in_the_transition() -> None:
+    create, ended = CountingFactory(), []
+    engine = GameEngine(player=Knight(name="K"))
+    wave = engine.start_wave(ORDER, create, on_end=ended.append)
+    assert create.built == ["goblin"]
+    engine.step()
+    assert create.built == ["goblin", "ogre"] and wave.next_enemy is not None
+    preloaded = wave.next_enemy
+    engine.step()
+    _kill(engine)
+    engine.step()
+    assert engine.enemy is preloaded and wave.stage == 1 and wave.stage_frames == [3]
+    assert create.built == ["goblin", "ogre"]
+    assert any(e["type"] == "stage" and e["amount"] == 2 for e in engine.events.since(0)[0])
+    assert engine.snapshot()["wave"]["boss"] == "ogre"
+
+    engine.step()
+    _kill(engine)
+    engine.step()
+    _kill(engine)
+    engine.step()
+    assert wave.ended and wave.cleared and ended == [engine]
+    assert len(wave.stage_frames) == 3
+    engine.step()
+    assert ended == [engine]  # on_end runs once
+
+
+def test_boss_killed_on_first_step_is_built_on_demand() -> None:
+    create = CountingFactory()
+    engine = GameEngine(player=Knight(name="K"))
+    wave = engine.start_wave(ORDER, create)
+    _kill(engine)
+    engine.step()
+    assert wave.stage == 1 and create.built == ["goblin", "ogre"]
+
+
+def test_fallen_knight_ends_the_run() -> None:
+    ended = []
+    engine = GameEngine(player=Knight(name="K"))
+    wave = engine.start_wave(ORDER, create_enemy, on_end=ended.append)
+    engine.player.health = 0
+    engine.step()
+    assert wave.ended and not wave.cleared and ended == [engine]
+    with pytest.raises(ValueError):
+        engine.start_wave([], create_enemy)
+
+
+def test_rush_endpoint_records_the_run(make_app) -> None:  # type: ignore[no-untyped-def]
+    headers = {"X-Session-Id": "rusher"}
+    app = make_app()
+    client = app.test_client()
+    client.post("/api/knight", json={"name": "Rusher"})
+    assert client.post("/api/start_rush", json={}).status_code == 400
+    assert client.post("/api/start_rush", json={"name": "Nobody"}).status_code == 404
+    body = client.post("/api/start_rush", json={"name": "Rusher"}, headers=headers).get_json()
+    assert body["order"] == ORDER
+    actor = app.extensions["sessions"].get_or_create("rusher").actor
+    scheduler = app.extensions["scheduler"]
+
+    def finish_stage(engine: GameEngine) -> None:
+        # The killing blow lands inside a step, which also runs the transition
+        _kill(engine)
+        engine.step(scheduler.dt)
+
+    for _ in ORDER:
+        scheduler.tick()
+        actor.call(finish_stage)
+    rush = storage.load_knight("Rusher")["progress"]["rush"]
+    assert rush["runs"] == 1 and rush["last"]["cleared"]
+    assert [stage["boss"] for stage in rush["last"]["stages"]] == ORDER
+    assert rush["best"] == rush["last"]["total"] > 0
+    assert client.get("/api/state", headers=headers).get_json()["wave"]["ended"]
@@ -0,0 +1,53 @@
+"""Multi-entity worlds: sword hits, hostile attacks and pruning in :class:`GameEngine`."""
+
+from __future__ import annotations
+
+from game.engine import GameEngine, aabb_overlap
+from game.entities import Goblin, Knight, Projectile
+
+
+def _events(engine: GameEngine):  # type: ignore[no-untyped-def]
+    return engine.events.since(0)[0]
+
+
+def test_aabb_overlap_is_strict() -> None:
+    assert aabb_overlap(0, 0, 10, 10, 5, 5, 10, 10)
+    assert not aabb_overlap(0, 0, 10, 10, 10, 0, 10, 10)  # touching edges do not overlap
+
+
+def test_sword_hits_every_hostile_in_reach() -> None:
+    enemy = Goblin(name="Boss", health=50, position=(130, 55))
+    near = Goblin(name="Near", health=50, position=(135, 50))
+    far = Goblin(name="Far", health=50, position=(300, 50))
+    engine = GameEngine(player=Knight(name="K", position=(100, 50)), enemy=enemy, entities=[near, far])
+    engine._apply_action("attack")
+    assert (enemy.health, near.health, far.health) == (40, 40, 50)
+    assert [(e["type"], e.get("target")) for e in _events(engine)] == [("hit", "Boss"), ("hit", "Near")]
+    assert engine.hostiles() == [enemy, near, far]
+
+
+def test_single_enemy_hits_carry_no_target() -> None:
+    engine = GameEngine(player=Knight(name="K", position=(100, 50)), enemy=Goblin(name="G", health=50, position=(130, 55)))
+    engine._apply_action("attack")
+    assert "target" not in _events(engine)[0]
+
+
+def test_projectiles_hit_the_knight_and_expire() -> None:
+    bolt = Projectile(name="Fire", health=1, position=(160, 50), attack_damage=7, velocity=-25, ttl=0.1)
+    knight = Knight(name="K", position=(100, 50))
+    engine = GameEngine(player=knight, entities=[bolt])
+    hits = []
+    for _ in range(10):
+        engine.step(0.016)
+        hits.extend(e for e in _events(engine) if e not in hits)
+    assert knight.health < 100
+    assert all(e["type"] == "player_hit" and e["source"] == "Fire" for e in hits)
+    assert engine.entities == []  # expired and pruned
+
+
+def test_dead_entities_are_pruned_after_the_step() -> None:
+    minion = Goblin(name="Minion", health=10, position=(135, 50))
+    engine = GameEngine(player=Knight(name="K", position=(100, 50)), entities=[minion])
+    engine.enqueue_action("attack")
+    engine.step(0.016)
+    assert minion.health == 0 and engine.entities == []
@@ -8,6 +8,15 @@ const profileStatus = document.getElementById('profile-status');
 
 let activeName = null;
 let polling = null;
+let stream = null;
+let eventCursor = 0;
+let eventsPending = false;
+let lastState = null;
+const damageNumbers = []; // {text, x, y, color, ttl}
+let lastFrame = 0;
+let lastStamp = 0; // client_frame of the last buffered input
+const pendingInputs = []; // {action, client_frame}, sent in batches
+let inputsInFlight = false;
 
 function drawState(state) {
   ctx.clearRect(0, 0, canvas.width, canvas.height);
@@ -34,6 +43,45 @@ function drawState(state) {
     ctx.fillStyle = '#6f6';
     ctx.fillRect(10, 24, Math.max(0, e.health), 6);
   }
+
+  // floating damage numbers
+  ctx.font = '12px monospace';
+  for (let i = damageNumbers.length - 1; i >= 0; i -= 1) {
+    const d = damageNumbers[i];
+    ctx.fillStyle = d.color;
+    ctx.fillText(d.text, d.x, d.y - (30 - d.ttl));
+    d.ttl -= 1;
+    if (d.ttl <= 0) damageNumbers.splice(i, 1);
+  }
+}
+
+// Animate a page of events ({events, next}) against the latest state
+function showEvents(res, state) {
+  eventCursor = res.next;
+  res.events.forEach((ev) => {
+    if (ev.type === 'gap') return; // missed events: nothing to animate
+    if (ev.type === 'stage') {
+      damageNumbers.push({ text: `Etapa ${ev.amount}: ${ev.target}`, x: 20, y: 40, color: '#6cf', ttl: 60 });
+      return;
+    }
+    const target = ev.type === 'hit' ? state.enemy : state.player;
+    if (!target) return;
+    const color = ev.type === 'hit' ? '#ff6' : '#f55';
+    damageNumbers.push({ text: `-${ev.amount}`, x: target.position[0] - 6, y: 110, color, ttl: 30 });
+  });
+}
+
+// Polling fallback: fetch only the events after our cursor, one request at a time
+async function fetchEvents(state) {
+  if (eventsPending) return;
+  eventsPending = true;
+  try {
+    showEvents(await api(`/api/events?since=${eventCursor}`), state);
+  } catch (e) {
+    console.warn('events error', e);
+  } finally {
+    eventsPending = false;
+  }
 }
 
 async function api(path, method = 'GET', body) {
@@ -46,23 +94,57 @@ async function api(path, method = 'GET', body) {
   return res.json().catch(() => ({}));
 }
 
+function stopUpdates() {
+  if (polling) clearInterval(polling);
+  polling = null;
+  if (stream) stream.close();
+  stream = null;
+}
+
+function render(state) {
+  lastFrame = state.frame;
+  lastState = state;
+  drawState(state);
+  const stage = state.wave ? ` | Etapa: ${state.wave.stage}/${state.wave.stages}` : '';
+  hud.textContent = `Frame: ${state.frame} | Player HP: ${state.player.health} | Enemy HP: ${state.enemy ? state.enemy.health : '-'}${stage} `;
+  if (state.wave && state.wave.ended && state.player.alive) {
+    resultText.textContent = `¡Boss rush completado en ${state.wave.stages} etapas!`;
+    stopUpdates();
+  } else if (state.enemy && !state.enemy.alive && !state.wave) {
+    resultText.textContent = `¡Victoria! Derrotaste a ${state.enemy.name}.`;
+    stopUpdates();
+  } else if (!state.player.alive) {
+    resultText.textContent = 'Derrota. Vuelve a intentarlo.';
+    stopUpdates();
+  }
+}
+
 async function poll() {
   try {
     const state = await api('/api/state');
-    drawState(state);
-    hud.textContent = `Frame: ${state.frame} | Player HP: ${state.player.health} | Enemy HP: ${state.enemy ? state.enemy.health : '-'} `;
-    if (state.enemy && !state.enemy.alive) {
-      resultText.textContent = `¡Victoria! Derrotaste a ${state.enemy.name}.`;
-      clearInterval(polling);
-    } else if (!state.player.alive) {
-      resultText.textContent = 'Derrota. Vuelve a intentarlo.';
-      clearInterval(polling);
-    }
+    render(state);
+    fetchEvents(state);
   } catch (e) {
     console.warn('poll error', e);
   }
 }
 
+// Server pushes a snapshot per new frame; fall back to polling without SSE
+function startUpdates() {
+  stopUpdates();
+  if (!window.EventSource) {
+    polling = setInterval(poll, 200);
+    return;
+  }
+  stream = new EventSource('/api/stream');
+  stream.onmessage = (ev) => render(JSON.parse(ev.data));
+  // Events arrive in the stream just before their snapshot
+  stream.addEventListener('events', (ev) => {
+    if (lastState) showEvents(JSON.parse(ev.data), lastState);
+  });
+  stream.addEventListener('end', stopUpdates);
+}
+
 document.getElementById('create-form').addEventListener('submit', async (e) => {
   e.preventDefault();
   const name = document.getElementById('name').value.trim();
@@ -81,19 +163,43 @@ document.getElementById('start').addEventListener('click', async () => {
     return;
   }
   const boss = document.getElementById('boss').value;
-  await api(`/api/start_boss/${boss}`, 'POST', { name: activeName });
+  if (boss === 'rush') {
+    await api('/api/start_rush', 'POST', { name: activeName });
+  } else {
+    await api(`/api/start_boss/${boss}`, 'POST', { name: activeName });
+  }
   resultText.textContent = '';
-  if (polling) clearInterval(polling);
-  polling = setInterval(poll, 200);
+  damageNumbers.length = 0;
+  startUpdates();
 });
 
+// Send buffered inputs in one request every INPUT_FLUSH_MS instead of one per click
+const INPUT_FLUSH_MS = 100;
+
+async function flushInputs() {
+  if (inputsInFlight || !pendingInputs.length) return;
+  inputsInFlight = true;
+  const batch = pendingInputs.splice(0, 64);
+  try {
+    const res = await api('/api/actions', 'POST', { inputs: batch });
+    lastFrame = Math.max(lastFrame, res.frame);
+  } catch (e) {
+    console.warn('input error', e);
+  } finally {
+    inputsInFlight = false;
+  }
+}
+
+setInterval(flushInputs, INPUT_FLUSH_MS);
+
 document.querySelectorAll('#game .controls button').forEach((btn) => {
-  btn.addEventListener('click', async () => {
-    const action = btn.dataset.action;
-    await api('/api/action', 'POST', { action });
+  btn.addEventListener('click', () => {
+    // One input per frame: stamp each click on its own frame
+    lastStamp = Math.max(lastFrame + 1, lastStamp + 1);
+    pendingInputs.push({ action: btn.dataset.action, client_frame: lastStamp });
   });
 });
 
-// Start passive polling so the enemy moves when idle
-polling = setInterval(poll, 400);
+// Draw whatever state the session already has
+poll();
 